@@ -0,0 +1,112 @@
+"""
+Measure the client-side conversion of a 48 kHz stereo WAV recording to mono 16 kHz, with NumPy and with the standard library fallback.
+
+For each converter the conversion time, the peak memory it allocates and the size of the converted file are reported, along with the time the original and the converted file take to upload at a given uplink bandwidth. The upload times are calculated from the sizes, not measured. The recording is converted in chunks, so the peak memory doesn't depend on its length. It is measured on a separate one minute recording, because tracing the allocations slows the standard library converter down several times. NumPy is skipped if it isn't installed.
+
+Usage:
+    python -m benchmarks.audio_conversion [--minutes 10] [--uplink-mbit 20]
+"""
+
+import os
+import time
+import wave
+import argparse
+import tempfile
+import tracemalloc
+from importlib.util import find_spec
+from convo._utils import audio
+
+FRAME_RATE = 48000
+CHANNELS = 2
+CHUNK_SECONDS = 10
+
+
+def create_recording(file_path: str, minutes: float) -> None:
+    """
+    Write a 16-bit stereo WAV file of noise, one chunk at a time.
+    """
+    remaining = round(minutes * 60 * FRAME_RATE)
+    with wave.open(file_path, "wb") as wav_file:
+        wav_file.setnchannels(CHANNELS)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(FRAME_RATE)
+        while remaining > 0:
+            frames = min(remaining, CHUNK_SECONDS * FRAME_RATE)
+            wav_file.writeframesraw(os.urandom(frames * CHANNELS * 2))
+            remaining -= frames
+
+
+def convert(file_path: str, converted_file_path: str, converter_class: type) -> None:
+    available = audio.find_spec
+    # `convert_wav` picks the converter by whether NumPy can be found.
+    audio.find_spec = lambda name: (
+        available(name) if converter_class is audio.NumpyConverter else None
+    )
+    try:
+        audio.convert_wav(file_path, converted_file_path)
+    finally:
+        audio.find_spec = available
+
+
+def measure_time(
+    file_path: str, converted_file_path: str, converter_class: type
+) -> float:
+    start = time.perf_counter()
+    convert(file_path, converted_file_path, converter_class)
+    return time.perf_counter() - start
+
+
+def measure_memory(
+    file_path: str, converted_file_path: str, converter_class: type
+) -> int:
+    tracemalloc.start()
+    try:
+        convert(file_path, converted_file_path, converter_class)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--uplink-mbit", type=float, default=20)
+    args = parser.parse_args()
+
+    converter_classes = [audio.ArrayConverter]
+    if find_spec("numpy") is not None:
+        converter_classes.insert(0, audio.NumpyConverter)
+
+    with tempfile.TemporaryDirectory() as dir_path:
+        file_path = os.path.join(dir_path, "recording.wav")
+        short_file_path = os.path.join(dir_path, "short_recording.wav")
+        converted_file_path = os.path.join(dir_path, "converted.wav")
+        create_recording(file_path, args.minutes)
+        create_recording(short_file_path, 1)
+        size = os.path.getsize(file_path)
+        upload_seconds = size * 8 / (args.uplink_mbit * 1e6)
+
+        print(
+            f"{args.minutes:g} minute {FRAME_RATE // 1000} kHz stereo recording, "
+            f"{size / 1024**2:.1f} MB, {upload_seconds:.1f} s upload at "
+            f"{args.uplink_mbit:g} Mbit/s"
+        )
+        print(
+            f"{'converter':>16} {'convert (s)':>12} {'peak (MB)':>10} "
+            f"{'size (MB)':>10} {'ratio':>6} {'upload (s)':>11} {'total (s)':>10}"
+        )
+        for converter_class in converter_classes:
+            peak = measure_memory(short_file_path, converted_file_path, converter_class)
+            duration = measure_time(file_path, converted_file_path, converter_class)
+            converted_size = os.path.getsize(converted_file_path)
+            converted_upload_seconds = converted_size * 8 / (args.uplink_mbit * 1e6)
+            print(
+                f"{converter_class.__name__:>16} {duration:>12.2f} "
+                f"{peak / 1024**2:>10.1f} {converted_size / 1024**2:>10.1f} "
+                f"{size / converted_size:>6.1f} {converted_upload_seconds:>11.1f} "
+                f"{duration + converted_upload_seconds:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
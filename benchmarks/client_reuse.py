@@ -0,0 +1,97 @@
+"""
+Compare the per-request cost of constructing a new provider client for every call with the shared clients from convo's client registry.
+
+Both paths send the same requests to a local stub server. Most of the per-call cost is the setup of every new HTTP client, which loads the CA certificates into a fresh SSL context. Since the stub speaks plain HTTP, the difference doesn't contain TLS handshakes, which make new connections to the real APIs even more expensive.
+
+Usage:
+    python -m benchmarks.client_reuse [--requests 200]
+"""
+
+import os
+import time
+import argparse
+import tempfile
+from typing import Callable
+from deepgram import DeepgramClient, DeepgramClientOptions, PrerecordedOptions
+from openai import OpenAI
+from convo.ai._internal import clients, deepgram
+from benchmarks.stub_server import run_stub_server
+
+API_KEY = "benchmark"
+AUDIO_FILE_SIZE = 64 * 1024
+MESSAGES = [{"role": "user", "content": "Summarize the conversation."}]
+
+
+def open_ai_per_call(url: str, audio_file_path: str) -> None:
+    client = OpenAI(api_key=API_KEY, base_url=f"{url}/v1")
+    client.chat.completions.create(model="stub", messages=MESSAGES)
+
+
+def open_ai_shared(url: str, audio_file_path: str) -> None:
+    client = clients.get_open_ai_client(API_KEY)
+    client.chat.completions.create(model="stub", messages=MESSAGES)
+
+
+def deepgram_per_call(url: str, audio_file_path: str) -> None:
+    client = DeepgramClient(API_KEY, DeepgramClientOptions(url=url))
+    prerecorded = client.listen.prerecorded.v("1")
+    with open(audio_file_path, "rb") as file:
+        prerecorded.post(
+            f"{prerecorded.config.url}/{deepgram.LISTEN_ENDPOINT}",
+            options={"model": "stub"},
+            content=file,
+        )
+
+
+def deepgram_shared(url: str, audio_file_path: str) -> None:
+    deepgram.upload(
+        clients.get_deepgram_client(API_KEY),
+        audio_file_path,
+        PrerecordedOptions(model="stub"),
+    )
+
+
+def measure(
+    request: Callable[[str, str], None],
+    url: str,
+    audio_file_path: str,
+    request_count: int,
+) -> float:
+    # Warm up imports and lazily created state outside of the measurement.
+    request(url, audio_file_path)
+
+    start = time.perf_counter()
+    for _ in range(request_count):
+        request(url, audio_file_path)
+    return (time.perf_counter() - start) / request_count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_path, run_stub_server() as url:
+        audio_file_path = os.path.join(dir_path, "audio.wav")
+        with open(audio_file_path, "wb") as file:
+            file.write(os.urandom(AUDIO_FILE_SIZE))
+
+        clients.set_client_options("deepgram", {"base_url": url})
+        clients.set_client_options("open_ai", {"base_url": f"{url}/v1"})
+
+        print(f"{args.requests} sequential requests per provider")
+        print(f"{'':>10} {'per call (ms)':>14} {'shared (ms)':>12} {'factor':>7}")
+        for name, per_call, shared in [
+            ("open_ai", open_ai_per_call, open_ai_shared),
+            ("deepgram", deepgram_per_call, deepgram_shared),
+        ]:
+            per_call_ms = measure(per_call, url, audio_file_path, args.requests)
+            shared_ms = measure(shared, url, audio_file_path, args.requests)
+            print(
+                f"{name:>10} {per_call_ms:>14.2f} {shared_ms:>12.2f} "
+                f"{per_call_ms / shared_ms:>6.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
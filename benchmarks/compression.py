@@ -0,0 +1,146 @@
+"""
+Compare the size ratio and the read and write time of each compression for the two kinds of files convo stores: Deepgram responses in the cache and transcripts.
+
+Responses are compressed and decompressed as a whole, like the cache does. Transcripts are written with their header and sections and read back completely and as summary only, like `convo transcripts show` and `show -s` do. zstd is skipped if zstandard isn't installed.
+
+Usage:
+    python -m benchmarks.compression [--words 20000] [--runs 5]
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from importlib.util import find_spec
+from typing import Callable
+from convo._utils import codec
+from convo.transcripts._internal import storage
+from benchmarks.deepgram_response import create_response_body
+
+# Every compression at its fastest, its default and a strong level.
+LEVELS = {
+    "none": [None],
+    "gzip": [1, 6, 9],
+    "lzma": [0, 1, 6],
+    "zstd": [1, 3, 9, 19],
+}
+
+
+def measure(function: Callable[[], object], runs: int) -> float:
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def benchmark_response(
+    response: bytes, compression, file_path: str, runs: int
+) -> tuple[int, float, float]:
+    def write():
+        with open(file_path, "wb") as file:
+            file.write(codec.compress(response, compression))
+
+    def read():
+        with open(file_path, "rb") as file:
+            return codec.decompress(file.read())
+
+    write_ms = measure(write, runs)
+    read_ms = measure(read, runs)
+    assert read() == response
+    return os.path.getsize(file_path), write_ms, read_ms
+
+
+def benchmark_transcript(
+    transcript, compression, file_path: str, runs: int
+) -> tuple[int, float, float, float]:
+    write_ms = measure(
+        lambda: storage.write_transcript(file_path, transcript, compression), runs
+    )
+    read_ms = measure(lambda: storage.read_transcript(file_path), runs)
+    summary_ms = measure(lambda: storage.read_section(file_path, "summary"), runs)
+    assert storage.read_transcript(file_path) == transcript
+    return os.path.getsize(file_path), write_ms, read_ms, summary_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    response = create_response_body(args.words).encode()
+    transcript = {
+        "metadata": {
+            "audio_file_path": "/recordings/benchmark.wav",
+            "date": "2024-01-01",
+            "speakers": ["Alice", "Bob", "Carol", "Dave"],
+            "keywords": [],
+        },
+        "summary": "A summary of the conversation. " * 20,
+        "content": json.loads(response)["results"]["channels"][0]["alternatives"][
+            0
+        ]["transcript"],
+    }
+    compressions = [
+        compression
+        for compression in LEVELS
+        if compression != "zstd" or find_spec("zstandard") is not None
+    ]
+
+    print(
+        f"response: {len(response) / 1024:.0f} KB, "
+        f"transcript content: {len(transcript['content']) / 1024:.0f} KB, "
+        f"median of {args.runs} runs"
+    )
+    print(
+        f"{'':>9} {'level':>5} | {'response':>8} {'write':>7} {'read':>7} | "
+        f"{'transcript':>10} {'write':>7} {'read':>7} {'summary':>8}"
+    )
+    default_levels = dict(codec.LEVELS)
+    with tempfile.TemporaryDirectory() as dir_path:
+        response_file_path = os.path.join(dir_path, "response.json")
+        transcript_file_path = os.path.join(dir_path, "benchmark_transcript.json")
+        for compression in compressions:
+            for level in LEVELS[compression]:
+                if level is not None:
+                    codec.LEVELS[compression] = level
+                response_size, response_write_ms, response_read_ms = (
+                    benchmark_response(
+                        response, compression, response_file_path, args.runs
+                    )
+                )
+                (
+                    transcript_size,
+                    transcript_write_ms,
+                    transcript_read_ms,
+                    summary_ms,
+                ) = benchmark_transcript(
+                    transcript, compression, transcript_file_path, args.runs
+                )
+                marker = (
+                    "*"
+                    if compression in default_levels
+                    and default_levels[compression] == level
+                    else " "
+                )
+                print(
+                    f"{compression:>9} {'' if level is None else level:>4}{marker} | "
+                    f"{len(response) / response_size:>7.1f}x "
+                    f"{response_write_ms:>5.1f}ms {response_read_ms:>5.1f}ms | "
+                    f"{len(transcript['content']) / transcript_size:>9.1f}x "
+                    f"{transcript_write_ms:>5.1f}ms {transcript_read_ms:>5.1f}ms "
+                    f"{summary_ms:>6.2f}ms"
+                )
+            codec.LEVELS.update(default_levels)
+
+    print("* level convo uses")
+
+
+if __name__ == "__main__":
+    main()
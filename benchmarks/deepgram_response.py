@@ -0,0 +1,164 @@
+"""
+Compare time and memory of handling a Deepgram response before and after convo decodes it into a TranscriptionResult.
+
+The previous path parsed the body into the SDK's response classes, wrote it to the cache with `to_json(indent=4)` and read it back with `json.load`.
+
+Usage:
+    python -m benchmarks.deepgram_response [--words 10000]
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from typing import Callable
+from deepgram import PrerecordedResponse
+from convo.ai._internal.response import decode_response
+
+WORDS_PER_PARAGRAPH = 40
+VOCABULARY = ["revenue", "quarter", "product", "customer", "the", "and", "we"]
+
+
+def create_response_body(word_count: int, speaker_count=4) -> str:
+    words = []
+    for idx in range(word_count):
+        word = random.choice(VOCABULARY)
+        start = idx * 0.35
+        words.append(
+            {
+                "word": word,
+                "start": start,
+                "end": start + 0.3,
+                "confidence": random.random(),
+                "punctuated_word": word.capitalize(),
+                "speaker": idx // WORDS_PER_PARAGRAPH % speaker_count,
+                "speaker_confidence": random.random(),
+            }
+        )
+
+    paragraphs = []
+    for idx in range(0, word_count, WORDS_PER_PARAGRAPH):
+        paragraph_words = words[idx : idx + WORDS_PER_PARAGRAPH]
+        text = " ".join(word["punctuated_word"] for word in paragraph_words)
+        paragraphs.append(
+            {
+                "sentences": [
+                    {
+                        "text": text,
+                        "start": paragraph_words[0]["start"],
+                        "end": paragraph_words[-1]["end"],
+                    }
+                ],
+                "start": paragraph_words[0]["start"],
+                "end": paragraph_words[-1]["end"],
+                "num_words": len(paragraph_words),
+                "speaker": paragraph_words[0]["speaker"],
+            }
+        )
+
+    transcript = "\n\n".join(
+        f"Speaker {paragraph['speaker']}: {paragraph['sentences'][0]['text']}"
+        for paragraph in paragraphs
+    )
+    utterances = [
+        {
+            "start": paragraph["start"],
+            "end": paragraph["end"],
+            "confidence": 0.9,
+            "channel": 0,
+            "transcript": paragraph["sentences"][0]["text"],
+            "words": words[idx * WORDS_PER_PARAGRAPH : (idx + 1) * WORDS_PER_PARAGRAPH],
+            "speaker": paragraph["speaker"],
+            "id": str(idx),
+        }
+        for idx, paragraph in enumerate(paragraphs)
+    ]
+
+    return json.dumps(
+        {
+            "metadata": {
+                "transaction_key": "deprecated",
+                "request_id": "benchmark",
+                "sha256": "",
+                "created": "",
+                "duration": word_count * 0.35,
+                "channels": 1,
+                "models": ["benchmark"],
+                "model_info": {},
+            },
+            "results": {
+                "channels": [
+                    {
+                        "alternatives": [
+                            {
+                                "transcript": transcript,
+                                "confidence": 0.9,
+                                "words": words,
+                                "paragraphs": {
+                                    "transcript": f"\n{transcript}\n",
+                                    "paragraphs": paragraphs,
+                                },
+                            }
+                        ]
+                    }
+                ],
+                "utterances": utterances,
+            },
+        }
+    )
+
+
+def handle_with_sdk(response_body: str, dir_path: str):
+    response = PrerecordedResponse.from_json(response_body)
+    response_file_path = os.path.join(dir_path, "response.json")
+    with open(response_file_path, "w") as file:
+        file.write(response.to_json(indent=4))
+    with open(response_file_path, "rb") as file:
+        return json.load(file)
+
+
+def handle_compact(response_body: str, dir_path: str):
+    return decode_response(response_body)
+
+
+def measure(
+    handle: Callable[[str, str], object], response_body: str, dir_path: str
+) -> tuple[float, float, float]:
+    start = time.perf_counter()
+    handle(response_body, dir_path)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = handle(response_body, dir_path)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return duration, peak / 1024 / 1024, retained / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=10_000)
+    args = parser.parse_args()
+
+    response_body = create_response_body(args.words)
+    print(f"{args.words} words, {len(response_body) / 1024 / 1024:.1f} MB response")
+    print(f"{'':>8} {'time (s)':>10} {'peak (MB)':>10} {'retained (MB)':>14}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as dir_path:
+        for name, handle in [("sdk", handle_with_sdk), ("compact", handle_compact)]:
+            results[name] = measure(handle, response_body, dir_path)
+            duration, peak, retained = results[name]
+            print(f"{name:>8} {duration:>10.3f} {peak:>10.1f} {retained:>14.1f}")
+
+    factors = [old / new for old, new in zip(results["sdk"], results["compact"])]
+    print(f"{'factor':>8} {factors[0]:>9.1f}x {factors[1]:>9.1f}x {factors[2]:>13.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Compare the wall-clock time of transcribing a long WAV recording as a whole and in segments that are split at pauses.
+
+A synthetic recording of three speakers, noise at a different level for each of them, is sent to a local stub server. The stub takes a fixed time per second of audio before it answers with a word every half second of speech, like Deepgram takes longer for longer recordings, and numbers the speakers in the order they first speak in the uploaded audio. The speakers of the stitched segments should therefore be reconciled into three again. Every run uses a fresh convo home directory in its own interpreter, so nothing is cached.
+
+Usage:
+    python -m benchmarks.segmented_transcription [--minutes 60] [--segment-minutes 5 10 20] [--latency 0.005] [--concurrency 4]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import wave
+import random
+import argparse
+import tempfile
+import subprocess
+from array import array
+from benchmarks.stub_server import StubHandler, run_stub_server
+
+FRAME_RATE = 8000
+WORD_SECONDS = 0.5
+SPEAKER_COUNT = 3
+# Speaker k speaks with noise whose most significant byte stays within
+# +-LEVEL_STEP * (k + 1), so the stub can tell the speakers apart.
+LEVEL_STEP = 32
+LEVEL_TABLES = [
+    bytes(
+        (byte % (2 * LEVEL_STEP * (speaker + 1) - 1) - LEVEL_STEP * (speaker + 1) + 1)
+        % 256
+        for byte in range(256)
+    )
+    for speaker in range(SPEAKER_COUNT)
+]
+
+
+def create_recording(file_path: str, minutes: float) -> None:
+    """
+    Write a mono 16-bit WAV file of speaker turns. Every turn is one to four bursts of noise between 2 and 8 seconds long at the level of its speaker, separated by silent pauses of 0.3 to 1.5 seconds.
+    """
+    random.seed(0)
+    remaining = round(minutes * 60 * FRAME_RATE)
+    speaker = 0
+    with wave.open(file_path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(FRAME_RATE)
+        while remaining > 0:
+            for _ in range(random.randint(1, 4)):
+                speech = min(remaining, round(random.uniform(2, 8) * FRAME_RATE))
+                frames = bytearray(speech * 2)
+                frames[0::2] = os.urandom(speech)
+                frames[1::2] = os.urandom(speech).translate(LEVEL_TABLES[speaker])
+                wav_file.writeframesraw(frames)
+                pause = min(
+                    remaining - speech, round(random.uniform(0.3, 1.5) * FRAME_RATE)
+                )
+                wav_file.writeframesraw(bytes(pause * 2))
+                remaining -= speech + pause
+            speaker = random.choice(
+                [other for other in range(SPEAKER_COUNT) if other != speaker]
+            )
+
+
+def get_speaker(samples: array) -> int | None:
+    """
+    Returns:
+        int | None: The speaker of a part of the recording, None if it is silent.
+    """
+    peak = max(map(abs, samples), default=0)
+    if peak == 0:
+        return None
+    return min(SPEAKER_COUNT - 1, (peak >> 8) // LEVEL_STEP)
+
+
+def create_response(samples: array) -> dict:
+    """
+    Create a response with a word every half second of speech. Like Deepgram, the speakers are numbered in the order they first speak in the uploaded audio.
+    """
+    words = []
+    paragraphs = []
+    speaker_numbers: dict[int, int] = {}
+    word_samples = int(WORD_SECONDS * FRAME_RATE)
+    for idx in range(len(samples) // word_samples):
+        true_speaker = get_speaker(
+            samples[idx * word_samples : idx * word_samples + word_samples // 5]
+        )
+        if true_speaker is None:
+            continue
+        speaker = speaker_numbers.setdefault(true_speaker, len(speaker_numbers))
+        start = idx * WORD_SECONDS
+        word = {
+            "word": "word",
+            "start": start,
+            "end": start + WORD_SECONDS * 0.8,
+            "confidence": 0.9,
+            "punctuated_word": "Word",
+            "speaker": speaker,
+            "speaker_confidence": 0.9,
+        }
+        words.append(word)
+        if not paragraphs or paragraphs[-1]["speaker"] != speaker:
+            paragraphs.append(
+                {
+                    "sentences": [],
+                    "start": start,
+                    "end": word["end"],
+                    "num_words": 0,
+                    "speaker": speaker,
+                }
+            )
+        paragraph = paragraphs[-1]
+        paragraph["sentences"].append(
+            {"text": "Word.", "start": start, "end": word["end"]}
+        )
+        paragraph["end"] = word["end"]
+        paragraph["num_words"] += 1
+
+    return {
+        "metadata": {
+            "request_id": "stub",
+            "duration": len(samples) / FRAME_RATE,
+            "channels": 1,
+        },
+        "results": {
+            "channels": [
+                {
+                    "alternatives": [
+                        {
+                            "transcript": " ".join("Word" for _ in words),
+                            "confidence": 0.9,
+                            "words": words,
+                            "paragraphs": {"transcript": "", "paragraphs": paragraphs},
+                        }
+                    ]
+                }
+            ]
+        },
+    }
+
+
+def create_handler(latency: float) -> type[StubHandler]:
+    class TimedHandler(StubHandler):
+        """
+        Answers Deepgram requests after `latency` seconds per second of the uploaded audio, which has to be a recording from `create_recording`.
+        """
+
+        def do_POST(self):
+            if self.path.startswith("/v1/chat/completions"):
+                return super().do_POST()
+
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            with wave.open(io.BytesIO(body), "rb") as wav_file:
+                samples = array("h", wav_file.readframes(wav_file.getnframes()))
+            time.sleep(len(samples) / FRAME_RATE * latency)
+
+            response_body = json.dumps(create_response(samples)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response_body)))
+            self.end_headers()
+            self.wfile.write(response_body)
+
+    return TimedHandler
+
+
+def transcribe(
+    audio_file_path: str, url: str, segment_seconds: float | None, concurrency: int
+) -> None:
+    """
+    Runs in the child interpreter, whose home directory is empty.
+    """
+    import convo
+
+    convo.config.setup("Benchmark", "not-specified")
+    convo.config.set_config_data(deepgram_api_key="benchmark")
+    convo.ai.set_client_options("deepgram", {"base_url": url})
+    convo.ai.set_provider_limit("deepgram", concurrency)
+
+    from convo.ai._internal import deepgram
+
+    speakers = [f"Speaker {idx}" for idx in range(SPEAKER_COUNT)]
+    start = time.perf_counter()
+    response = deepgram.decode_response(
+        deepgram.request_response(
+            audio_file_path, speakers, [], segment_seconds=segment_seconds
+        )
+    )
+    duration = time.perf_counter() - start
+    print(f"{duration} {len(response.words)} {len(set(response.words.speaker))}")
+
+
+def measure(
+    audio_file_path: str, url: str, segment_seconds: float | None, concurrency: int
+) -> tuple[float, int, int]:
+    with tempfile.TemporaryDirectory() as home_path:
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.segmented_transcription",
+                "--child",
+                audio_file_path,
+                url,
+                str(segment_seconds or 0),
+                str(concurrency),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+            env={**os.environ, "HOME": home_path},
+        ).stdout
+    duration, word_count, speaker_count = output.split()
+    return float(duration), int(word_count), int(speaker_count)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument(
+        "--segment-minutes", type=float, nargs="+", default=[5, 10, 20]
+    )
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--child", nargs=4, metavar=("PATH", "URL", "SEGMENT", "LIMIT"))
+    args = parser.parse_args()
+
+    if args.child:
+        audio_file_path, url, segment_seconds, concurrency = args.child
+        transcribe(
+            audio_file_path, url, float(segment_seconds) or None, int(concurrency)
+        )
+        return
+
+    print(
+        f"{args.minutes:.0f} minute recording, stub takes {args.latency * 60:.2f} s "
+        f"per minute of audio, {args.concurrency} concurrent requests"
+    )
+    print(f"{'segments':>12} {'time (s)':>9} {'words':>7} {'speakers':>9}")
+    with tempfile.TemporaryDirectory() as dir_path, run_stub_server(
+        create_handler(args.latency)
+    ) as url:
+        audio_file_path = os.path.join(dir_path, "recording.wav")
+        create_recording(audio_file_path, args.minutes)
+        for segment_minutes in [None, *args.segment_minutes]:
+            duration, word_count, speaker_count = measure(
+                audio_file_path,
+                url,
+                segment_minutes and segment_minutes * 60,
+                args.concurrency,
+            )
+            name = "whole" if segment_minutes is None else f"{segment_minutes:g} min"
+            print(f"{name:>12} {duration:>9.2f} {word_count:>7} {speaker_count:>9}")
+
+
+if __name__ == "__main__":
+    main()
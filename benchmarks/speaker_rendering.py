@@ -0,0 +1,79 @@
+"""
+Compare rendering the speaker names into a transcript with one `str.replace` per speaker, like convo did before, and in a single pass over the paragraphs of the response.
+
+The replacements scan the whole transcript once per speaker and rewrite "Speaker 10" as the name of speaker 1 followed by "0". The benchmark reports whether each renderer produced the expected transcript.
+
+Usage:
+    python -m benchmarks.speaker_rendering [--words 200000] [--speakers 4 12 40] [--runs 5]
+"""
+
+import time
+import random
+import argparse
+import statistics
+from typing import Callable
+from convo.ai._internal.deepgram import get_transcript, render_transcript
+from convo.ai._internal.response import TranscriptionResult, decode_response
+from benchmarks.deepgram_response import create_response_body
+
+
+def replace_speaker_placeholders(
+    response: TranscriptionResult, speakers: list[str]
+) -> str:
+    transcript = get_transcript(response)
+    for idx, speaker in enumerate(speakers):
+        transcript = transcript.replace(f"Speaker {idx}", speaker)
+
+    return transcript
+
+
+def render_expected(response: TranscriptionResult, speakers: list[str]) -> str:
+    return "\n\n".join(
+        f"{speakers[paragraph['speaker']]}: {paragraph['sentences'][0]['text']}"
+        for paragraph in response.paragraphs
+    )
+
+
+def measure(
+    render: Callable[[TranscriptionResult, list[str]], str],
+    response: TranscriptionResult,
+    speakers: list[str],
+    runs: int,
+) -> tuple[float, str]:
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        transcript = render(response, speakers)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000, transcript
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=200_000)
+    parser.add_argument("--speakers", type=int, nargs="+", default=[4, 12, 40])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.words} words, median of {args.runs} runs")
+    print(f"{'speakers':>8} {'renderer':>8} {'time (ms)':>10} {'correct':>8}")
+    for speaker_count in args.speakers:
+        random.seed(0)
+        response = decode_response(
+            create_response_body(args.words, speaker_count=speaker_count)
+        )
+        speakers = [f"Participant #{idx + 1}" for idx in range(speaker_count)]
+        expected = render_expected(response, speakers)
+        for name, render in [
+            ("replace", replace_speaker_placeholders),
+            ("render", render_transcript),
+        ]:
+            duration, transcript = measure(render, response, speakers, args.runs)
+            print(
+                f"{speaker_count:>8} {name:>8} {duration:>10.1f} "
+                f"{'yes' if transcript == expected else 'no':>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Measure the startup time of the CLI and fail if it regresses.
+
+Every run imports the CLI in a fresh interpreter with `-X importtime`. The benchmark fails if one of the modules that only some commands need (the provider SDKs, yaml, NumPy, asyncio) is imported at startup, or if the median time convo's own modules take to import exceeds the budget.
+
+Usage:
+    python -m benchmarks.startup [--runs 20] [--budget-ms 40]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+LAZY_MODULES = ["openai", "deepgram", "httpx", "yaml", "numpy", "asyncio"]
+DEFAULT_BUDGET_MS = 40
+# Installed packages come with bytecode caches, so the measured interpreters
+# must be able to write them, too.
+ENVIRONMENT = {
+    key: value
+    for key, value in os.environ.items()
+    if key != "PYTHONDONTWRITEBYTECODE"
+}
+
+
+def get_import_times(code: str) -> dict[str, float]:
+    """
+    Run code in a fresh interpreter and return the cumulative import time in milliseconds of every module it imported.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=ENVIRONMENT,
+    )
+    import_times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        import_times[name.strip()] = int(cumulative) / 1000
+
+    return import_times
+
+
+def get_wall_time(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, env=ENVIRONMENT)
+    return (time.perf_counter() - start) * 1000
+
+
+def get_eager_modules() -> list[str]:
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, cli.commands; print(' '.join(sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=ENVIRONMENT,
+    )
+    imported_modules = set(process.stdout.split())
+    return [module for module in LAZY_MODULES if module in imported_modules]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    # The first run compiles the bytecode caches, which isn't startup time.
+    get_import_times("import cli.commands")
+    runs = [get_import_times("import cli.commands") for _ in range(args.runs)]
+    bare_ms = statistics.median(get_wall_time("pass") for _ in range(args.runs))
+    cli_ms = statistics.median(
+        get_wall_time("import cli.commands") for _ in range(args.runs)
+    )
+
+    print(f"median of {args.runs} runs")
+    print(f"{'bare interpreter (wall)':>26} {bare_ms:>7.1f} ms")
+    print(f"{'import cli.commands (wall)':>26} {cli_ms:>7.1f} ms")
+    for module in ["cli.commands", "click", "convo"]:
+        module_ms = statistics.median(run[module] for run in runs)
+        print(f"{module:>26} {module_ms:>7.1f} ms")
+
+    failures = []
+    if eager_modules := get_eager_modules():
+        failures.append(f"Imported at startup: {', '.join(eager_modules)}.")
+    convo_ms = statistics.median(run["convo"] for run in runs)
+    if convo_ms > args.budget_ms:
+        failures.append(
+            f"Importing convo took {convo_ms:.1f} ms, the budget is {args.budget_ms:.0f} ms."
+        )
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+A local HTTP server that stands in for the Deepgram and OpenAI APIs in benchmarks.
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+READ_CHUNK_SIZE = 65_536
+
+DEEPGRAM_RESPONSE = {
+    "metadata": {"request_id": "stub", "duration": 0.0, "channels": 1},
+    "results": {
+        "channels": [
+            {
+                "alternatives": [
+                    {
+                        "transcript": "",
+                        "confidence": 1.0,
+                        "words": [],
+                        "paragraphs": {"transcript": "", "paragraphs": []},
+                    }
+                ]
+            }
+        ]
+    },
+}
+
+OPEN_AI_CHAT_COMPLETIONS_PATH = "/v1/chat/completions"
+OPEN_AI_RESPONSE = {
+    "id": "stub",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "Stub summary."},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers chat completion requests like OpenAI and every other POST request like Deepgram's listen endpoint.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are sent separately. With Nagle's algorithm the body
+    # waits for the client's delayed ACK, which adds ~40 ms to every request.
+    disable_nagle_algorithm = True
+    response_body = json.dumps(DEEPGRAM_RESPONSE).encode()
+    open_ai_response_body = json.dumps(OPEN_AI_RESPONSE).encode()
+
+    def do_POST(self):
+        self._discard_body()
+        if self.path.startswith(OPEN_AI_CHAT_COMPLETIONS_PATH):
+            body = self.open_ai_response_body
+        else:
+            body = self.response_body
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _discard_body(self):
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                self.rfile.read(size + 2)
+                if size == 0:
+                    return
+
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining > 0:
+            chunk = self.rfile.read(min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def run_stub_server(handler=StubHandler) -> Iterator[str]:
+    """
+    Run the stub server in a background thread.
+
+    Yields:
+        str: The base URL of the server.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
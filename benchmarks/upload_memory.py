@@ -0,0 +1,84 @@
+"""
+Measure the peak resident memory of a Deepgram upload for growing audio files.
+
+Every upload runs in a fresh interpreter against a local stub server, so the numbers only contain the cost of reading and sending the file.
+
+Usage:
+    python -m benchmarks.upload_memory [--sizes 16 64 256]
+"""
+
+import os
+import sys
+import argparse
+import resource
+import subprocess
+import tempfile
+
+MODES = ["buffer", "stream"]
+
+
+def upload(mode: str, audio_file_path: str, url: str) -> None:
+    from deepgram import DeepgramClient, DeepgramClientOptions, PrerecordedOptions
+    from convo.ai._internal import clients, deepgram
+
+    options = PrerecordedOptions(model="nova-2")
+    if mode == "stream":
+        clients.set_client_options("deepgram", {"base_url": url})
+        deepgram.upload(
+            clients.get_deepgram_client("benchmark"), audio_file_path, options
+        )
+    else:
+        client = DeepgramClient("benchmark", DeepgramClientOptions(url=url))
+        with open(audio_file_path, "rb") as file:
+            client.listen.prerecorded.v("1").transcribe_file(
+                {"buffer": file.read()}, options
+            )
+
+
+def get_peak_rss_mb() -> float:
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak_rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def measure(mode: str, audio_file_path: str, url: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.upload_memory", "--child", mode, audio_file_path, url],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "PATH", "URL"))
+    args = parser.parse_args()
+
+    if args.child:
+        mode, audio_file_path, url = args.child
+        upload(mode, audio_file_path, url)
+        print(get_peak_rss_mb())
+        return
+
+    from benchmarks.stub_server import run_stub_server
+
+    print(f"{'size (MB)':>10} " + " ".join(f"{mode + ' (MB)':>14}" for mode in MODES))
+    with run_stub_server() as url, tempfile.TemporaryDirectory() as dir_path:
+        for size in args.sizes:
+            audio_file_path = os.path.join(dir_path, f"{size}.wav")
+            # Write in chunks: the peak RSS of this process is inherited by the children.
+            chunk = os.urandom(1024 * 1024)
+            with open(audio_file_path, "wb") as file:
+                for _ in range(size):
+                    file.write(chunk)
+
+            peaks = [measure(mode, audio_file_path, url) for mode in MODES]
+            print(f"{size:>10} " + " ".join(f"{peak:>14.1f}" for peak in peaks))
+            os.remove(audio_file_path)
+
+
+if __name__ == "__main__":
+    main()
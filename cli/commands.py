@@ -1,3 +1,4 @@
+import os
 import sys
 from datetime import datetime
 import click
@@ -144,6 +145,125 @@ def config_set_api_key(api_key: str | None, model: str):
     click.secho("Successfully set up OpenAI.", fg="green")
 
 
+@config_set_group.command("cache")
+@click.option(
+    "-l",
+    "--size-limit",
+    type=click.IntRange(min=1),
+    help=f"Maximum size of each cache in MB. Defaults to {convo.config.DEFAULT_CACHE_SIZE_LIMIT_MB} MB.",
+)
+@click.option(
+    "-z",
+    "--compression",
+    type=click.Choice(convo.config.COMPRESSIONS),
+    help=f"Compression of new cache entries and transcripts. Defaults to {convo.config.DEFAULT_COMPRESSION}. Run `convo cache compact` to convert existing files.",
+)
+def config_set_cache(
+    size_limit: int | None, compression: convo.config.Compression | None
+):
+    """Set up the cache in the configuration. The least recently used entries are evicted once a cache exceeds its size limit."""
+    if size_limit is None and compression is None:
+        click.secho("Specify a size limit or a compression.", fg="red")
+        sys.exit(1)
+
+    try:
+        convo.config.set_config_data(
+            cache_size_limit_mb=size_limit, compression=compression
+        )
+    except Exception as e:
+        click.secho(e, fg="red")
+        sys.exit(1)
+
+    if size_limit is not None:
+        click.secho(
+            f"Successfully set the cache size limit to {size_limit} MB.", fg="green"
+        )
+    if compression is not None:
+        click.secho(
+            f"Successfully set the compression to {compression}.", fg="green"
+        )
+
+
+@config_set_group.command("audio")
+@click.option(
+    "--convert/--no-convert",
+    required=True,
+    help=f"Downmix WAV recordings to mono and resample them to 16 kHz before they are uploaded. Defaults to {'--convert' if convo.config.DEFAULT_CONVERT_AUDIO else '--no-convert'}.",
+)
+def config_set_audio(convert: bool):
+    """Set up how recordings are prepared for the upload in the configuration."""
+    try:
+        convo.config.set_config_data(convert_audio=convert)
+    except Exception as e:
+        click.secho(e, fg="red")
+        sys.exit(1)
+
+    click.secho(
+        f"Successfully {'enabled' if convert else 'disabled'} the audio conversion.",
+        fg="green",
+    )
+
+
+@config_set_group.command("rate-limits")
+@click.argument("provider", type=click.Choice(["deepgram", "open-ai"]))
+@click.option(
+    "-r",
+    "--requests-per-minute",
+    type=click.IntRange(min=0),
+    help="Maximum number of requests per minute. 0 removes the limit.",
+)
+@click.option(
+    "-t",
+    "--tokens-per-minute",
+    type=click.IntRange(min=0),
+    help="Maximum number of estimated tokens per minute. 0 removes the limit.",
+)
+def config_set_rate_limits(
+    provider: str, requests_per_minute: int | None, tokens_per_minute: int | None
+):
+    """Set the rate limits of an AI provider in the configuration. Requests wait until the limits allow them instead of being rejected by the provider."""
+    if requests_per_minute is None and tokens_per_minute is None:
+        click.secho("Specify a request or a token limit.", fg="red")
+        sys.exit(1)
+
+    rate_limits: convo.config.RateLimits = {}
+    if requests_per_minute is not None:
+        rate_limits["requests_per_minute"] = requests_per_minute
+    if tokens_per_minute is not None:
+        rate_limits["tokens_per_minute"] = tokens_per_minute
+    try:
+        convo.config.set_config_data(
+            rate_limits={provider.replace("-", "_"): rate_limits}
+        )
+    except Exception as e:
+        click.secho(e, fg="red")
+        sys.exit(1)
+
+    click.secho(f"Successfully set the rate limits of {provider}.", fg="green")
+
+
+@config_set_group.command("query")
+@click.option(
+    "-b",
+    "--token-budget",
+    type=click.IntRange(min=1),
+    required=True,
+    help=f"Maximum number of tokens of the summaries and excerpts sent with a query. Defaults to {convo.config.DEFAULT_QUERY_TOKEN_BUDGET}.",
+)
+def config_set_query(token_budget: int):
+    """Set up queries in the configuration."""
+    try:
+        convo.config.set_config_data(query_token_budget=token_budget)
+    except Exception as e:
+        click.secho(e, fg="red")
+        sys.exit(1)
+
+    click.secho(
+        f"Successfully set the query token budget to {token_budget}.",
+        fg="green",
+    )
+
+
 @config_set_group.command("common-words")
 @click.argument("words", nargs=-1)
 def config_set_common_words(words: tuple[str]):
@@ -169,9 +289,7 @@ def config_add_group():
 def config_add_common_words(words: tuple[str]):
     """Add a set of words to your list of common words in the configuration. These should be words like company names or product names that the AI might not know and you commonly use."""
     try:
-        config_data = convo.config.get_config_data()
-        all_common_words = config_data["common_words"] + list(words)
-        convo.config.set_config_data(common_words=list(all_common_words))
+        all_common_words = convo.config.add_common_words(list(words))
     except Exception as e:
         click.secho(e, fg="red")
         sys.exit(1)
@@ -192,11 +310,7 @@ def config_remove_group():
 def config_remove_common_words(words: tuple[str]):
     """Remove a set of words from your list of common words in the configuration."""
     try:
-        config_data = convo.config.get_config_data()
-        common_words_left = [
-            word for word in config_data["common_words"] if word not in words
-        ]
-        convo.config.set_config_data(common_words=list(common_words_left))
+        common_words_left = convo.config.remove_common_words(list(words))
     except Exception as e:
         click.secho(e, fg="red")
         sys.exit(1)
@@ -214,16 +328,67 @@ def ai_group():
 
 
 @ai_group.command("context")
-def ai_context():
-    """Print the query context the AI uses to answer questions to stdout."""
-    click.echo(convo.ai.get_context())
+@click.argument("prompt", required=False)
+@click.option(
+    "-b",
+    "--token-budget",
+    type=click.IntRange(min=1),
+    help="Maximum number of tokens of the context. Only used together with a prompt. Defaults to the configured budget.",
+)
+def ai_context(prompt: str | None, token_budget: int | None):
+    """Print the query context the AI uses to answer questions to stdout. If a prompt is given, only the summaries selected for it are printed."""
+    try:
+        click.echo(convo.ai.get_context(prompt, token_budget))
+    except Exception as e:
+        click.secho(e, fg="red")
+        sys.exit(1)
 
 
 @ai_group.command("query")
 @click.argument("prompt")
-def ai_query(prompt: str):
-    """Question an AI about the summaries of the transcripts."""
-    convo.ai.query(prompt)
+@click.option(
+    "-b",
+    "--token-budget",
+    type=click.IntRange(min=1),
+    help="Maximum number of tokens of the summaries and excerpts sent with the prompt. Defaults to the configured budget.",
+)
+@click.option(
+    "-S",
+    "--show-selected",
+    is_flag=True,
+    default=False,
+    help="Print the transcripts that were selected as context before the answer.",
+)
+@click.option(
+    "-e",
+    "--excerpts",
+    type=click.IntRange(min=0),
+    default=convo.ai.DEFAULT_EXCERPT_COUNT,
+    show_default=True,
+    help="Number of transcript content excerpts sent with the prompt. Requires NumPy.",
+)
+def ai_query(
+    prompt: str, token_budget: int | None, show_selected: bool, excerpts: int
+):
+    """Question an AI about the summaries and content of the transcripts."""
+    convo.ai.query(
+        prompt,
+        token_budget=token_budget,
+        show_selected=show_selected,
+        excerpt_count=excerpts,
+    )
+
+
+def echo_conversion_stats() -> None:
+    stats = convo.ai.get_conversion_stats()
+    if stats["files"]:
+        saved_bytes = stats["original_bytes"] - stats["converted_bytes"]
+        click.echo(
+            f"Converted {stats['files']} recording(s) before the upload: "
+            f"{stats['original_bytes'] / 1024**2:.1f} MB -> "
+            f"{stats['converted_bytes'] / 1024**2:.1f} MB, "
+            f"{saved_bytes / 1024**2:.1f} MB saved."
+        )
 
 
 @ai_group.command("transcribe")
@@ -256,27 +421,309 @@ def ai_query(prompt: str):
     default=False,
     help="Use cached transcript instead of making another API call to Deepgram.",
 )
+@click.option(
+    "--no-summary-cache",
+    is_flag=True,
+    default=False,
+    help="Request a new summary from OpenAI even if one is cached for the same transcript, speakers and model.",
+)
+@click.option(
+    "--segment-minutes",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Split WAV recordings longer than this at pauses and transcribe the segments concurrently.",
+)
+@click.option(
+    "--no-resume",
+    is_flag=True,
+    default=False,
+    help="Run every stage again instead of resuming an earlier run that failed or was interrupted.",
+)
+@click.option(
+    "--deepgram-concurrency",
+    type=click.IntRange(min=1),
+    default=convo.ai.DEFAULT_PROVIDER_LIMITS["deepgram"],
+    show_default=True,
+    help="Maximum number of segments that are sent to Deepgram at the same time.",
+)
 def ai_transcribe(
     audio_file_path: str,
     speakers: tuple[str],
     keywords: tuple[str],
     date: datetime,
     cache: bool,
+    no_summary_cache: bool,
+    segment_minutes: float | None,
+    no_resume: bool,
+    deepgram_concurrency: int,
 ):
-    """Transcribe an audio file."""
+    """Transcribe an audio file. A run that failed or was interrupted resumes after its last completed stage, a completed run is skipped."""
+    transcript_options = {
+        "audio_file_path": audio_file_path,
+        "speakers": list(speakers),
+        "keywords": list(keywords),
+        "date": date.date().strftime("%Y-%m-%d"),
+        "summary_cache": not no_summary_cache,
+        "segment_seconds": segment_minutes * 60 if segment_minutes else None,
+    }
     try:
+        if not no_resume and (
+            transcript_file_path := convo.ai.find_transcript(**transcript_options)
+        ):
+            click.echo(
+                f"Skipped '{audio_file_path}', it was transcribed already as "
+                f"'{os.path.basename(transcript_file_path)}'. "
+                "Use --no-resume to transcribe it again."
+            )
+            return
+
+        convo.ai.set_provider_limit("deepgram", deepgram_concurrency)
         convo.ai.create_transcript(
-            audio_file_path,
+            **transcript_options, cache=cache, resume=not no_resume
+        )
+    except Exception as e:
+        click.secho(e, fg="red")
+        sys.exit(1)
+
+    echo_conversion_stats()
+    click.secho(f"Successfully transcribed '{audio_file_path}'.", fg="green")
+
+
+@ai_group.command("transcribe-batch")
+@click.argument("audio_file_paths", nargs=-1, required=True)
+@click.option(
+    "-s",
+    "--speaker",
+    "speakers",
+    multiple=True,
+    help="The conversation participants in the order they join the conversation.",
+)
+@click.option(
+    "-k",
+    "--keyword",
+    "keywords",
+    multiple=True,
+    help="Important keywords of the conversation that the AI could misunderstand.",
+)
+@click.option(
+    "-d",
+    "--date",
+    help="Date of the conversations. Defaults to the modification date of each file.",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+)
+@click.option(
+    "-c",
+    "--cache",
+    is_flag=True,
+    default=False,
+    help="Use cached transcripts instead of making another API call to Deepgram.",
+)
+@click.option(
+    "--no-summary-cache",
+    is_flag=True,
+    default=False,
+    help="Request a new summary from OpenAI even if one is cached for the same transcript, speakers and model.",
+)
+@click.option(
+    "--segment-minutes",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Split WAV recordings longer than this at pauses and transcribe the segments concurrently.",
+)
+@click.option(
+    "--no-resume",
+    is_flag=True,
+    default=False,
+    help="Run every stage again instead of resuming an earlier run that failed or was interrupted.",
+)
+@click.option(
+    "--upload-workers",
+    type=click.IntRange(min=1),
+    default=convo.ai.DEFAULT_STAGE_WORKERS["upload"],
+    show_default=True,
+    help="Number of audio files that are sent to Deepgram at the same time.",
+)
+@click.option(
+    "--transcribe-workers",
+    type=click.IntRange(min=1),
+    default=convo.ai.DEFAULT_STAGE_WORKERS["transcribe"],
+    show_default=True,
+    help="Number of Deepgram responses that are decoded at the same time.",
+)
+@click.option(
+    "--summarize-workers",
+    type=click.IntRange(min=1),
+    default=convo.ai.DEFAULT_STAGE_WORKERS["summarize"],
+    show_default=True,
+    help="Number of transcripts that are summarized at the same time.",
+)
+@click.option(
+    "--persist-workers",
+    type=click.IntRange(min=1),
+    default=convo.ai.DEFAULT_STAGE_WORKERS["persist"],
+    show_default=True,
+    help="Number of transcripts that are written to disk at the same time.",
+)
+@click.option(
+    "--queue-size",
+    type=click.IntRange(min=1),
+    default=convo.ai.DEFAULT_QUEUE_SIZE,
+    show_default=True,
+    help="Maximum number of audio files waiting in front of each stage.",
+)
+@click.option(
+    "--deepgram-concurrency",
+    type=click.IntRange(min=1),
+    default=convo.ai.DEFAULT_PROVIDER_LIMITS["deepgram"],
+    show_default=True,
+    help="Maximum number of concurrent requests to Deepgram.",
+)
+@click.option(
+    "--open-ai-concurrency",
+    type=click.IntRange(min=1),
+    default=convo.ai.DEFAULT_PROVIDER_LIMITS["open_ai"],
+    show_default=True,
+    help="Maximum number of concurrent requests to OpenAI.",
+)
+@click.option(
+    "--stats",
+    is_flag=True,
+    default=False,
+    help="Print the workers, busy time and peak queue depth of each stage and the throttled and retried requests of each provider after the batch.",
+)
+def ai_transcribe_batch(
+    audio_file_paths: tuple[str],
+    speakers: tuple[str],
+    keywords: tuple[str],
+    date: datetime | None,
+    cache: bool,
+    no_summary_cache: bool,
+    segment_minutes: float | None,
+    no_resume: bool,
+    upload_workers: int,
+    transcribe_workers: int,
+    summarize_workers: int,
+    persist_workers: int,
+    queue_size: int,
+    deepgram_concurrency: int,
+    open_ai_concurrency: int,
+    stats: bool,
+):
+    """Transcribe many audio files concurrently. Accepts file paths and glob patterns. Files that were transcribed by an earlier batch are skipped, files that failed resume after their last completed stage."""
+
+    def report(result: convo.ai.BatchResult):
+        if result["skipped"]:
+            click.echo(
+                f"Skipped '{result['audio_file_path']}', it was transcribed already as "
+                f"'{os.path.basename(result['transcript_file_path'])}'."
+            )
+        elif result["error"] is None:
+            click.secho(
+                f"Successfully transcribed '{result['audio_file_path']}'.",
+                fg="green",
+            )
+        else:
+            click.secho(
+                f"Failed to transcribe '{result['audio_file_path']}': {result['error']}",
+                fg="red",
+            )
+
+    try:
+        pipeline = convo.ai.create_pipeline(
+            {
+                "upload": upload_workers,
+                "transcribe": transcribe_workers,
+                "summarize": summarize_workers,
+                "persist": persist_workers,
+            },
+            queue_size=queue_size,
+        )
+        results = convo.ai.create_transcripts(
+            list(audio_file_paths),
             list(speakers),
             list(keywords),
-            date.date().strftime("%Y-%m-%d"),
+            date.date().strftime("%Y-%m-%d") if date else None,
             cache=cache,
+            summary_cache=not no_summary_cache,
+            pipeline=pipeline,
+            provider_limits={
+                "deepgram": deepgram_concurrency,
+                "open_ai": open_ai_concurrency,
+            },
+            on_result=report,
+            segment_seconds=segment_minutes * 60 if segment_minutes else None,
+            resume=not no_resume,
         )
     except Exception as e:
         click.secho(e, fg="red")
         sys.exit(1)
 
-    click.secho(f"Successfully transcribed '{audio_file_path}'.", fg="green")
+    echo_conversion_stats()
+    if stats:
+        for stage_stats in pipeline.get_stats():
+            click.echo(
+                f"{stage_stats['name']}: {stage_stats['workers']} workers, "
+                f"{stage_stats['processed']} done, {stage_stats['failed']} failed, "
+                f"{stage_stats['busy_seconds']:.1f}s busy, "
+                f"peak queue depth {stage_stats['peak_queue_depth']}"
+            )
+        for provider, provider_stats in convo.ai.get_provider_stats().items():
+            click.echo(
+                f"{provider}: {provider_stats['requests']} requests, "
+                f"{provider_stats['throttled']} throttled for "
+                f"{provider_stats['throttled_seconds']:.1f}s, "
+                f"{provider_stats['rate_limited']} rate limited, "
+                f"{provider_stats['retried']} retried, "
+                f"{provider_stats['failed']} failed"
+            )
+
+    failures = [result for result in results if result["error"] is not None]
+    if failures:
+        click.secho(
+            f"{len(failures)} of {len(results)} audio files failed.", fg="red"
+        )
+        sys.exit(1)
+
+
+@convo_cli.group("cache")
+def cache_group():
+    """Manage the cached provider responses."""
+
+
+@cache_group.command("compact")
+@click.option(
+    "-z",
+    "--compression",
+    type=click.Choice(convo.config.COMPRESSIONS),
+    help="Compression to convert to. Defaults to the configured compression.",
+)
+def cache_compact(compression: convo.config.Compression | None):
+    """Convert the cached responses and the transcripts in place to a compression."""
+    try:
+        if compression is None:
+            compression = convo.config.get_config_data().get(
+                "compression", convo.config.DEFAULT_COMPRESSION
+            )
+        sizes = convo.ai.compact_caches(compression)
+        size_before, size_after, skipped_names = convo.transcripts.compact(
+            compression
+        )
+        sizes["transcripts"] = (size_before, size_after)
+    except Exception as e:
+        click.secho(e, fg="red")
+        sys.exit(1)
+
+    for name, (size_before, size_after) in sizes.items():
+        click.echo(
+            f"{name}: {size_before / 1024:.0f} KB -> {size_after / 1024:.0f} KB"
+        )
+    if skipped_names:
+        for transcript_name in skipped_names:
+            click.echo(transcript_name)
+        click.secho(
+            f"Skipped {len(skipped_names)} files that aren't readable transcripts.",
+            fg="red",
+        )
+        sys.exit(1)
+    click.secho(f"Successfully compacted to {compression}.", fg="green")
 
 
 @convo_cli.group("transcripts")
@@ -292,9 +739,83 @@ def transcripts_group():
     default=False,
     help="Print file paths instead of file names.",
 )
-def transcripts_list(path: bool):
+@click.option(
+    "-s",
+    "--speaker",
+    "speakers",
+    multiple=True,
+    help="Only list transcripts in which all of these speakers took part.",
+)
+@click.option(
+    "-k",
+    "--keyword",
+    "keywords",
+    multiple=True,
+    help="Only list transcripts that have all of these keywords.",
+)
+@click.option(
+    "-d",
+    "--date",
+    help="Only list transcripts of conversations on this date.",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+)
+@click.option(
+    "--sort",
+    "sort_by",
+    type=click.Choice(convo.transcripts.SORT_KEYS),
+    default="name",
+    show_default=True,
+    help="Sort transcripts by name, conversation date, modification time or file size.",
+)
+@click.option(
+    "-r",
+    "--reverse",
+    is_flag=True,
+    default=False,
+    help="Sort in descending order.",
+)
+@click.option(
+    "-l",
+    "--limit",
+    type=click.IntRange(min=1),
+    help="Maximum number of transcripts to list.",
+)
+def transcripts_list(
+    path: bool,
+    speakers: tuple[str],
+    keywords: tuple[str],
+    date: datetime | None,
+    sort_by: convo.transcripts.SortKey,
+    reverse: bool,
+    limit: int | None,
+):
     """List all existing transcripts"""
-    click.echo("\n".join(convo.transcripts.list(path)) + "\n")
+    try:
+        transcript_names = convo.transcripts.list(
+            path,
+            speakers=list(speakers),
+            keywords=list(keywords),
+            date=date.date().strftime("%Y-%m-%d") if date else None,
+            sort_by=sort_by,
+            reverse=reverse,
+            limit=limit,
+        )
+    except Exception as e:
+        click.secho(e, fg="red")
+        sys.exit(1)
+
+    click.echo("\n".join(transcript_names) + "\n")
+
+
+def parse_timestamp(
+    ctx: click.Context, param: click.Parameter, value: str | None
+) -> float | None:
+    if value is None:
+        return None
+    try:
+        return convo.transcripts.parse_timestamp(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
 
 
 @transcripts_group.command("show")
@@ -334,6 +855,18 @@ def transcripts_list(path: bool):
     default=False,
     help="Print file paths instead of file content.",
 )
+@click.option(
+    "--from",
+    "start",
+    callback=parse_timestamp,
+    help="Print only what was said from this time of the recording on, e.g. 42:00 or 1:05:30.",
+)
+@click.option(
+    "--to",
+    "end",
+    callback=parse_timestamp,
+    help="Print only what was said before this time of the recording.",
+)
 def transcripts_show(
     transcript_name: str,
     summary: bool,
@@ -341,19 +874,129 @@ def transcripts_show(
     metadata: bool,
     json: bool,
     path: bool,
+    start: float | None,
+    end: float | None,
 ):
     """Show the complete or a specified part of a transcripts"""
-    try:
-        click.echo(
-            convo.transcripts.show(
-                transcript_name=transcript_name,
-                summary=summary,
-                content=content,
-                metadata=metadata,
-                path=path,
-                as_json=json,
+    if start is not None or end is not None:
+        flags = {
+            "--summary": summary,
+            "--content": content,
+            "--metadata": metadata,
+            "--json": json,
+            "--path": path,
+        }
+        if conflicting_flags := [flag for flag, value in flags.items() if value]:
+            raise click.UsageError(
+                f"--from and --to can't be combined with {', '.join(conflicting_flags)}."
+            )
+        if start is not None and end is not None and end <= start:
+            raise click.BadParameter(
+                "must be later than --from.", param_hint="'--to'"
             )
+
+    show_options = {
+        "transcript_name": transcript_name,
+        "summary": summary,
+        "content": content,
+        "metadata": metadata,
+        "path": path,
+        "as_json": json,
+        "start": start,
+        "end": end,
+    }
+    try:
+        try:
+            chunks = convo.transcripts.iter_show(**show_options)
+            first_chunk = next(chunks, "")
+        except convo.transcripts.MissingTimelineError:
+            # Transcripts created before timelines existed get theirs from
+            # the cached Deepgram response.
+            convo.ai.create_timeline(transcript_name)
+            chunks = convo.transcripts.iter_show(**show_options)
+            first_chunk = next(chunks, "")
+
+        # Write the transcript as it is read, so a pager can show the start of
+        # a long transcript right away.
+        click.echo(first_chunk, nl=False)
+        for chunk in chunks:
+            click.echo(chunk, nl=False)
+        click.echo()
+    except BrokenPipeError:
+        # The reader, e.g. `head`, exited before the transcript was complete.
+        # Point stdout at devnull, so flushing it on exit doesn't fail again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    except Exception as e:
+        click.secho(e, fg="red")
+        sys.exit(1)
+
+
+@transcripts_group.command("migrate")
+def transcripts_migrate():
+    """Rewrite transcripts of the old single JSON format, so their summary and metadata can be read without their content."""
+    try:
+        migrated_names, skipped_names = convo.transcripts.migrate()
+    except Exception as e:
+        click.secho(e, fg="red")
+        sys.exit(1)
+
+    for transcript_name in migrated_names:
+        click.echo(transcript_name)
+    click.secho(f"Migrated {len(migrated_names)} transcripts.", fg="green")
+    if skipped_names:
+        for transcript_name in skipped_names:
+            click.echo(transcript_name)
+        click.secho(
+            f"Skipped {len(skipped_names)} files that aren't readable transcripts.",
+            fg="red",
+        )
+        sys.exit(1)
+
+
+@transcripts_group.command("search")
+@click.argument("query")
+@click.option(
+    "-l",
+    "--limit",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="Maximum number of matching paragraphs to show.",
+)
+def transcripts_search(query: str, limit: int):
+    """Search the content of all transcripts for paragraphs that contain every word of the query."""
+    try:
+        hits = convo.transcripts.search(
+            query, limit=limit, highlight=("\x1b[1m", "\x1b[22m")
         )
     except Exception as e:
         click.secho(e, fg="red")
         sys.exit(1)
+
+    for hit in hits:
+        click.secho(f"{hit['name']} (paragraph {hit['paragraph']})", fg="green")
+        click.echo(f"{hit['snippet']}\n")
+
+
+@transcripts_group.command("remove")
+@click.argument("transcript_name")
+@click.option(
+    "-y",
+    "--yes",
+    is_flag=True,
+    default=False,
+    help="Remove the transcript without asking for confirmation.",
+)
+def transcripts_remove(transcript_name: str, yes: bool):
+    """Remove a transcript."""
+    if not yes:
+        click.confirm(f"Remove transcript '{transcript_name}'?", abort=True)
+
+    try:
+        convo.transcripts.remove(transcript_name)
+    except Exception as e:
+        click.secho(e, fg="red")
+        sys.exit(1)
+
+    click.secho(f"Successfully removed '{transcript_name}'.", fg="green")
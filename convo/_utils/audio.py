@@ -0,0 +1,446 @@
+import sys
+import math
+import wave
+from abc import ABC, abstractmethod
+from array import array
+from importlib.util import find_spec
+from itertools import accumulate, repeat
+from operator import mul, sub, truediv
+
+# Loudness is measured in short frames. A split point is the middle of the
+# quietest run of frames that is as long as a short pause between sentences.
+FRAME_SECONDS = 0.02
+PAUSE_SECONDS = 0.3
+# The split points are looked for this far before and after every multiple
+# of the segment length, so only a small part of the recording is read.
+SEARCH_SECONDS = 30.0
+COPY_CHUNK_FRAMES = 64 * 1024
+SAMPLE_TYPECODES = {2: "h", 4: "i"}
+# 8-bit WAV samples are unsigned.
+SIGNED_8_BIT = bytes((value - 128) % 256 for value in range(256))
+# Speech recognition doesn't gain anything from more than 16 kHz mono, which
+# is a sixth of the size of a 48 kHz stereo recording.
+CONVERSION_FRAME_RATE = 16000
+CONVERSION_CHUNK_FRAMES = 256 * 1024
+# Factors that bring the samples from `to_samples` to the scale of 16 bits.
+SAMPLE_SCALES = {1: 256, 2: 1, 3: 1, 4: 1 / 65536}
+# The low-pass filter of the NumPy converter has this many taps on each side
+# per step of the resampling, and passes frequencies up to 90% of the new
+# Nyquist frequency.
+LOWPASS_HALF_LENGTH = 8
+LOWPASS_CUTOFF = 0.45
+
+
+def is_wav(file_path: str) -> bool:
+    """
+    Returns:
+        bool: True if the file is a PCM WAV file that the standard library can read.
+    """
+    try:
+        with wave.open(file_path, "rb"):
+            return True
+    except (wave.Error, EOFError):
+        return False
+
+
+def find_split_points(
+    file_path: str, segment_seconds: float, search_seconds=SEARCH_SECONDS
+) -> list[float]:
+    """
+    Find the points at which a WAV file can be split into segments of about the same length without cutting through speech.
+
+    Every split point is the quietest pause within `search_seconds` of the point where the segment would end without looking for a pause. Only these parts of the recording are read.
+
+    Args:
+        file_path (str): A PCM WAV file.
+        segment_seconds (float): Length of the segments in seconds.
+        search_seconds (float, optional): How far from the end of a segment a pause is looked for. At most a quarter of the segment length. Default is 30 seconds.
+    Returns:
+        list[float]: The split points in seconds, in order. Empty if the recording isn't longer than a segment.
+    Raises:
+        ValueError: If `segment_seconds` isn't positive.
+        wave.Error: If the file isn't a PCM WAV file.
+    """
+    if not segment_seconds > 0:
+        raise ValueError("The segment length must be positive.")
+
+    with wave.open(file_path, "rb") as wav_file:
+        frame_rate = wav_file.getframerate()
+        frame_count = wav_file.getnframes()
+        segment_frames = max(1, round(segment_seconds * frame_rate))
+        search_frames = round(min(search_seconds, segment_seconds / 4) * frame_rate)
+
+        split_frames: list[int] = []
+        position = 0
+        while frame_count - position > segment_frames + search_frames:
+            target = position + segment_frames
+            position = find_quietest_frame(
+                wav_file, target - search_frames, target + search_frames
+            )
+            split_frames.append(position)
+
+    return [split_frame / frame_rate for split_frame in split_frames]
+
+
+def find_quietest_frame(
+    wav_file: wave.Wave_read, start_frame: int, end_frame: int
+) -> int:
+    """
+    Find the middle of the quietest pause between two frames of a WAV file.
+    """
+    wav_file.setpos(start_frame)
+    samples = to_samples(
+        wav_file.readframes(end_frame - start_frame), wav_file.getsampwidth()
+    )
+    frames_per_window = max(1, round(FRAME_SECONDS * wav_file.getframerate()))
+    samples_per_window = frames_per_window * wav_file.getnchannels()
+    energies = [
+        math.sumprod(window, window)
+        for window in (
+            samples[idx : idx + samples_per_window]
+            for idx in range(0, len(samples), samples_per_window)
+        )
+    ]
+    if not energies:
+        return start_frame
+
+    pause_windows = min(len(energies), max(1, round(PAUSE_SECONDS / FRAME_SECONDS)))
+    pause_energies = [sum(energies[:pause_windows])]
+    for idx in range(pause_windows, len(energies)):
+        pause_energies.append(
+            pause_energies[-1] + energies[idx] - energies[idx - pause_windows]
+        )
+    # Of equally quiet pauses, e.g. digital silence, the one closest to the
+    # middle of the range keeps the segments closest to their length.
+    middle = (len(pause_energies) - 1) / 2
+    quietest_window = min(
+        range(len(pause_energies)),
+        key=lambda idx: (pause_energies[idx], abs(idx - middle)),
+    )
+
+    middle_window = quietest_window + pause_windows // 2
+    return min(start_frame + middle_window * frames_per_window, end_frame)
+
+
+def to_samples(data: bytes, sample_width: int) -> array:
+    """
+    Convert PCM frames to signed samples. 24-bit samples keep their two most significant bytes, which is precise enough to tell speech from silence.
+    """
+    if sample_width == 1:
+        return array("b", data.translate(SIGNED_8_BIT))
+    if sample_width == 3:
+        high_bytes = bytearray(len(data) // 3 * 2)
+        high_bytes[0::2] = data[1::3]
+        high_bytes[1::2] = data[2::3]
+        data, sample_width = high_bytes, 2
+
+    samples = array(SAMPLE_TYPECODES[sample_width])
+    samples.frombytes(data)
+    # WAV files are little-endian.
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples
+
+
+def write_segment(
+    file_path: str, segment_file_path: str, start: float, end: float | None = None
+) -> None:
+    """
+    Copy a part of a WAV file into a WAV file of its own, in chunks so that long segments aren't read into memory at once.
+
+    Args:
+        file_path (str): A PCM WAV file.
+        segment_file_path (str): Where the segment is written.
+        start (float): Start of the segment in seconds.
+        end (float | None, optional): End of the segment in seconds. Defaults to the end of the recording.
+    """
+    with wave.open(file_path, "rb") as wav_file:
+        frame_rate = wav_file.getframerate()
+        start_frame = min(round(start * frame_rate), wav_file.getnframes())
+        end_frame = (
+            wav_file.getnframes()
+            if end is None
+            else min(round(end * frame_rate), wav_file.getnframes())
+        )
+
+        with wave.open(segment_file_path, "wb") as segment_file:
+            segment_file.setparams(wav_file.getparams())
+            segment_file.setnframes(max(0, end_frame - start_frame))
+            frame_size = wav_file.getsampwidth() * wav_file.getnchannels()
+            wav_file.setpos(start_frame)
+            remaining = end_frame - start_frame
+            while remaining > 0:
+                data = wav_file.readframes(min(COPY_CHUNK_FRAMES, remaining))
+                if not data:
+                    break
+                segment_file.writeframesraw(data)
+                remaining -= len(data) // frame_size
+
+
+def needs_conversion(file_path: str, frame_rate=CONVERSION_FRAME_RATE) -> bool:
+    """
+    Returns:
+        bool: True if the file is a PCM WAV file that gets smaller when it is converted with `convert_wav`.
+    """
+    try:
+        with wave.open(file_path, "rb") as wav_file:
+            frame_count = wav_file.getnframes()
+            size = frame_count * wav_file.getnchannels() * wav_file.getsampwidth()
+            converted_frame_rate = min(wav_file.getframerate(), frame_rate)
+            converted_size = (
+                frame_count * converted_frame_rate / wav_file.getframerate() * 2
+            )
+    except (wave.Error, EOFError):
+        return False
+    return converted_size < size
+
+
+def convert_wav(
+    file_path: str, converted_file_path: str, frame_rate=CONVERSION_FRAME_RATE
+) -> None:
+    """
+    Downmix a WAV file to mono 16-bit samples and resample it to at most `frame_rate`.
+
+    The file is converted in chunks, so it is never in memory as a whole. The conversion is vectorized with NumPy if it is installed and falls back to a slower implementation with the standard library otherwise.
+
+    Args:
+        file_path (str): A PCM WAV file.
+        converted_file_path (str): Where the converted file is written.
+        frame_rate (int, optional): Maximum frame rate of the converted file. Recordings with a lower frame rate keep it. Default is 16 kHz.
+    Raises:
+        wave.Error: If the file isn't a PCM WAV file.
+    """
+    with wave.open(file_path, "rb") as wav_file, wave.open(
+        converted_file_path, "wb"
+    ) as converted_file:
+        converted_frame_rate = min(wav_file.getframerate(), frame_rate)
+        converted_file.setnchannels(1)
+        converted_file.setsampwidth(2)
+        converted_file.setframerate(converted_frame_rate)
+
+        converter_class = (
+            NumpyConverter if find_spec("numpy") is not None else ArrayConverter
+        )
+        converter = converter_class(
+            wav_file.getnchannels(),
+            wav_file.getsampwidth(),
+            wav_file.getframerate(),
+            converted_frame_rate,
+        )
+        while data := wav_file.readframes(CONVERSION_CHUNK_FRAMES):
+            converted_file.writeframesraw(converter.convert(data))
+        converted_file.writeframesraw(converter.flush())
+
+
+class Converter(ABC):
+    """
+    Downmix and resample consecutive chunks of PCM frames to mono 16-bit samples.
+
+    Before the frame rate is lowered, a low-pass filter removes the frequencies that the lower frame rate can't represent. The converted samples are interpolated linearly between the filtered samples. The filter and the interpolation carry their state from chunk to chunk, so the result doesn't depend on the chunk size.
+    """
+
+    def __init__(
+        self,
+        channels: int,
+        sample_width: int,
+        frame_rate: int,
+        converted_frame_rate: int,
+        filter_length: int,
+    ):
+        self.channels = channels
+        self.sample_width = sample_width
+        self.step = frame_rate / converted_frame_rate
+        self.filter_length = filter_length
+        # The filter delays the samples by half its length. Starting there
+        # keeps the converted audio in sync with the original.
+        self.position = (filter_length - 1) / 2
+
+    @abstractmethod
+    def convert(self, data: bytes) -> bytes:
+        """
+        Convert a chunk of frames. Frames that the filter and the interpolation still need are held back until the next chunk.
+
+        Returns:
+            bytes: The converted mono 16-bit samples.
+        """
+
+    def flush(self) -> bytes:
+        """
+        Convert the samples that are still held back by the filter and the interpolation.
+        """
+        silence = b"\x80" if self.sample_width == 1 else b"\x00"
+        return self.convert(
+            silence * (self.filter_length // 2 + 1) * self.channels * self.sample_width
+        )
+
+    def take_positions(self, sample_count: int) -> tuple[float, int]:
+        """
+        Take the positions of the converted samples that can be interpolated from `sample_count` filtered samples.
+
+        Returns:
+            tuple[float, int]: The position of the first converted sample and the number of converted samples.
+        """
+        count = max(0, math.ceil((sample_count - 1 - self.position) / self.step))
+        first_position = self.position
+        self.position += count * self.step
+        return first_position, count
+
+    def drop_samples(self, sample_count: int) -> int:
+        """
+        Returns:
+            int: The number of the `sample_count` filtered samples that no later converted sample needs.
+        """
+        dropped = min(int(self.position), sample_count)
+        self.position -= dropped
+        return dropped
+
+
+class NumpyConverter(Converter):
+    def __init__(
+        self,
+        channels: int,
+        sample_width: int,
+        frame_rate: int,
+        converted_frame_rate: int,
+    ):
+        import numpy as np
+
+        step = frame_rate / converted_frame_rate
+        if step > 1:
+            # A windowed sinc filter with its cutoff a little below the new
+            # Nyquist frequency.
+            half_length = LOWPASS_HALF_LENGTH * math.ceil(step)
+            cutoff = LOWPASS_CUTOFF / step
+            offsets = np.arange(-half_length, half_length + 1)
+            self.taps = (
+                2 * cutoff * np.sinc(2 * cutoff * offsets) * np.hamming(len(offsets))
+            )
+            self.taps /= self.taps.sum()
+        else:
+            self.taps = np.ones(1)
+
+        super().__init__(
+            channels, sample_width, frame_rate, converted_frame_rate, len(self.taps)
+        )
+        self.history = np.zeros(len(self.taps) - 1)
+        self.samples = np.zeros(0)
+
+    def convert(self, data: bytes) -> bytes:
+        import numpy as np
+
+        samples = self.decode(data).reshape(-1, self.channels).mean(axis=1)
+        padded = np.concatenate([self.history, samples])
+        self.history = padded[len(padded) - (len(self.taps) - 1) :]
+        self.samples = np.concatenate(
+            [self.samples, np.convolve(padded, self.taps, mode="valid")]
+        )
+
+        first_position, count = self.take_positions(len(self.samples))
+        positions = first_position + np.arange(count) * self.step
+        indices = positions.astype(np.int64)
+        fractions = positions - indices
+        next_indices = np.minimum(indices + 1, len(self.samples) - 1)
+        converted = (
+            self.samples[indices] * (1 - fractions)
+            + self.samples[next_indices] * fractions
+        )
+        self.samples = self.samples[self.drop_samples(len(self.samples)) :]
+
+        return np.clip(np.rint(converted), -32768, 32767).astype("<i2").tobytes()
+
+    def decode(self, data: bytes):
+        """
+        Decode PCM frames into samples on the scale of 16-bit samples.
+        """
+        import numpy as np
+
+        if self.sample_width == 1:
+            return (np.frombuffer(data, np.uint8).astype(np.float64) - 128) * 256
+        if self.sample_width == 3:
+            data_bytes = np.frombuffer(data, np.uint8).reshape(-1, 3).astype(np.int32)
+            samples = (
+                data_bytes[:, 0] | data_bytes[:, 1] << 8 | data_bytes[:, 2] << 16
+            )
+            samples = np.where(samples >= 1 << 23, samples - (1 << 24), samples)
+            return samples / 256
+        if self.sample_width == 4:
+            return np.frombuffer(data, "<i4") / 65536
+        return np.frombuffer(data, "<i2").astype(np.float64)
+
+
+class ArrayConverter(Converter):
+    """
+    A converter that only needs the standard library. It filters with a moving average, which is cheaper but lets more of the removed frequencies through than the filter of `NumpyConverter`.
+    """
+
+    def __init__(
+        self,
+        channels: int,
+        sample_width: int,
+        frame_rate: int,
+        converted_frame_rate: int,
+    ):
+        step = frame_rate / converted_frame_rate
+        super().__init__(
+            channels,
+            sample_width,
+            frame_rate,
+            converted_frame_rate,
+            round(step) if step > 1 else 1,
+        )
+        self.history = [0.0] * (self.filter_length - 1)
+        self.samples: list[float] = []
+
+    def convert(self, data: bytes) -> bytes:
+        samples = to_samples(data, self.sample_width)
+        scale = SAMPLE_SCALES[self.sample_width]
+        if self.channels > 1:
+            scale /= self.channels
+            samples = map(
+                sum,
+                zip(*(samples[idx :: self.channels] for idx in range(self.channels))),
+            )
+        padded = self.history + list(map(mul, samples, repeat(scale)))
+
+        if self.filter_length > 1:
+            self.history = padded[len(padded) - (self.filter_length - 1) :]
+            sums = list(accumulate(padded, initial=0.0))
+            self.samples.extend(
+                map(
+                    truediv,
+                    map(sub, sums[self.filter_length :], sums),
+                    repeat(self.filter_length),
+                )
+            )
+        else:
+            self.samples.extend(padded)
+
+        first_position, count = self.take_positions(len(self.samples))
+        if self.step.is_integer() and first_position.is_integer():
+            start, step = int(first_position), int(self.step)
+            converted = self.samples[start : start + count * step : step]
+        else:
+            converted = []
+            for idx in range(count):
+                position = first_position + idx * self.step
+                index = int(position)
+                fraction = position - index
+                converted.append(
+                    self.samples[index] * (1 - fraction)
+                    + self.samples[index + 1] * fraction
+                )
+        del self.samples[: self.drop_samples(len(self.samples))]
+
+        # Full-scale samples of wider formats, the channel sums and the
+        # interpolation can round to just outside of the 16-bit range.
+        converted_samples = array(
+            "h",
+            map(
+                min,
+                repeat(32767),
+                map(max, repeat(-32768), map(round, converted)),
+            ),
+        )
+        if sys.byteorder == "big":
+            converted_samples.byteswap()
+        return converted_samples.tobytes()
@@ -0,0 +1,220 @@
+import io
+from typing import BinaryIO
+from convo import config
+
+# Compressed files are recognized by the magic bytes every format starts
+# with, so files of all formats can live side by side and nothing else has to
+# record how a file was written. Uncompressed convo files start with "{" or
+# a plain text magic line, which never collides with these.
+MAGIC_BYTES: dict[config.Compression, bytes] = {
+    "gzip": b"\x1f\x8b",
+    "lzma": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+MAGIC_SIZE = max(len(magic) for magic in MAGIC_BYTES.values())
+# Responses are written once in the background and read many times, so the
+# levels lean towards size. lzma only pays off at its strongest presets. See
+# benchmarks/compression.py.
+LEVELS: dict[config.Compression, int] = {"gzip": 6, "lzma": 6, "zstd": 9}
+SKIP_CHUNK_SIZE = 64 * 1024
+
+
+def get_compression() -> config.Compression:
+    """
+    Returns:
+        Compression: The compression of newly written cache entries and transcripts, as configured in config.json.
+    """
+    try:
+        return config.get_config_data().get(
+            "compression", config.DEFAULT_COMPRESSION
+        )
+    except FileNotFoundError:
+        return config.DEFAULT_COMPRESSION
+
+
+def detect(data: bytes) -> config.Compression:
+    """
+    Detect the compression of data from its first bytes.
+    """
+    for compression, magic in MAGIC_BYTES.items():
+        if data.startswith(magic):
+            return compression
+    return "none"
+
+
+def compress(data: bytes, compression: config.Compression) -> bytes:
+    if compression == "gzip":
+        import gzip
+
+        # A fixed mtime makes the output depend only on the data.
+        return gzip.compress(data, compresslevel=LEVELS["gzip"], mtime=0)
+    if compression == "lzma":
+        import lzma
+
+        return lzma.compress(data, preset=LEVELS["lzma"])
+    if compression == "zstd":
+        return import_zstandard().ZstdCompressor(level=LEVELS["zstd"]).compress(
+            data
+        )
+    return data
+
+
+def decompress(data: bytes) -> bytes:
+    """
+    Decompress data of any supported compression. Uncompressed data is returned as it is.
+
+    Raises:
+        ModuleNotFoundError: If the data is compressed with zstd and zstandard isn't installed.
+    """
+    compression = detect(data)
+    if compression == "gzip":
+        import gzip
+
+        return gzip.decompress(data)
+    if compression == "lzma":
+        import lzma
+
+        return lzma.decompress(data)
+    if compression == "zstd":
+        # Frames written by the streaming writer don't record their size.
+        with import_zstandard().ZstdDecompressor().stream_reader(data) as reader:
+            return reader.read()
+    return data
+
+
+def open_reader(file: BinaryIO) -> BinaryIO:
+    """
+    Wrap a file opened in binary mode, so reading it yields the decompressed data. Uncompressed files are returned as they are.
+
+    Only as much of the file is decompressed as is read, so reading the start of a large file stays cheap. The returned reader can only seek back to its start.
+
+    Raises:
+        ModuleNotFoundError: If the file is compressed with zstd and zstandard isn't installed.
+    """
+    compression = detect(file.read(MAGIC_SIZE))
+    file.seek(0)
+    if compression == "gzip":
+        import gzip
+
+        return gzip.GzipFile(fileobj=file, mode="rb")
+    if compression == "lzma":
+        import lzma
+
+        return lzma.LZMAFile(file, "rb")
+    if compression == "zstd":
+        return ZstdReader(file)
+    return file
+
+
+def open_writer(file: BinaryIO, compression: config.Compression) -> BinaryIO:
+    """
+    Wrap a file opened in binary mode, so the data written to it is compressed. Closing the writer finishes the compressed stream but leaves the file open.
+    """
+    if compression == "gzip":
+        import gzip
+
+        return gzip.GzipFile(
+            fileobj=file, mode="wb", compresslevel=LEVELS["gzip"], mtime=0
+        )
+    if compression == "lzma":
+        import lzma
+
+        return lzma.LZMAFile(file, "wb", preset=LEVELS["lzma"])
+    if compression == "zstd":
+        return import_zstandard().ZstdCompressor(
+            level=LEVELS["zstd"]
+        ).stream_writer(file, closefd=False)
+    return UnclosedFile(file)
+
+
+class ZstdReader(io.BufferedIOBase):
+    """
+    Decompress a zstd file as it is read.
+
+    zstandard's reader can neither read lines nor seek backwards. This one can, seeking backwards starts decompressing from the beginning again.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self._file = file
+        self._start = file.tell()
+        self._restart()
+
+    def _restart(self) -> None:
+        self._file.seek(self._start)
+        self._reader = io.BufferedReader(
+            import_zstandard()
+            .ZstdDecompressor()
+            .stream_reader(self._file, closefd=False)
+        )
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def read(self, size: int | None = -1) -> bytes:
+        data = self._reader.read(size)
+        self._position += len(data)
+        return data
+
+    def read1(self, size: int = -1) -> bytes:
+        data = self._reader.read1(size)
+        self._position += len(data)
+        return data
+
+    def readline(self, size: int | None = -1) -> bytes:
+        line = self._reader.readline(size)
+        self._position += len(line)
+        return line
+
+    def seek(self, offset: int, whence=io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("Can't seek relative to the end.")
+
+        if offset < self._position:
+            self._restart()
+        while self._position < offset and self.read(
+            min(offset - self._position, SKIP_CHUNK_SIZE)
+        ):
+            pass
+        return self._position
+
+    def close(self) -> None:
+        self._reader.close()
+        super().close()
+
+
+class UnclosedFile(io.BufferedIOBase):
+    """
+    Write through to a file without closing it, so uncompressed files can be written like compressed ones.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self._file = file
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        return self._file.write(data)
+
+
+def import_zstandard():
+    """
+    Raises:
+        ModuleNotFoundError: If zstandard isn't installed.
+    """
+    try:
+        import zstandard
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError(
+            'zstd compression needs zstandard. Install it with `pip3 install -e ".[zstd]"`.'
+        ) from e
+    return zstandard
@@ -1,4 +1,8 @@
 import os
+import sys
+
+# OpenAI models use roughly one token per four characters of English text.
+CHARACTERS_PER_TOKEN = 4
 
 
 def get_file_name(file_path: str) -> str:
@@ -15,3 +19,27 @@ def list_to_str(values: list[str]) -> str:
         )
 
     return result
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARACTERS_PER_TOKEN + 1
+
+
+class LazyModule:
+    """
+    Stands in for a module that is slow to import and only imported once one of its attributes is used.
+
+    Code that only runs once the module is in use, like coroutines that run in an event loop which has imported asyncio already, can use it like the module without importing it at startup or in every function.
+    """
+
+    __slots__ = ("_name",)
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attribute: str):
+        if (module := sys.modules.get(self._name)) is None:
+            import importlib
+
+            module = importlib.import_module(self._name)
+        return getattr(module, attribute)
@@ -1,5 +1,87 @@
-from ._internal.transcript import create_transcript
+from ._internal.transcript import (
+    create_timeline,
+    create_transcript,
+    create_transcript_async,
+    find_transcript,
+)
+from ._internal.batch import (
+    DEFAULT_STAGE_WORKERS,
+    create_pipeline,
+    create_transcripts,
+)
+from ._internal.cache import compact_caches
+from ._internal.clients import DEFAULT_CLIENT_OPTIONS, set_client_options
+from ._internal.concurrency import (
+    DEFAULT_PROVIDER_LIMITS,
+    get_provider_stats,
+    set_provider_limit,
+    set_rate_limits,
+)
 from ._internal.context import get_context
-from ._internal.open_ai import query
+from ._internal.deepgram import (
+    get_conversion_stats,
+    render_transcript,
+    transcribe_async,
+)
+from ._internal.open_ai import (
+    DEFAULT_EXCERPT_COUNT,
+    query,
+    query_async,
+    summarize_async,
+)
+from ._internal.pipeline import DEFAULT_QUEUE_SIZE, Pipeline
+from ._internal.response import TranscriptionResult
+from ._internal.types import (
+    BatchResult,
+    ClientOptions,
+    ConversionStats,
+    Excerpt,
+    ProviderStats,
+    StageStats,
+    TranscriptJob,
+    TranscriptStage,
+)
+from ._internal.vectors import (
+    EmbeddingFunction,
+    search_excerpts,
+    set_embedding_function,
+)
 
-__all__ = ["create_transcript", "get_context", "query"]
+__all__ = [
+    "BatchResult",
+    "ClientOptions",
+    "compact_caches",
+    "ConversionStats",
+    "DEFAULT_CLIENT_OPTIONS",
+    "DEFAULT_EXCERPT_COUNT",
+    "DEFAULT_PROVIDER_LIMITS",
+    "DEFAULT_QUEUE_SIZE",
+    "DEFAULT_STAGE_WORKERS",
+    "create_pipeline",
+    "create_timeline",
+    "create_transcript",
+    "create_transcript_async",
+    "create_transcripts",
+    "EmbeddingFunction",
+    "Excerpt",
+    "find_transcript",
+    "get_context",
+    "get_conversion_stats",
+    "get_provider_stats",
+    "Pipeline",
+    "ProviderStats",
+    "query",
+    "query_async",
+    "render_transcript",
+    "search_excerpts",
+    "set_client_options",
+    "set_embedding_function",
+    "set_provider_limit",
+    "set_rate_limits",
+    "StageStats",
+    "summarize_async",
+    "transcribe_async",
+    "TranscriptionResult",
+    "TranscriptJob",
+    "TranscriptStage",
+]
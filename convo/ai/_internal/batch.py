@@ -0,0 +1,226 @@
+import os
+import glob
+from datetime import datetime
+from typing import Callable, Iterable
+from convo import config
+from convo._utils import utils
+from . import concurrency, journal
+from .pipeline import DEFAULT_QUEUE_SIZE, Pipeline
+from .transcript import TRANSCRIPT_STAGES, create_job, get_transcript_file_name
+from .types import BatchResult, TranscriptJob, TranscriptStage
+
+# The network bound stages mostly wait on the providers, so they get several
+# workers. Decoding is CPU bound and writes to the indexes are serialized by
+# SQLite anyway, so more than one worker doesn't help them.
+DEFAULT_STAGE_WORKERS: dict[TranscriptStage, int] = {
+    "upload": 4,
+    "transcribe": 1,
+    "summarize": 4,
+    "persist": 1,
+}
+GLOB_CHARACTERS = "*?["
+
+
+def expand_audio_file_paths(patterns: Iterable[str]) -> tuple[list[str], list[str]]:
+    """
+    Expand glob patterns into audio file paths.
+
+    Args:
+        patterns (Iterable[str]): Audio file paths or glob patterns like `recordings/**/*.m4a`.
+    Returns:
+        tuple[list[str], list[str]]: Unique audio file paths in the order they were given, and the glob patterns that match no file.
+    """
+    audio_file_paths = []
+    unmatched_patterns = []
+    seen_paths = set()
+    for pattern in patterns:
+        if any(character in pattern for character in GLOB_CHARACTERS):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                unmatched_patterns.append(pattern)
+        else:
+            matches = [pattern]
+
+        for audio_file_path in matches:
+            absolute_path = os.path.abspath(audio_file_path)
+            if absolute_path not in seen_paths:
+                seen_paths.add(absolute_path)
+                audio_file_paths.append(audio_file_path)
+
+    return audio_file_paths, unmatched_patterns
+
+
+def find_name_conflicts(audio_file_paths: list[str]) -> dict[str, Exception]:
+    """
+    Find audio files whose transcripts would be written to the same file, like `a/meeting.wav` and `b/meeting.wav`.
+
+    Returns:
+        dict[str, Exception]: The error of every audio file that shares its transcript file name with another one.
+    """
+    paths_by_name: dict[str, list[str]] = {}
+    for audio_file_path in audio_file_paths:
+        paths_by_name.setdefault(
+            get_transcript_file_name(audio_file_path), []
+        ).append(audio_file_path)
+
+    errors = {}
+    for transcript_file_name, paths in paths_by_name.items():
+        if len(paths) > 1:
+            quoted_paths = [f"'{path}'" for path in paths]
+            error = ValueError(
+                f"The transcripts of {utils.list_to_str(quoted_paths)} "
+                f"would all be written to '{transcript_file_name}'. Rename the audio files "
+                "or transcribe them in separate batches."
+            )
+            errors.update((path, error) for path in paths)
+    return errors
+
+
+def get_file_size(file_path: str) -> int:
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return -1
+
+
+def get_modification_date(file_path: str) -> str:
+    try:
+        modification_time = os.path.getmtime(file_path)
+    except OSError:
+        modification_time = datetime.now().timestamp()
+    return datetime.fromtimestamp(modification_time).strftime("%Y-%m-%d")
+
+
+def create_pipeline(
+    stage_workers: dict[TranscriptStage, int] | None = None,
+    queue_size=DEFAULT_QUEUE_SIZE,
+) -> Pipeline[TranscriptJob]:
+    """
+    Create the pipeline that transcribes audio files in stages: upload to Deepgram, decode the transcript, summarize it with OpenAI and write it to disk.
+
+    Args:
+        stage_workers (dict[TranscriptStage, int] | None, optional): Number of workers per stage. Stages that are missing use `DEFAULT_STAGE_WORKERS`.
+        queue_size (int, optional): Maximum number of files waiting in front of each stage. Default is 4.
+    """
+    stage_workers = {**DEFAULT_STAGE_WORKERS, **(stage_workers or {})}
+    return Pipeline(
+        [
+            (stage, run_stage, stage_workers[stage])
+            for stage, run_stage in TRANSCRIPT_STAGES
+        ],
+        queue_size=queue_size,
+    )
+
+
+def create_transcripts(
+    audio_file_paths: list[str],
+    speakers: list[str],
+    keywords: list[str],
+    date: str | None = None,
+    cache=False,
+    summary_cache=True,
+    pipeline: Pipeline[TranscriptJob] | None = None,
+    provider_limits: dict[config.Provider, int] | None = None,
+    on_result: Callable[[BatchResult], None] | None = None,
+    segment_seconds: float | None = None,
+    resume=True,
+) -> list[BatchResult]:
+    """
+    Transcribe many audio files concurrently.
+
+    The files run through a pipeline, so one file can be uploaded to Deepgram while another one is summarized by OpenAI. The largest (and usually longest) recordings enter the pipeline first so that no worker is left with a single long file at the end of the batch.
+
+    Args:
+        audio_file_paths (list[str]): Audio file paths or glob patterns.
+        speakers (list[str]): The conversation participants, shared by all files.
+        keywords (list[str]): Important keywords, shared by all files.
+        date (str | None, optional): Date of the conversations. Defaults to the modification date of each file.
+        cache (bool, optional): If True, use cached Deepgram responses. Default is False.
+        summary_cache (bool, optional): If False, request new summaries even if they are cached. Default is True.
+        pipeline (Pipeline[TranscriptJob] | None, optional): A pipeline from `create_pipeline`, e.g. to tune the workers per stage or to watch its queue depths. Defaults to a pipeline with `DEFAULT_STAGE_WORKERS`.
+        provider_limits (dict[Provider, int] | None, optional): Maximum number of concurrent requests per AI provider.
+        on_result (Callable[[BatchResult], None] | None, optional): Called as soon as a file has been processed.
+        segment_seconds (float | None, optional): If set, WAV recordings longer than this are split at pauses and their segments are transcribed concurrently.
+        resume (bool, optional): If True, files whose jobs failed or were interrupted in an earlier batch resume after their last completed stage, and files that were transcribed already are skipped as long as their transcript files are unchanged. Their results have `skipped` set. If False, every file runs through every stage. Default is True.
+    Returns:
+        list[BatchResult]: One failed result per glob pattern that matches no file, followed by one result per audio file in the order they were given. Audio files whose transcripts would be written to the same file fail without being transcribed, see `find_name_conflicts`.
+    Raises:
+        FileNotFoundError: If the patterns match no audio file at all.
+    """
+    expanded_paths, unmatched_patterns = expand_audio_file_paths(audio_file_paths)
+    if not expanded_paths:
+        raise FileNotFoundError(
+            "No audio files match "
+            + ", ".join(f"'{pattern}'" for pattern in unmatched_patterns)
+            + "."
+        )
+
+    for provider, limit in (provider_limits or {}).items():
+        concurrency.set_provider_limit(provider, limit)
+
+    journal.prune()
+    name_conflicts = find_name_conflicts(expanded_paths)
+    scheduled_paths = sorted(
+        (path for path in expanded_paths if path not in name_conflicts),
+        key=get_file_size,
+        reverse=True,
+    )
+    jobs = [
+        create_job(
+            audio_file_path,
+            speakers,
+            keywords,
+            date or get_modification_date(audio_file_path),
+            cache=cache,
+            summary_cache=summary_cache,
+            segment_seconds=segment_seconds,
+            resume=resume,
+        )
+        for audio_file_path in scheduled_paths
+    ]
+
+    results: dict[str, BatchResult] = {}
+
+    def on_done(job: TranscriptJob, error: Exception | None, skipped=False):
+        result: BatchResult = {
+            "audio_file_path": job["audio_file_path"],
+            "transcript_file_path": job.get("transcript_file_path"),
+            "error": error,
+            "skipped": skipped,
+        }
+        results[job["audio_file_path"]] = result
+        if on_result:
+            on_result(result)
+
+    for pattern in unmatched_patterns:
+        results[pattern] = {
+            "audio_file_path": pattern,
+            "transcript_file_path": None,
+            "error": FileNotFoundError("No audio files match the pattern."),
+            "skipped": False,
+        }
+        if on_result:
+            on_result(results[pattern])
+
+    for audio_file_path, error in name_conflicts.items():
+        results[audio_file_path] = {
+            "audio_file_path": audio_file_path,
+            "transcript_file_path": None,
+            "error": error,
+            "skipped": False,
+        }
+        if on_result:
+            on_result(results[audio_file_path])
+
+    pending_jobs = []
+    for job in jobs:
+        if "transcript_file_path" in job:
+            on_done(job, None, skipped=True)
+        else:
+            pending_jobs.append(job)
+    (pipeline or create_pipeline()).run(pending_jobs, on_done)
+
+    return [
+        results[audio_file_path]
+        for audio_file_path in [*unmatched_patterns, *expanded_paths]
+    ]
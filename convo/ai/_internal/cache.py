@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, Mapping, TypedDict
+from convo import config
+from convo._utils import codec
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+INDEX_FILE_NAME = "index.json"
+# The index is replaced on every write, so the lock lives in a file of its own.
+INDEX_LOCK_FILE_NAME = f"{INDEX_FILE_NAME}.lock"
+INDEX_VERSION = 1
+# Hits only update the access times in memory. They are written to the index
+# along with the next change, at exit, or once they are this old.
+ACCESS_FLUSH_SECONDS = 30
+
+
+class CacheEntry(TypedDict):
+    file_name: str
+    size: int
+    last_access: float
+
+
+class CacheIndex(TypedDict):
+    version: int
+    entries: dict[str, CacheEntry]
+
+
+def hash_file(file_path: str) -> str:
+    """
+    Hash the content of a file without loading it into memory at once.
+    """
+    with open(file_path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def hash_options(options: Mapping[str, Any]) -> str:
+    serialized_options = json.dumps(options, sort_keys=True, default=str)
+    return hashlib.sha256(serialized_options.encode()).hexdigest()
+
+
+def write_file(file_path: str, data: bytes) -> None:
+    """
+    Write a file to a temporary file of its own and move it over the file, so readers in other threads and processes see either the old or the new file but never a partial one.
+    """
+    import tempfile
+
+    file_descriptor, temp_file_path = tempfile.mkstemp(
+        dir=os.path.dirname(file_path),
+        prefix=f".{os.path.basename(file_path)}.",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(data)
+        os.replace(temp_file_path, file_path)
+    except BaseException:
+        os.remove(temp_file_path)
+        raise
+
+
+def get_size_limit() -> int:
+    """
+    Returns:
+        int: The maximum size of a cache in bytes, as configured in config.json.
+    """
+    try:
+        size_limit_mb = config.get_config_data().get(
+            "cache_size_limit_mb", config.DEFAULT_CACHE_SIZE_LIMIT_MB
+        )
+    except FileNotFoundError:
+        size_limit_mb = config.DEFAULT_CACHE_SIZE_LIMIT_MB
+    return size_limit_mb * 1024 * 1024
+
+
+class ContentCache:
+    """
+    A directory of cached files that are addressed by a key and tracked in an index file.
+
+    Lookups only read the index, they never list the directory. When the total size of all entries exceeds the configured limit, the least recently used entries are evicted. Entries are written with the configured compression and decompressed transparently, whatever compression they were written with.
+
+    Several processes can share a cache. Every read-modify-write of the index holds an exclusive `flock`, which isn't available on Windows, where only threads of the same process are excluded. Hits don't rewrite the index, their access times are written lazily, so another process may evict an entry that was used a moment ago.
+    """
+
+    def __init__(self, name: str, extension=".json"):
+        self.dir_path = os.path.join(config.CACHE_DIR_PATH, name)
+        self.index_file_path = os.path.join(self.dir_path, INDEX_FILE_NAME)
+        self.lock_file_path = os.path.join(self.dir_path, INDEX_LOCK_FILE_NAME)
+        self.extension = extension
+        self._lock = threading.Lock()
+        self._access_times: dict[str, float] = {}
+        self._flushed_at = time.monotonic()
+        atexit.register(self.flush)
+
+    def get_file_path(self, key: str) -> str:
+        return os.path.join(self.dir_path, f"{key}{self.extension}")
+
+    def get(self, key: str) -> bytes | None:
+        """
+        Read a cached entry and mark it as recently used.
+
+        Returns:
+            bytes | None: The cached data or None if the key isn't cached.
+        """
+        with self._lock_index():
+            index = self._read_index()
+            if key not in index["entries"]:
+                return None
+
+            try:
+                with open(self.get_file_path(key), "rb") as file:
+                    data = file.read()
+            except FileNotFoundError:
+                del index["entries"][key]
+                self._write_index(index)
+                return None
+
+            self._access_times[key] = time.time()
+            if time.monotonic() - self._flushed_at >= ACCESS_FLUSH_SECONDS:
+                self._write_index(index)
+
+        return codec.decompress(data)
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Store an entry and evict the least recently used entries if the cache grew beyond its size limit.
+        """
+        size_limit = get_size_limit()
+        data = codec.compress(data, codec.get_compression())
+        with self._lock_index(create=True):
+            write_file(self.get_file_path(key), data)
+
+            index = self._read_index()
+            index["entries"][key] = {
+                "file_name": os.path.basename(self.get_file_path(key)),
+                "size": len(data),
+                "last_access": time.time(),
+            }
+            self._apply_access_times(index["entries"])
+            self._evict(index, size_limit, keep=key)
+            self._write_index(index)
+
+    def find_keys(self, prefix: str) -> list[str]:
+        """
+        Returns:
+            list[str]: Keys starting with the prefix, most recently used first.
+        """
+        with self._lock_index():
+            entries = self._read_index()["entries"]
+            self._apply_access_times(entries)
+
+        keys = [key for key in entries if key.startswith(prefix)]
+        return sorted(
+            keys, key=lambda key: entries[key]["last_access"], reverse=True
+        )
+
+    def remove(self, key: str) -> None:
+        with self._lock_index():
+            index = self._read_index()
+            if index["entries"].pop(key, None) is not None:
+                self._remove_file(key)
+                self._write_index(index)
+
+    def compact(self, compression: config.Compression) -> tuple[int, int]:
+        """
+        Rewrite all entries that were written with another compression.
+
+        Returns:
+            tuple[int, int]: Total size of all entries in bytes before and after.
+        """
+        size_before = size_after = 0
+        with self._lock_index():
+            if not os.path.exists(self.index_file_path):
+                return size_before, size_after
+
+            index = self._read_index()
+            for key, entry in [*index["entries"].items()]:
+                # The entry knows its file name, so caches can be compacted
+                # without knowing the extension they were created with.
+                file_path = os.path.join(self.dir_path, entry["file_name"])
+                try:
+                    with open(file_path, "rb") as file:
+                        data = file.read()
+                except FileNotFoundError:
+                    del index["entries"][key]
+                    continue
+
+                size_before += len(data)
+                if codec.detect(data) != compression:
+                    data = codec.compress(codec.decompress(data), compression)
+                    write_file(file_path, data)
+                entry["size"] = len(data)
+                size_after += len(data)
+
+            self._write_index(index)
+
+        return size_before, size_after
+
+    def flush(self) -> None:
+        """
+        Write the access times of the hits that haven't been written to the index yet.
+        """
+        if not self._access_times:
+            return
+        with self._lock_index():
+            if os.path.exists(self.index_file_path):
+                self._write_index(self._read_index())
+
+    @contextmanager
+    def _lock_index(self, create=False) -> Iterator[None]:
+        """
+        Hold an exclusive lock on the index for the duration of the context, across threads and processes. A cache whose directory doesn't exist has no index to protect, so it is only created if `create` is True.
+        """
+        with self._lock:
+            if create:
+                os.makedirs(self.dir_path, exist_ok=True)
+            if fcntl is None or not os.path.isdir(self.dir_path):
+                yield
+                return
+
+            with open(self.lock_file_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _apply_access_times(self, entries: dict[str, CacheEntry]) -> None:
+        for key, last_access in self._access_times.items():
+            if key in entries:
+                entries[key]["last_access"] = max(
+                    entries[key]["last_access"], last_access
+                )
+
+    def _evict(self, index: CacheIndex, size_limit: int, keep: str) -> None:
+        entries = index["entries"]
+        total_size = sum(entry["size"] for entry in entries.values())
+        for key in sorted(entries, key=lambda key: entries[key]["last_access"]):
+            if total_size <= size_limit:
+                break
+            if key == keep:
+                continue
+            total_size -= entries.pop(key)["size"]
+            self._remove_file(key)
+
+    def _remove_file(self, key: str) -> None:
+        try:
+            os.remove(self.get_file_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _read_index(self) -> CacheIndex:
+        try:
+            with open(self.index_file_path, "r") as file:
+                index: CacheIndex = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"version": INDEX_VERSION, "entries": {}}
+
+        return index
+
+    def _write_index(self, index: CacheIndex) -> None:
+        """
+        Write the index along with the pending access times. Has to be called under `_lock_index` with an index that was read under the same lock.
+        """
+        self._apply_access_times(index["entries"])
+        write_file(self.index_file_path, json.dumps(index).encode())
+        self._access_times.clear()
+        self._flushed_at = time.monotonic()
+
+
+def compact_caches(compression: config.Compression) -> dict[str, tuple[int, int]]:
+    """
+    Rewrite the entries of all caches with a compression.
+
+    Args:
+        compression (Compression): The compression to convert the entries to. "none" decompresses them.
+    Returns:
+        dict[str, tuple[int, int]]: Total size of each cache in bytes before and after, by cache name.
+    Raises:
+        ModuleNotFoundError: If zstd is involved and zstandard isn't installed.
+    """
+    if not os.path.isdir(config.CACHE_DIR_PATH):
+        return {}
+
+    return {
+        name: ContentCache(name).compact(compression)
+        for name in sorted(os.listdir(config.CACHE_DIR_PATH))
+        if os.path.exists(os.path.join(config.CACHE_DIR_PATH, name, INDEX_FILE_NAME))
+    }
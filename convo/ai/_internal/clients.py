@@ -0,0 +1,211 @@
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Callable
+from convo import config
+from .types import ClientOptions
+
+# The provider SDKs, httpx and asyncio take most of convo's import time, so
+# they are only imported once the first client is created.
+if TYPE_CHECKING:
+    import asyncio
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+
+DEFAULT_CLIENT_OPTIONS: dict[config.Provider, ClientOptions] = {
+    "deepgram": {
+        "max_connections": 10,
+        "max_keepalive_connections": 10,
+        # Deepgram only answers once the whole recording has been transcribed.
+        "timeout": 300.0,
+        "connect_timeout": 10.0,
+    },
+    "open_ai": {
+        "max_connections": 10,
+        "max_keepalive_connections": 10,
+        "timeout": 600.0,
+        "connect_timeout": 5.0,
+    },
+}
+
+_lock = threading.Lock()
+_client_options: dict[config.Provider, ClientOptions] = {
+    provider: ClientOptions(**options)
+    for provider, options in DEFAULT_CLIENT_OPTIONS.items()
+}
+_clients: dict[tuple[config.Provider, str], Any] = {}
+# Async HTTP clients can only be used in the event loop they were first used
+# in, so every loop gets its own set.
+_async_clients: weakref.WeakKeyDictionary[
+    "asyncio.AbstractEventLoop", dict[tuple[config.Provider, str], Any]
+] = weakref.WeakKeyDictionary()
+
+
+def set_client_options(provider: config.Provider, options: ClientOptions) -> None:
+    """
+    Change the connection pool limits, timeouts or base URL of the clients of an AI provider.
+
+    Options that aren't given keep their current value. Clients that were already created are dropped from the registry, calls that are still running finish with the old client.
+
+    Raises:
+        ValueError: If a connection limit is smaller than 1 or a timeout isn't positive.
+    """
+    for option in ["max_connections", "max_keepalive_connections"]:
+        if option in options and options[option] < 1:
+            raise ValueError(f"Client option '{option}' must be at least 1.")
+    for option in ["timeout", "connect_timeout"]:
+        if option in options and options[option] <= 0:
+            raise ValueError(f"Client option '{option}' must be positive.")
+
+    with _lock:
+        _client_options[provider] = {**_client_options[provider], **options}
+        for clients in [_clients, *_async_clients.values()]:
+            for key in [key for key in clients if key[0] == provider]:
+                del clients[key]
+
+
+def get_client_options(provider: config.Provider) -> ClientOptions:
+    with _lock:
+        return ClientOptions(**_client_options[provider])
+
+
+def get_open_ai_client(api_key: str) -> "OpenAI":
+    """
+    Get the shared OpenAI client for an API key. It is safe to use from multiple threads and keeps its connections alive between requests.
+    """
+    return _get_client("open_ai", api_key, create_open_ai_client)
+
+
+def get_async_open_ai_client(api_key: str) -> "AsyncOpenAI":
+    """
+    Get the shared async OpenAI client for an API key in the running event loop.
+    """
+    return _get_async_client("open_ai", api_key, create_async_open_ai_client)
+
+
+def get_deepgram_client(api_key: str) -> "httpx.Client":
+    """
+    Get the shared HTTP client for Deepgram requests with an API key.
+
+    The Deepgram SDK creates a new HTTP client for every request, which means a new connection and TLS handshake each time. This client is set up with the same base URL and headers as the SDK's, but keeps its connections alive.
+    """
+    return _get_client("deepgram", api_key, create_deepgram_client)
+
+
+def get_async_deepgram_client(api_key: str) -> "httpx.AsyncClient":
+    """
+    Get the shared async HTTP client for Deepgram requests with an API key in the running event loop.
+    """
+    return _get_async_client("deepgram", api_key, create_async_deepgram_client)
+
+
+def create_open_ai_client(api_key: str, options: ClientOptions) -> "OpenAI":
+    import httpx
+    from openai import OpenAI
+
+    return OpenAI(
+        api_key=api_key,
+        base_url=options.get("base_url"),
+        timeout=get_timeout(options),
+        # Requests are retried by `concurrency.call`, which shares the rate
+        # limits and backoff of a provider between all of its requests.
+        max_retries=0,
+        http_client=httpx.Client(
+            limits=get_limits(options), timeout=get_timeout(options)
+        ),
+    )
+
+
+def create_async_open_ai_client(
+    api_key: str, options: ClientOptions
+) -> "AsyncOpenAI":
+    import httpx
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key=api_key,
+        base_url=options.get("base_url"),
+        timeout=get_timeout(options),
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            limits=get_limits(options), timeout=get_timeout(options)
+        ),
+    )
+
+
+def create_deepgram_client(api_key: str, options: ClientOptions) -> "httpx.Client":
+    import httpx
+    from deepgram import DeepgramClientOptions
+
+    deepgram_options = DeepgramClientOptions(
+        api_key=api_key, url=options.get("base_url", "")
+    )
+    return httpx.Client(
+        base_url=deepgram_options.url,
+        headers=deepgram_options.headers,
+        limits=get_limits(options),
+        timeout=get_timeout(options),
+    )
+
+
+def create_async_deepgram_client(
+    api_key: str, options: ClientOptions
+) -> "httpx.AsyncClient":
+    import httpx
+    from deepgram import DeepgramClientOptions
+
+    deepgram_options = DeepgramClientOptions(
+        api_key=api_key, url=options.get("base_url", "")
+    )
+    return httpx.AsyncClient(
+        base_url=deepgram_options.url,
+        headers=deepgram_options.headers,
+        limits=get_limits(options),
+        timeout=get_timeout(options),
+    )
+
+
+def get_limits(options: ClientOptions) -> "httpx.Limits":
+    import httpx
+
+    return httpx.Limits(
+        max_connections=options.get("max_connections"),
+        max_keepalive_connections=options.get("max_keepalive_connections"),
+    )
+
+
+def get_timeout(options: ClientOptions) -> "httpx.Timeout":
+    import httpx
+
+    return httpx.Timeout(
+        options.get("timeout"), connect=options.get("connect_timeout")
+    )
+
+
+def _get_client(
+    provider: config.Provider,
+    api_key: str,
+    create: Callable[[str, ClientOptions], Any],
+) -> Any:
+    key = (provider, api_key)
+    with _lock:
+        if (client := _clients.get(key)) is None:
+            client = _clients[key] = create(api_key, _client_options[provider])
+
+    return client
+
+
+def _get_async_client(
+    provider: config.Provider,
+    api_key: str,
+    create: Callable[[str, ClientOptions], Any],
+) -> Any:
+    import asyncio
+
+    key = (provider, api_key)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        if (client := loop_clients.get(key)) is None:
+            client = loop_clients[key] = create(api_key, _client_options[provider])
+
+    return client
@@ -0,0 +1,400 @@
+import sys
+import time
+import random
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+    Mapping,
+    TypeVar,
+)
+from convo import config
+from convo._utils import utils
+from .types import ProviderStats
+
+# asyncio is slow to import and only needed by async callers, which have
+# imported it already.
+if TYPE_CHECKING:
+    import asyncio
+else:
+    asyncio = utils.LazyModule("asyncio")
+
+DEFAULT_PROVIDER_LIMITS: dict[config.Provider, int] = {
+    "deepgram": 4,
+    "open_ai": 4,
+}
+# Responses with these status codes are worth another attempt: the provider
+# is rate limiting, overloaded or had a transient failure.
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+DEFAULT_MAX_RETRIES = 5
+# The backoff before retry n is drawn uniformly between zero and
+# min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2**n), so that requests
+# that failed together don't retry together.
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+# A provider that asks to wait longer than this is treated as unavailable.
+MAX_RETRY_AFTER_SECONDS = 300.0
+
+Result = TypeVar("Result")
+
+_lock = threading.Lock()
+_limits: dict[config.Provider, int] = dict(DEFAULT_PROVIDER_LIMITS)
+_semaphores: dict[config.Provider, threading.BoundedSemaphore] = {
+    provider: threading.BoundedSemaphore(limit)
+    for provider, limit in DEFAULT_PROVIDER_LIMITS.items()
+}
+# asyncio semaphores belong to the event loop they are used in, so every loop
+# gets its own set, created on first use.
+_async_semaphores: weakref.WeakKeyDictionary[
+    "asyncio.AbstractEventLoop", dict[config.Provider, "asyncio.Semaphore"]
+] = weakref.WeakKeyDictionary()
+_rate_limits: dict[config.Provider, config.RateLimits] = {}
+_buckets: dict[tuple[config.Provider, str], "TokenBucket"] = {}
+# A rate limit response pauses every request to its provider until then, in
+# seconds of `time.monotonic`.
+_paused_until: dict[config.Provider, float] = {}
+_stats: dict[config.Provider, ProviderStats] = {}
+
+
+def set_provider_limit(provider: config.Provider, limit: int) -> None:
+    """
+    Set the maximum number of concurrent requests to an AI provider.
+
+    Calls that are already running keep the slot they acquired, new calls use the new limit.
+
+    Raises:
+        ValueError: If the limit is smaller than 1.
+    """
+    if limit < 1:
+        raise ValueError(f"Concurrency limit for '{provider}' must be at least 1.")
+
+    with _lock:
+        _limits[provider] = limit
+        _semaphores[provider] = threading.BoundedSemaphore(limit)
+        for loop_semaphores in _async_semaphores.values():
+            loop_semaphores.pop(provider, None)
+
+
+def get_provider_limit(provider: config.Provider) -> int:
+    with _lock:
+        return _limits[provider]
+
+
+@contextmanager
+def provider_slot(provider: config.Provider) -> Iterator[None]:
+    """
+    Block until a request slot for the provider is free and hold it for the duration of the context.
+    """
+    with _lock:
+        semaphore = _semaphores[provider]
+
+    with semaphore:
+        yield
+
+
+@asynccontextmanager
+async def async_provider_slot(provider: config.Provider) -> AsyncIterator[None]:
+    """
+    Wait without blocking the event loop until a request slot for the provider is free and hold it for the duration of the context.
+
+    Coroutines share the provider limit with the other coroutines of the same event loop. Threads use the slots of `provider_slot` instead, because a thread can't wait on an asyncio semaphore and an event loop mustn't wait on a thread lock.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        loop_semaphores = _async_semaphores.setdefault(loop, {})
+        if (semaphore := loop_semaphores.get(provider)) is None:
+            semaphore = loop_semaphores[provider] = asyncio.Semaphore(
+                _limits[provider]
+            )
+
+    async with semaphore:
+        yield
+
+
+def set_rate_limits(
+    provider: config.Provider,
+    requests_per_minute: int | None = None,
+    tokens_per_minute: int | None = None,
+) -> None:
+    """
+    Set the rate limits of an AI provider for this process, instead of the limits in config.json. A limit that is None isn't enforced.
+
+    Raises:
+        ValueError: If a limit is smaller than 1.
+    """
+    rate_limits: config.RateLimits = {}
+    if requests_per_minute is not None:
+        rate_limits["requests_per_minute"] = requests_per_minute
+    if tokens_per_minute is not None:
+        rate_limits["tokens_per_minute"] = tokens_per_minute
+    for name, limit in rate_limits.items():
+        if limit < 1:
+            raise ValueError(
+                f"Rate limit '{name}' of '{provider}' must be at least 1."
+            )
+
+    with _lock:
+        _rate_limits[provider] = rate_limits
+
+
+def get_rate_limits(provider: config.Provider) -> config.RateLimits:
+    """
+    Returns:
+        RateLimits: The limits from `set_rate_limits`, or else the limits in config.json.
+    """
+    with _lock:
+        if provider in _rate_limits:
+            return _rate_limits[provider]
+
+    try:
+        return config.get_config_data().get("rate_limits", {}).get(provider, {})
+    except FileNotFoundError:
+        return {}
+
+
+def get_provider_stats() -> dict[config.Provider, ProviderStats]:
+    """
+    Returns:
+        dict[Provider, ProviderStats]: The counters of the requests that went through `call` and `call_async` in this process, by provider.
+    """
+    with _lock:
+        return {provider: stats.copy() for provider, stats in _stats.items()}
+
+
+def count_request(provider: config.Provider, **counts: float) -> None:
+    with _lock:
+        stats = _stats.setdefault(
+            provider,
+            {
+                "requests": 0,
+                "throttled": 0,
+                "throttled_seconds": 0.0,
+                "rate_limited": 0,
+                "retried": 0,
+                "failed": 0,
+            },
+        )
+        for name, value in counts.items():
+            stats[name] += value
+
+
+class TokenBucket:
+    """
+    A token bucket that refills at `rate_per_minute` and holds at most a minute's worth of tokens, like the per-minute limits of the providers.
+
+    Tokens are reserved instead of waited for. A reservation may take the bucket below zero, and its caller waits until the bucket has refilled. The wait happens outside the lock, so threads and coroutines can share a bucket, and they are served in the order they reserved.
+    """
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60
+        self.tokens = float(rate_per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Returns:
+            float: Seconds to wait before the reserved tokens may be used.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+
+def reserve(provider: config.Provider, tokens: int) -> float:
+    """
+    Reserve a request and its estimated tokens in the rate limits of a provider.
+
+    Returns:
+        float: Seconds to wait before the request may be sent, at least until a pause after a rate limit response is over.
+    """
+    rate_limits = get_rate_limits(provider)
+    delays = []
+    for name, amount in [
+        ("requests_per_minute", 1),
+        ("tokens_per_minute", tokens),
+    ]:
+        if amount and (limit := rate_limits.get(name)) is not None:
+            with _lock:
+                bucket = _buckets.get((provider, name))
+                if bucket is None or bucket.capacity != limit:
+                    bucket = _buckets[provider, name] = TokenBucket(limit)
+            delays.append(bucket.reserve(amount))
+
+    with _lock:
+        delays.append(_paused_until.get(provider, 0.0) - time.monotonic())
+    delay = max(delays)
+    if delay > 0:
+        count_request(provider, throttled=1, throttled_seconds=delay)
+    return max(0.0, delay)
+
+
+def call(
+    provider: config.Provider,
+    request: Callable[[], Result],
+    tokens=0,
+    max_retries=DEFAULT_MAX_RETRIES,
+) -> Result:
+    """
+    Send a request to an AI provider within its concurrency limit and rate limits, and retry it if the provider is rate limiting or had a transient failure.
+
+    Before every attempt, the request waits until the rate limits of the provider allow it and then for a slot of `provider_slot`. Failed attempts are retried with exponential backoff and jitter, or after the time the provider asks for in its Retry-After header. A rate limit response pauses all requests to the provider, not just the one that received it. Retries wait without holding a slot.
+
+    Args:
+        provider (Provider): The provider the request goes to.
+        request (Callable[[], Result]): Sends the request and returns its result. It is called again for every attempt, so it has to open files or streams it sends itself.
+        tokens (int, optional): The estimated tokens of the request, counted against a tokens-per-minute limit. Default is 0.
+        max_retries (int, optional): Maximum number of retries. Default is 5.
+    Returns:
+        Result: What `request` returned.
+    Raises:
+        Exception: The error of the last attempt, if it can't be retried or the retries are used up.
+    """
+    attempt = 0
+    while True:
+        if (delay := reserve(provider, tokens)) > 0:
+            time.sleep(delay)
+        try:
+            with provider_slot(provider):
+                count_request(provider, requests=1)
+                return request()
+        except Exception as error:
+            delay = get_retry_delay(provider, error, attempt, max_retries)
+            if delay is None:
+                raise
+        time.sleep(delay)
+        attempt += 1
+
+
+async def call_async(
+    provider: config.Provider,
+    request: Callable[[], Awaitable[Result]],
+    tokens=0,
+    max_retries=DEFAULT_MAX_RETRIES,
+) -> Result:
+    """
+    Async counterpart of `call`, which waits without blocking the event loop and uses the slots of `async_provider_slot`.
+    """
+    attempt = 0
+    while True:
+        if (delay := reserve(provider, tokens)) > 0:
+            await asyncio.sleep(delay)
+        try:
+            async with async_provider_slot(provider):
+                count_request(provider, requests=1)
+                return await request()
+        except Exception as error:
+            delay = get_retry_delay(provider, error, attempt, max_retries)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def get_retry_delay(
+    provider: config.Provider, error: Exception, attempt: int, max_retries: int
+) -> float | None:
+    """
+    Decide whether a failed attempt is retried and count it.
+
+    Returns:
+        float | None: Seconds to wait before the next attempt, None if the error is raised instead.
+    """
+    status_code, headers = get_error_response(error)
+    if status_code is None:
+        retryable = is_connection_error(error)
+    else:
+        # OpenAI answers 429 when the quota is used up, too, which waiting
+        # doesn't fix.
+        retryable = (
+            status_code in RETRY_STATUS_CODES
+            and getattr(error, "code", None) != "insufficient_quota"
+        )
+    if status_code == 429:
+        count_request(provider, rate_limited=1)
+
+    delay = random.uniform(
+        0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2**attempt)
+    )
+    if (retry_after := parse_retry_after(headers)) is not None:
+        if retry_after > MAX_RETRY_AFTER_SECONDS:
+            retryable = False
+        delay = max(delay, retry_after)
+
+    if not retryable or attempt >= max_retries:
+        count_request(provider, failed=1)
+        return None
+
+    if status_code == 429:
+        with _lock:
+            _paused_until[provider] = max(
+                _paused_until.get(provider, 0.0), time.monotonic() + delay
+            )
+    count_request(provider, retried=1)
+    return delay
+
+
+def get_error_response(error: Exception) -> tuple[int | None, Mapping[str, str]]:
+    """
+    Find the HTTP response of a failed request. The OpenAI SDK attaches it to its errors, Deepgram errors are chained to an `httpx.HTTPStatusError`.
+
+    Returns:
+        tuple[int | None, Mapping[str, str]]: Status code and headers, or None and no headers if the request didn't get a response.
+    """
+    for candidate in [error, error.__cause__]:
+        response = getattr(candidate, "response", None)
+        if response is not None and hasattr(response, "status_code"):
+            return response.status_code, response.headers
+    return None, {}
+
+
+def is_connection_error(error: Exception) -> bool:
+    # Only the libraries that are imported already can have raised the error,
+    # so the others aren't imported for the check.
+    if (httpx := sys.modules.get("httpx")) is not None and isinstance(
+        error,
+        (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError),
+    ):
+        return True
+    if (openai := sys.modules.get("openai")) is not None and isinstance(
+        error, openai.APIConnectionError
+    ):
+        return True
+    return False
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> float | None:
+    """
+    Returns:
+        float | None: The seconds a provider asks to wait from its `retry-after-ms` or `Retry-After` header, which may be a number of seconds or an HTTP date. None if neither is set or valid.
+    """
+    if (value := headers.get("retry-after-ms")) is not None:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+
+    if (value := headers.get("retry-after")) is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
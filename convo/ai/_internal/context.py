@@ -1,21 +1,76 @@
-import os
-import json
-from convo import config
+from contextlib import closing
+from convo import config, transcripts
+from convo._utils import utils
 
+# The summaries are ranked best first, so after this many in a row that don't
+# fit into the remaining budget, the rest are unlikely to be worth scanning.
+MAX_SKIPPED_SUMMARIES = 16
 
-# TODO: allow reducing the size of the summaries
-def get_context() -> str:
+
+def get_token_budget() -> int:
+    """
+    Returns:
+        int: The maximum number of tokens the query context may use, as configured in config.json.
+    """
+    return config.get_config_data().get(
+        "query_token_budget", config.DEFAULT_QUERY_TOKEN_BUDGET
+    )
+
+
+def format_summary(file_name: str, summary: str) -> str:
+    return f"Name: {file_name}\nSummary: {summary}\n"
+
+
+def select_summaries(prompt: str, token_budget: int | None = None) -> dict[str, str]:
+    """
+    Select the summaries that are most relevant to a prompt and fit into the token budget.
+
+    The summaries are ranked locally with BM25, so the size of the context stays the same no matter how many transcripts there are. A summary that doesn't fit into the remaining budget is skipped, so smaller summaries ranked below it can still use the budget. The scan stops after MAX_SKIPPED_SUMMARIES summaries in a row were skipped, so a small leftover budget doesn't scan every transcript.
+
+    Args:
+        prompt (str): The question the context is built for.
+        token_budget (int | None, optional): Maximum number of tokens of the context. Defaults to the configured budget.
+    Returns:
+        dict[str, str]: Summaries by transcript name, most relevant first.
+    """
+    remaining_tokens = token_budget or get_token_budget()
+    # Not even an empty summary fits below this.
+    min_tokens = utils.estimate_tokens(format_summary("", ""))
+    selected_summaries = {}
+    skipped_summaries = 0
+    with closing(transcripts.rank_summaries(prompt)) as ranked_summaries:
+        for file_name, summary in ranked_summaries:
+            if remaining_tokens < min_tokens:
+                break
+            tokens = utils.estimate_tokens(format_summary(file_name, summary))
+            if tokens > remaining_tokens:
+                skipped_summaries += 1
+                if skipped_summaries >= MAX_SKIPPED_SUMMARIES:
+                    break
+                continue
+            skipped_summaries = 0
+            selected_summaries[file_name] = summary
+            remaining_tokens -= tokens
+
+    return selected_summaries
+
+
+def get_context(prompt: str | None = None, token_budget: int | None = None) -> str:
     """
     Create context for an AI to use to answer questions about the transcripts.
 
+    Args:
+        prompt (str | None, optional): If given, only include the summaries that are most relevant to the prompt and fit into the token budget. Otherwise include all summaries.
+        token_budget (int | None, optional): Maximum number of tokens of the context. Defaults to the configured budget.
     Returns:
         str: String of transcript file names and their summaries.
     """
-    summaries = []
-    for file_name in os.listdir(config.TRANSCRIPTS_DIR_PATH):
-        file_path = os.path.join(config.TRANSCRIPTS_DIR_PATH, file_name)
-        with open(file_path, "r") as file:
-            transcript_data = json.load(file)
-            summary = transcript_data["summary"]
-            summaries.append(f"Name: {file_name}\nSummary: {summary}\n")
-    return "\n".join(summaries)
+    if prompt is None:
+        summaries = transcripts.get_summaries()
+    else:
+        summaries = select_summaries(prompt, token_budget)
+
+    return "\n".join(
+        format_summary(file_name, summary)
+        for file_name, summary in summaries.items()
+    )
@@ -1,32 +1,415 @@
 import os
 import json
-from deepgram import DeepgramClient, FileSource, PrerecordedOptions
+import warnings
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Iterator
 from convo import config
 from convo._utils import utils
-from .types import DeepgramApiResponse
+from . import clients, concurrency, segments
+from .cache import ContentCache, hash_file, hash_options
+from .response import TranscriptionResult, decode_response
 from .errors import CacheMissError
+from .types import ConversionStats, DeepgramApiResponse
+
+# The SDK is imported by the functions that need it and asyncio once the async
+# functions run in an event loop, so that importing convo stays fast for the
+# commands that don't talk to Deepgram.
+if TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import Future, ThreadPoolExecutor
+    import httpx
+    from deepgram import PrerecordedOptions
+else:
+    asyncio = utils.LazyModule("asyncio")
+
+LISTEN_ENDPOINT = "v1/listen"
+# Each chunk of an async upload is read in a worker thread. Larger chunks mean
+# fewer hops between the event loop and the thread pool.
+ASYNC_UPLOAD_CHUNK_SIZE = 1024 * 1024
+PARAGRAPH_SEPARATOR = "\n\n"
+
+response_cache = ContentCache("deepgram")
+# A single writer keeps cache writes off the critical path. Its thread is
+# joined when the interpreter exits, so pending writes aren't lost.
+_cache_writer: "ThreadPoolExecutor | None" = None
+_cache_writer_lock = threading.Lock()
+_conversion_stats: ConversionStats = {
+    "files": 0,
+    "original_bytes": 0,
+    "converted_bytes": 0,
+}
+_conversion_stats_lock = threading.Lock()
 
 
 def transcribe(
     audio_file_path: str, speakers: list[str], keywords: list[str]
-) -> DeepgramApiResponse:
-    config_data = config.get_config_data()
-    deepgram_config = config.get_ai_config_or_raise("deepgram")
+) -> TranscriptionResult:
+    """
+    Transcribe an audio file with Deepgram.
+
+    Responses are cached by the content of the audio file and the request options, so transcribing the same audio with the same options again doesn't call the API, no matter where the file is located.
+    """
+    return decode_response(request_response(audio_file_path, speakers, keywords))
+
+
+def request_response(
+    audio_file_path: str,
+    speakers: list[str],
+    keywords: list[str],
+    segment_seconds: float | None = None,
+    response_key: str | None = None,
+) -> str | bytes:
+    """
+    Request the raw response for an audio file from Deepgram, or from the cache if the same audio was sent with the same options before.
+
+    If the audio conversion is enabled, WAV recordings are converted before they are sent, see `convert_audio`. The response is still cached under the original recording.
+
+    Args:
+        segment_seconds (float | None, optional): If set, WAV recordings longer than this are split at pauses and the segments are transcribed concurrently, see `request_segmented_response`. Other formats are always sent as a whole.
+        response_key (str | None, optional): The cache key from `get_response_key`, if it is known already, so the audio file isn't hashed again.
+    Returns:
+        str | bytes: The undecoded JSON body of the response.
+    """
+    options = get_options(speakers, keywords)
+    if response_key is None:
+        response_key = get_response_key(audio_file_path, options)
+    if (cached_response := read_cached_response(response_key)) is not None:
+        return cached_response
+
+    with convert_audio(audio_file_path) as upload_file_path:
+        if segment_seconds is not None and (
+            split_points := get_split_points(upload_file_path, segment_seconds)
+        ):
+            response_body = request_segmented_response(
+                upload_file_path, speakers, keywords, split_points, segment_seconds
+            )
+        else:
+            deepgram_config = config.get_ai_config_or_raise("deepgram")
+            client = clients.get_deepgram_client(deepgram_config["api_key"])
+            response_body = upload(client, upload_file_path, options)
+
+    cache_response(response_key, response_body)
+    return response_body
+
 
-    response_file_path = get_response_file_path(audio_file_path)
-    if os.path.exists(response_file_path):
-        raise Exception(
-            f"Audio file has already been transcribed: '{audio_file_path}'."
+def request_segmented_response(
+    audio_file_path: str,
+    speakers: list[str],
+    keywords: list[str],
+    split_points: list[float],
+    segment_seconds: float,
+) -> str:
+    """
+    Transcribe a WAV recording in segments and stitch their responses together.
+
+    The segments are transcribed concurrently, within the concurrency limit of Deepgram, so the time a long recording takes depends on the length of its segments instead of its duration. Every segment is cached on its own, so if one of them fails, transcribing the recording again only sends the segments that are missing.
+
+    Each segment is written to a temporary file right before it is sent and removed afterwards.
+
+    Args:
+        split_points (list[float]): Where the recording is split in seconds, from `get_split_points`.
+        segment_seconds (float): The segment length the split points were found for.
+    Returns:
+        str: The JSON body of a response of the whole recording.
+    """
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from convo._utils import audio
+
+    overlap_seconds = segments.get_overlap_seconds(segment_seconds)
+    starts = [0.0, *split_points]
+    ends: list[float | None] = [*split_points, None]
+    offsets = [0.0, *(max(0.0, start - overlap_seconds) for start in split_points)]
+
+    with tempfile.TemporaryDirectory(prefix="convo-segments-") as dir_path:
+
+        def request_segment(idx: int) -> DeepgramApiResponse:
+            segment_file_path = os.path.join(dir_path, f"segment_{idx}.wav")
+            audio.write_segment(
+                audio_file_path, segment_file_path, offsets[idx], ends[idx]
+            )
+            try:
+                return json.loads(
+                    request_response(segment_file_path, speakers, keywords)
+                )
+            finally:
+                os.remove(segment_file_path)
+
+        workers = min(len(starts), concurrency.get_provider_limit("deepgram"))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="convo-segment"
+        ) as executor:
+            futures = [
+                executor.submit(request_segment, idx) for idx in range(len(starts))
+            ]
+            try:
+                responses = [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    return json.dumps(
+        segments.stitch_responses(
+            responses, offsets, starts, expected_speakers=len(speakers) or None
         )
+    )
 
-    deepgram = DeepgramClient(deepgram_config["api_key"])
-    with open(audio_file_path, "rb") as file:
-        buffer_data = file.read()
 
-    payload: FileSource = {
-        "buffer": buffer_data,
-    }
-    options = PrerecordedOptions(
+def get_split_points(audio_file_path: str, segment_seconds: float) -> list[float]:
+    """
+    Returns:
+        list[float]: Where a recording is split into segments in seconds. Empty if it is shorter than a segment or isn't a WAV file.
+    """
+    from convo._utils import audio
+
+    if not audio.is_wav(audio_file_path):
+        return []
+    return audio.find_split_points(audio_file_path, segment_seconds)
+
+
+@contextmanager
+def convert_audio(audio_file_path: str) -> Iterator[str]:
+    """
+    Convert a WAV recording to mono 16-bit samples at 16 kHz for the upload, if `convert_audio` is enabled in config.json and the conversion makes the file smaller. Speech recognition doesn't need more, and a 48 kHz stereo recording shrinks to a sixth of its size.
+
+    The converted file is written to a temporary directory, which is removed when the context exits.
+
+    Yields:
+        str: The file to upload, the converted file or the original if it isn't converted.
+    """
+    from convo._utils import audio
+
+    if not config.get_config_data().get(
+        "convert_audio", config.DEFAULT_CONVERT_AUDIO
+    ) or not audio.needs_conversion(audio_file_path):
+        yield audio_file_path
+        return
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="convo-audio-") as dir_path:
+        converted_file_path = os.path.join(dir_path, "converted.wav")
+        audio.convert_wav(audio_file_path, converted_file_path)
+        with _conversion_stats_lock:
+            _conversion_stats["files"] += 1
+            _conversion_stats["original_bytes"] += os.path.getsize(audio_file_path)
+            _conversion_stats["converted_bytes"] += os.path.getsize(
+                converted_file_path
+            )
+        yield converted_file_path
+
+
+def get_conversion_stats() -> ConversionStats:
+    """
+    Returns:
+        ConversionStats: The number of recordings converted by `convert_audio` in this process and their sizes before and after the conversion.
+    """
+    with _conversion_stats_lock:
+        return _conversion_stats.copy()
+
+
+async def transcribe_async(
+    audio_file_path: str, speakers: list[str], keywords: list[str]
+) -> TranscriptionResult:
+    """
+    Transcribe an audio file with Deepgram without blocking the event loop. See `transcribe`.
+    """
+    response = await request_response_async(audio_file_path, speakers, keywords)
+    return await asyncio.to_thread(decode_response, response)
+
+
+async def request_response_async(
+    audio_file_path: str,
+    speakers: list[str],
+    keywords: list[str],
+    segment_seconds: float | None = None,
+    response_key: str | None = None,
+) -> str | bytes:
+    """
+    Async counterpart of `request_response`. Hashing the audio file, reading the cache and converting the audio happen in worker threads, the upload uses Deepgram's async client. Segmented recordings are transcribed in worker threads.
+    """
+    options = get_options(speakers, keywords)
+    if response_key is None:
+        response_key = await asyncio.to_thread(
+            get_response_key, audio_file_path, options
+        )
+    if (
+        cached_response := await asyncio.to_thread(read_cached_response, response_key)
+    ) is not None:
+        return cached_response
+
+    with ExitStack() as stack:
+        upload_file_path = await asyncio.to_thread(
+            stack.enter_context, convert_audio(audio_file_path)
+        )
+        if segment_seconds is not None and (
+            split_points := await asyncio.to_thread(
+                get_split_points, upload_file_path, segment_seconds
+            )
+        ):
+            response_body = await asyncio.to_thread(
+                request_segmented_response,
+                upload_file_path,
+                speakers,
+                keywords,
+                split_points,
+                segment_seconds,
+            )
+        else:
+            deepgram_config = config.get_ai_config_or_raise("deepgram")
+            client = clients.get_async_deepgram_client(deepgram_config["api_key"])
+            response_body = await upload_async(client, upload_file_path, options)
+
+    cache_response(response_key, response_body)
+    return response_body
+
+
+def upload(
+    client: "httpx.Client",
+    audio_file_path: str,
+    options: "PrerecordedOptions",
+) -> str:
+    """
+    Send an audio file to Deepgram.
+
+    The file is passed to the HTTP client as a stream, which reads and sends it in small chunks. This keeps memory usage constant no matter how large the recording is. Rate limit responses and transient failures are retried, see `concurrency.call`, and every attempt streams the file from its start.
+
+    Args:
+        client (httpx.Client): A client from `clients.get_deepgram_client`.
+        audio_file_path (str): The audio file to transcribe.
+        options (PrerecordedOptions): The transcription options.
+    Returns:
+        str: The raw JSON body of the response. It is decoded by convo directly instead of going through the SDK's response classes.
+    Raises:
+        DeepgramApiError: If Deepgram rejects the request.
+    """
+    params = get_query_params(options)
+
+    def send() -> str:
+        with open(audio_file_path, "rb") as file:
+            response = client.post(LISTEN_ENDPOINT, params=params, content=file)
+        return get_response_text(response)
+
+    return concurrency.call("deepgram", send)
+
+
+async def upload_async(
+    client: "httpx.AsyncClient",
+    audio_file_path: str,
+    options: "PrerecordedOptions",
+) -> str:
+    """
+    Send an audio file to Deepgram with an async client. Like `upload`, the file is streamed in chunks instead of being read into memory.
+    """
+    params = get_query_params(options)
+
+    async def send() -> str:
+        response = await client.post(
+            LISTEN_ENDPOINT,
+            params=params,
+            content=read_file_chunks(audio_file_path),
+        )
+        return get_response_text(response)
+
+    return await concurrency.call_async("deepgram", send)
+
+
+def get_query_params(options: "PrerecordedOptions") -> list[tuple[str, str]]:
+    """
+    Encode the options as query parameters the same way the Deepgram SDK does: booleans in lowercase and lists as repeated parameters.
+    """
+    params = []
+    for key, value in json.loads(options.to_json()).items():
+        if value is None:
+            continue
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, bool):
+                item = str(item).lower()
+            params.append((key, str(item)))
+
+    return params
+
+
+def get_response_text(response: "httpx.Response") -> str:
+    """
+    Raises:
+        DeepgramApiError: If the response is an error with a JSON body.
+        DeepgramUnknownApiError: If the response is an error without a JSON body.
+    """
+    if response.is_success:
+        return response.text
+
+    import httpx
+    from deepgram.clients.errors import DeepgramApiError, DeepgramUnknownApiError
+
+    # The errors of the SDK don't keep the response. Chaining them to an
+    # httpx error lets retries read its status code and Retry-After header.
+    status_error = httpx.HTTPStatusError(
+        f"Deepgram responded with status {response.status_code}.",
+        request=response.request,
+        response=response,
+    )
+    try:
+        error = response.json()
+    except ValueError:
+        raise DeepgramUnknownApiError(
+            response.text, response.status_code
+        ) from status_error
+
+    raise DeepgramApiError(
+        error.get("err_msg"), response.status_code, json.dumps(error)
+    ) from status_error
+
+
+async def read_file_chunks(
+    file_path: str, chunk_size=ASYNC_UPLOAD_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    file = await asyncio.to_thread(open, file_path, "rb")
+    try:
+        while chunk := await asyncio.to_thread(file.read, chunk_size):
+            yield chunk
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+def get_cache_writer() -> "ThreadPoolExecutor":
+    from concurrent.futures import ThreadPoolExecutor
+
+    global _cache_writer
+    with _cache_writer_lock:
+        if _cache_writer is None:
+            _cache_writer = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="convo-cache"
+            )
+
+    return _cache_writer
+
+
+def cache_response(response_key: str, response_body: str) -> "Future":
+    """
+    Write a response to the cache in the background.
+    """
+    future = get_cache_writer().submit(
+        response_cache.put, response_key, response_body.encode()
+    )
+    future.add_done_callback(warn_on_cache_error)
+    return future
+
+
+def warn_on_cache_error(future: "Future") -> None:
+    if (error := future.exception()) is not None:
+        warnings.warn(f"Could not cache Deepgram response: {error}")
+
+
+def get_options(speakers: list[str], keywords: list[str]) -> "PrerecordedOptions":
+    from deepgram import PrerecordedOptions
+
+    config_data = config.get_config_data()
+    deepgram_config = config.get_ai_config_or_raise("deepgram")
+
+    return PrerecordedOptions(
         model=deepgram_config["model"],
         language="en",
         smart_format=True,
@@ -37,44 +420,154 @@ def transcribe(
         keywords=keywords + speakers + config_data["common_words"],
     )
 
-    response = deepgram.listen.prerecorded.v("1").transcribe_file(
-        payload, options
+
+def get_response_key(audio_file_path: str, options: "PrerecordedOptions") -> str:
+    """
+    Create the cache key of a response from the audio content and the request options.
+
+    The key is made of the hash of the audio content, the hash of the options without the keywords and the hash of all options. Responses for the same audio that only differ in the speakers and keywords share the first two.
+    """
+    options_data = options.to_dict()
+    base_options = {
+        key: value for key, value in options_data.items() if key != "keywords"
+    }
+    return (
+        f"{hash_file(audio_file_path)}-{hash_options(base_options)}"
+        f"-{hash_options(options_data)}"
     )
 
-    with open(
-        response_file_path,
-        "w",
-    ) as file:
-        file.write(response.to_json(indent=4))
 
-    # TODO: Writing to disk and reading from it... This can be improved!
-    return get_response(audio_file_path)
+def read_cached_response(response_key: str, other_keywords=False) -> bytes | None:
+    """
+    Read a response from the cache.
+
+    Args:
+        response_key (str): The cache key from `get_response_key`.
+        other_keywords (bool, optional): If True and there is no response for these exact options, fall back to the most recently used response for the same audio and the same model and options that was requested with other speakers or keywords. Default is False.
+    Returns:
+        bytes | None: The raw response, or None if it isn't cached.
+    """
+    audio_hash, _, options_hashes = response_key.partition("-")
+    base_options_hash, _, options_hash = options_hashes.rpartition("-")
+    candidate_keys = [response_key]
+    # Keys from before the keywords were hashed separately only have the hash
+    # of all options.
+    if base_options_hash:
+        candidate_keys.append(f"{audio_hash}-{options_hash}")
+        if other_keywords:
+            candidate_keys += response_cache.find_keys(
+                f"{audio_hash}-{base_options_hash}-"
+            )
 
+    for key in candidate_keys:
+        if (cached_response := response_cache.get(key)) is not None:
+            return cached_response
+    return None
 
-def get_response_file_path(audio_file_path: str) -> str:
+
+def get_legacy_response_file_path(audio_file_path: str) -> str:
     audio_file_name = utils.get_file_name(audio_file_path)
     response_file_name = f"{audio_file_name}.json"
     return os.path.join(config.CACHE_DIR_PATH, response_file_name)
 
 
-def get_response(audio_file_path: str) -> DeepgramApiResponse:
-    response_file_path = get_response_file_path(audio_file_path)
-    if not os.path.exists:
-        raise CacheMissError(audio_file_path)
-    with open(response_file_path, "rb") as file:
-        response: DeepgramApiResponse = json.load(file)
+def get_response(
+    audio_file_path: str, speakers: list[str], keywords: list[str]
+) -> TranscriptionResult:
+    """
+    Retrieve a cached response for an audio file.
+
+    Prefers a response that was requested with the same options. Otherwise falls back to the most recently used response for the same audio that only differs in the speakers and keywords, e.g. when only the speaker names have changed.
+
+    Raises:
+        CacheMissError: If the audio file has never been transcribed with the configured model and options.
+    """
+    return decode_response(get_cached_response(audio_file_path, speakers, keywords))
+
+
+def get_cached_response(
+    audio_file_path: str,
+    speakers: list[str],
+    keywords: list[str],
+    response_key: str | None = None,
+) -> bytes:
+    """
+    Retrieve the raw cached response for an audio file without decoding it.
+
+    Args:
+        response_key (str | None, optional): The cache key from `get_response_key`, if it is known already, so the audio file isn't hashed again.
+    Raises:
+        CacheMissError: If the audio file has never been transcribed with the configured model and options.
+    """
+    if not os.path.exists(audio_file_path):
+        raise FileNotFoundError(f"Audio file '{audio_file_path}' does not exist.")
+
+    if response_key is None:
+        response_key = get_response_key(
+            audio_file_path, get_options(speakers, keywords)
+        )
+    if (
+        cached_response := read_cached_response(response_key, other_keywords=True)
+    ) is not None:
+        return cached_response
+
+    legacy_response_file_path = get_legacy_response_file_path(audio_file_path)
+    if os.path.exists(legacy_response_file_path):
+        with open(legacy_response_file_path, "rb") as file:
+            return file.read()
+
+    raise CacheMissError(audio_file_path)
+
+
+async def get_cached_response_async(
+    audio_file_path: str,
+    speakers: list[str],
+    keywords: list[str],
+    response_key: str | None = None,
+) -> bytes:
+    """
+    Async counterpart of `get_cached_response`, which reads the cache in a worker thread.
+    """
+    return await asyncio.to_thread(
+        get_cached_response, audio_file_path, speakers, keywords, response_key
+    )
+
+
+def get_transcript(response: TranscriptionResult) -> str:
+    return response.transcript
+
+
+def render_transcript(response: TranscriptionResult, speakers: list[str]) -> str:
+    """
+    Render the transcript of a response with the names of its speakers.
 
-    return response
+    The paragraphs are rendered in a single pass from the structured paragraphs of the response, so the time is linear in the length of the transcript no matter how many speakers there are. Responses without paragraphs are rendered as their plain transcript.
 
+    Args:
+        response (TranscriptionResult): A response, e.g. from the cache with `get_response`.
+        speakers (list[str]): Names of the speakers by their number. Speakers without a name are rendered as "Speaker N".
+    Returns:
+        str: The transcript with paragraphs separated by a blank line.
+    """
+    if not response.paragraphs:
+        return response.transcript
 
-def get_transcript(response: DeepgramApiResponse) -> str:
-    return response["results"]["channels"][0]["alternatives"][0]["paragraphs"][
-        "transcript"
-    ].strip()
+    parts: list[str] = []
+    for paragraph in response.paragraphs:
+        if parts:
+            parts.append(PARAGRAPH_SEPARATOR)
+        if (speaker := paragraph.get("speaker")) is not None:
+            parts.append(get_speaker_name(speaker, speakers))
+            parts.append(": ")
+        for idx, sentence in enumerate(paragraph["sentences"]):
+            if idx:
+                parts.append(" ")
+            parts.append(sentence["text"])
 
+    return "".join(parts)
 
-def replace_speaker_placeholders(transcript: str, speakers: list[str]) -> str:
-    for idx, speaker in enumerate(speakers):
-        transcript = transcript.replace(f"Speaker {idx}", speakers[idx])
 
-    return transcript
+def get_speaker_name(speaker: int, speakers: list[str]) -> str:
+    if 0 <= speaker < len(speakers):
+        return speakers[speaker]
+    return f"Speaker {speaker}"
@@ -6,6 +6,6 @@ class CacheMissError(Exception):
     ):
         self.message = (
             message
-            or f"Could not find a cached file matching '{audio_file_path}'. Hint: Have you moved the audio file to a new folder? This breaks the caching mechanism."
+            or f"Could not find a cached file matching '{audio_file_path}'. Hint: Transcribe the audio file without using the cache first."
         )
         super().__init__(self.message)
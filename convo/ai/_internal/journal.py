@@ -0,0 +1,185 @@
+import os
+import json
+import time
+from convo import config
+from .cache import hash_options
+from .types import JobJournal, TranscriptStage
+
+JOURNAL_VERSION = 1
+JOURNAL_FILE_EXTENSION = ".json"
+# Journals of jobs that were neither resumed nor repeated for this long are
+# removed, whether they have completed or not.
+JOURNAL_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+
+
+def get_job_id(
+    audio_file_path: str,
+    speakers: list[str],
+    keywords: list[str],
+    date: str,
+    segment_seconds: float | None,
+    summary_cache: bool,
+) -> str:
+    """
+    Identify a transcript job by its audio file and everything that changes its result: the job's options and the parts of the config that go into the provider requests. Changing any of them starts a new job instead of resuming the old one.
+    """
+    config_data = config.get_config_data()
+    return hash_options(
+        {
+            "audio_file_path": os.path.abspath(audio_file_path),
+            "speakers": speakers,
+            "keywords": keywords,
+            "date": date,
+            "segment_seconds": segment_seconds,
+            "summary_cache": summary_cache,
+            "common_words": config_data["common_words"],
+            "user_name": config_data["user"]["name"],
+            "deepgram_model": config_data.get("deepgram", {}).get("model"),
+            "open_ai_model": config_data.get("open_ai", {}).get("model"),
+        }
+    )
+
+
+class Journal:
+    """
+    The journal of a transcript job in `~/.convo/jobs`. It records the stages the job has completed along with their artifacts: the cache key of the Deepgram response, the summary and the path of the transcript file.
+
+    A job that failed or was interrupted resumes from its journal, so the provider calls of its completed stages aren't paid for again. The transcribe stage only decodes the response, which is cheaper than storing its result, so it runs again whenever a later stage needs it.
+
+    The journal is rewritten atomically after every stage. The size and modification time of the audio file are recorded as well, and a journal is discarded if the file has changed since. The same goes for the transcript file of a completed job: the job is only skipped as long as nothing else has written to its transcript file since.
+    """
+
+    def __init__(self, job_id: str, audio_file_path: str, resume=True):
+        """
+        Args:
+            job_id (str): The id from `get_job_id`.
+            audio_file_path (str): The recording of the job.
+            resume (bool, optional): If False, the existing journal is ignored and overwritten by the stages of this run. Default is True.
+        """
+        self.file_path = os.path.join(
+            config.JOBS_DIR_PATH, f"{job_id}{JOURNAL_FILE_EXTENSION}"
+        )
+        try:
+            stat = os.stat(audio_file_path)
+            audio_file_size, audio_file_mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            audio_file_size, audio_file_mtime_ns = -1, -1
+
+        self.data: JobJournal = {
+            "version": JOURNAL_VERSION,
+            "audio_file_path": audio_file_path,
+            "audio_file_size": audio_file_size,
+            "audio_file_mtime_ns": audio_file_mtime_ns,
+            "completed": [],
+        }
+        if resume and (journal := self._read()) is not None:
+            if (
+                journal["version"] == JOURNAL_VERSION
+                and journal["audio_file_size"] == audio_file_size
+                and journal["audio_file_mtime_ns"] == audio_file_mtime_ns
+            ):
+                self.data = journal
+
+    def is_completed(self, stage: TranscriptStage) -> bool:
+        return stage in self.data["completed"]
+
+    def record(self, stage: TranscriptStage, **artifacts: str) -> None:
+        """
+        Record that a stage has completed, along with the artifacts the later stages or a resumed job need.
+        """
+        self.data.update(artifacts)
+        if stage not in self.data["completed"]:
+            self.data["completed"].append(stage)
+        self._write()
+
+    def record_transcript(self, transcript_file_path: str) -> None:
+        """
+        Record that the transcript file has been written, along with its size and modification time. The summary is part of the transcript now, so it is dropped from the journal.
+        """
+        stat = os.stat(transcript_file_path)
+        self.data.pop("summary", None)
+        self.data["transcript_file_size"] = stat.st_size
+        self.data["transcript_file_mtime_ns"] = stat.st_mtime_ns
+        self.record("persist", transcript_file_path=transcript_file_path)
+
+    def get_transcript_file_path(self) -> str | None:
+        """
+        Returns:
+            str | None: The transcript file if the job has completed and the file is still the one the job wrote, otherwise None.
+        """
+        if not self.is_completed("persist"):
+            return None
+        return get_written_transcript_file_path(self.data)
+
+    def _read(self) -> JobJournal | None:
+        try:
+            with open(self.file_path, "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write(self) -> None:
+        import tempfile
+
+        os.makedirs(config.JOBS_DIR_PATH, exist_ok=True)
+        file_descriptor, temp_file_path = tempfile.mkstemp(
+            dir=config.JOBS_DIR_PATH,
+            prefix=f".{os.path.basename(self.file_path)}.",
+            suffix=".tmp",
+        )
+        try:
+            with os.fdopen(file_descriptor, "w") as file:
+                json.dump(self.data, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_file_path, self.file_path)
+        except BaseException:
+            os.remove(temp_file_path)
+            raise
+
+
+def get_written_transcript_file_path(journal: JobJournal) -> str | None:
+    """
+    Returns:
+        str | None: The transcript file recorded in a journal, if it still has the size and modification time it had when the job wrote it.
+    """
+    transcript_file_path = journal.get("transcript_file_path")
+    if transcript_file_path is None:
+        return None
+    try:
+        stat = os.stat(transcript_file_path)
+    except OSError:
+        return None
+    if (stat.st_size, stat.st_mtime_ns) != (
+        journal.get("transcript_file_size"),
+        journal.get("transcript_file_mtime_ns"),
+    ):
+        return None
+    return transcript_file_path
+
+
+def prune(max_age_seconds=JOURNAL_MAX_AGE_SECONDS) -> None:
+    """
+    Remove the journals that are of no use anymore: those of completed jobs whose transcript file is gone or was overwritten, so they wouldn't be skipped again, and those that haven't been written for `max_age_seconds`. Temporary files of interrupted writes are removed once they are as old.
+    """
+    try:
+        entries = list(os.scandir(config.JOBS_DIR_PATH))
+    except FileNotFoundError:
+        return
+
+    oldest_mtime = time.time() - max_age_seconds
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime < oldest_mtime:
+                os.remove(entry.path)
+            elif entry.name.endswith(JOURNAL_FILE_EXTENSION):
+                with open(entry.path, "r") as file:
+                    journal: JobJournal = json.load(file)
+                if (
+                    "persist" in journal["completed"]
+                    and get_written_transcript_file_path(journal) is None
+                ):
+                    os.remove(entry.path)
+        except (OSError, ValueError, KeyError, TypeError):
+            # Removed by another process in the meantime, or not a journal.
+            continue
@@ -1,7 +1,19 @@
-from openai import OpenAI
+import json
+import hashlib
+from typing import TYPE_CHECKING, AsyncIterator
 from convo import config
 from convo._utils import utils
-from .context import get_context
+from . import clients, concurrency, vectors
+from .cache import ContentCache
+from .context import format_summary, get_token_budget, select_summaries
+from .types import Excerpt
+
+# asyncio is slow to import, so it is only imported once the async functions
+# below run in an event loop.
+if TYPE_CHECKING:
+    import asyncio
+else:
+    asyncio = utils.LazyModule("asyncio")
 
 SYSTEM_PROMPT_SUMMARY_TEMPLATE = """\
 You are a transcript summarization assistant. Your job is to extract key pieces of information from a transcript of a work conversation between {speakers}.
@@ -15,35 +27,103 @@ Focus your summary on the following:
 Keep your summary succinct and clear.
 """
 
+SYSTEM_PROMPT_PARTIAL_SUMMARY_TEMPLATE = (
+    SYSTEM_PROMPT_SUMMARY_TEMPLATE
+    + """
+The transcript is long and has been split into parts. You are given part {part} of {part_count}. Only summarize this part, the summaries of all parts will be combined afterwards.
+"""
+)
+
+SYSTEM_PROMPT_REDUCE_TEMPLATE = """\
+You are a transcript summarization assistant. You are given the summaries of consecutive parts of a transcript of a work conversation between {speakers}. Combine them into a single summary of the whole conversation.
+
+The user requesting the summary is called {user_name}.
+
+Focus your summary on the following:
+1. Information mentioned by participants other than the user
+2. Professional information, like company details and product specifications
+
+Remove repetitions and keep your summary succinct and clear.
+"""
+# Transcripts up to this size are summarized with a single request. Longer
+# ones are split into parts of at most this size.
+SUMMARY_CHUNK_TOKENS = 4000
+DEFAULT_SUMMARY_CONCURRENCY = 4
+# Summaries and answers are rarely longer than this. It is added to the
+# prompt of a request to estimate its tokens for a tokens-per-minute limit.
+COMPLETION_TOKEN_ESTIMATE = 500
+PARAGRAPH_SEPARATOR = "\n\n"
+# Changes whenever a summary prompt or the way transcripts are split changes,
+# which invalidates the cached summaries that were created with the old ones.
+SUMMARY_PROMPT_VERSION = hashlib.sha256(
+    json.dumps(
+        [
+            SYSTEM_PROMPT_SUMMARY_TEMPLATE,
+            SYSTEM_PROMPT_PARTIAL_SUMMARY_TEMPLATE,
+            SYSTEM_PROMPT_REDUCE_TEMPLATE,
+            SUMMARY_CHUNK_TOKENS,
+        ]
+    ).encode()
+).hexdigest()[:16]
+
+summary_cache = ContentCache("summaries", extension=".txt")
+
 SYSTEM_PROMPT_QUERY_TEMPLATE = """\
-You are a helpful text search assistant. Your job is to find transcripts based on their summary.
+You are a helpful text search assistant. Your job is to find transcripts based on their summary and excerpts of their content.
 
 The user will ask you about a given transcript and you respond with possible candidates. Mention the name of the file as well as why you selected it.
 
 List of transcripts:
 {context}
+
+Excerpts from the transcripts:
+{excerpts}
 """
+DEFAULT_EXCERPT_COUNT = 5
+# Excerpts may use up to this share of the query token budget, the summaries
+# get the rest.
+EXCERPT_TOKEN_SHARE = 0.5
 
 
-def query(user_prompt: str) -> str:
+def query(
+    user_prompt: str,
+    token_budget: int | None = None,
+    show_selected=False,
+    excerpt_count=DEFAULT_EXCERPT_COUNT,
+) -> str:
+    """
+    Ask an AI about the transcripts. Only the summaries most relevant to the prompt are sent along, see `select_summaries`, together with the closest excerpts of transcript content from the vector index. See `select_context` for how they share the token budget.
+
+    Args:
+        user_prompt (str): The question about the transcripts.
+        token_budget (int | None, optional): Maximum number of tokens of the summaries and excerpts sent with the prompt. Defaults to the configured budget.
+        show_selected (bool, optional): If True, print the names of the selected transcripts and excerpts before the answer. Default is False.
+        excerpt_count (int, optional): Number of content excerpts sent with the prompt. Default is 5.
+    Returns:
+        str: The complete answer.
+    """
     open_ai_config = config.get_ai_config_or_raise("open_ai")
-    client = OpenAI(api_key=open_ai_config["api_key"])
-
-    stream = client.chat.completions.create(
-        model=open_ai_config["model"],
-        stream=True,
-        messages=[
-            {
-                "role": "system",
-                "content": SYSTEM_PROMPT_QUERY_TEMPLATE.format(
-                    context=get_context()
-                ),
-            },
-            {"role": "user", "content": user_prompt},
-        ],
-    )
+    client = clients.get_open_ai_client(open_ai_config["api_key"])
+
+    summaries, excerpts = select_context(user_prompt, token_budget, excerpt_count)
+    if show_selected:
+        print("Selected transcripts:")
+        for file_name in summaries:
+            print(f"  {file_name}")
+        print("Selected excerpts:")
+        for excerpt in excerpts:
+            print(f"  {excerpt['name']} (paragraph {excerpt['paragraph']})")
+        print()
 
     complete_response = ""
+    messages = get_query_messages(user_prompt, summaries, excerpts)
+    stream = concurrency.call(
+        "open_ai",
+        lambda: client.chat.completions.create(
+            model=open_ai_config["model"], stream=True, messages=messages
+        ),
+        tokens=estimate_request_tokens(messages),
+    )
     for chunk in stream:
         token = chunk.choices[0].delta.content or ""
         print(token, end="", flush=True)
@@ -52,23 +132,336 @@ def query(user_prompt: str) -> str:
     return complete_response
 
 
-def summarize(transcript: str, speakers: list[str]) -> str:
+async def query_async(
+    user_prompt: str,
+    token_budget: int | None = None,
+    excerpt_count=DEFAULT_EXCERPT_COUNT,
+) -> AsyncIterator[str]:
+    """
+    Ask an AI about the transcripts without blocking the event loop. See `query`.
+
+    The summaries and excerpts are looked up in a worker thread, the answer is streamed with OpenAI's async client.
+
+    Args:
+        user_prompt (str): The question about the transcripts.
+        token_budget (int | None, optional): Maximum number of tokens of the summaries and excerpts sent with the prompt. Defaults to the configured budget.
+        excerpt_count (int, optional): Number of content excerpts sent with the prompt. Default is 5.
+    Yields:
+        str: The tokens of the answer as they arrive.
+    """
+    open_ai_config = config.get_ai_config_or_raise("open_ai")
+    summaries, excerpts = await asyncio.to_thread(
+        select_context, user_prompt, token_budget, excerpt_count
+    )
+
+    client = clients.get_async_open_ai_client(open_ai_config["api_key"])
+    messages = get_query_messages(user_prompt, summaries, excerpts)
+    stream = await concurrency.call_async(
+        "open_ai",
+        lambda: client.chat.completions.create(
+            model=open_ai_config["model"], stream=True, messages=messages
+        ),
+        tokens=estimate_request_tokens(messages),
+    )
+    async for chunk in stream:
+        if token := chunk.choices[0].delta.content:
+            yield token
+
+
+def select_context(
+    user_prompt: str, token_budget: int | None, excerpt_count: int
+) -> tuple[dict[str, str], list[Excerpt]]:
+    """
+    Select the excerpts and summaries sent with a query so that together they fit into the token budget.
+
+    The closest excerpts that fit into EXCERPT_TOKEN_SHARE of the budget are selected first. The summaries get what the excerpts leave over, so without NumPy or a vector index they get the whole budget.
+
+    Returns:
+        tuple[dict[str, str], list[Excerpt]]: Summaries by transcript name and excerpts, most relevant first.
+    """
+    token_budget = token_budget or get_token_budget()
+    excerpt_budget = int(token_budget * EXCERPT_TOKEN_SHARE)
+    remaining_tokens = excerpt_budget
+    excerpts = []
+    for excerpt in vectors.search_excerpts(user_prompt, limit=excerpt_count):
+        tokens = utils.estimate_tokens(format_excerpt(excerpt))
+        if tokens > remaining_tokens:
+            continue
+        excerpts.append(excerpt)
+        remaining_tokens -= tokens
+
+    summaries = select_summaries(
+        user_prompt, token_budget - (excerpt_budget - remaining_tokens)
+    )
+    return summaries, excerpts
+
+
+def format_excerpt(excerpt: Excerpt) -> str:
+    return f"Name: {excerpt['name']}\nExcerpt: {excerpt['text']}\n"
+
+
+def get_query_messages(
+    user_prompt: str, summaries: dict[str, str], excerpts: list[Excerpt]
+) -> list[dict[str, str]]:
+    context = "\n".join(
+        format_summary(file_name, summary)
+        for file_name, summary in summaries.items()
+    )
+    excerpts_context = "\n".join(format_excerpt(excerpt) for excerpt in excerpts)
+    return get_messages(
+        SYSTEM_PROMPT_QUERY_TEMPLATE.format(
+            context=context, excerpts=excerpts_context or "None"
+        ),
+        user_prompt,
+    )
+
+
+def estimate_request_tokens(messages: list[dict[str, str]]) -> int:
+    return (
+        sum(utils.estimate_tokens(message["content"]) for message in messages)
+        + COMPLETION_TOKEN_ESTIMATE
+    )
+
+
+def get_messages(system_prompt: str, user_prompt: str) -> list[dict[str, str]]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def get_summary_key(
+    transcript: str, speakers: list[str], model: str, user_name: str
+) -> str:
+    """
+    Create the cache key of a summary from everything that influences it.
+    """
+    return hashlib.sha256(
+        json.dumps(
+            [transcript, speakers, model, user_name, SUMMARY_PROMPT_VERSION]
+        ).encode()
+    ).hexdigest()
+
+
+def summarize(
+    transcript: str,
+    speakers: list[str],
+    max_concurrency=DEFAULT_SUMMARY_CONCURRENCY,
+    use_cache=True,
+) -> str:
+    """
+    Summarize a transcript.
+
+    Long transcripts are split at paragraph boundaries, which start with the speaker. The parts are summarized concurrently and their summaries are combined in a final request. Short transcripts are summarized with a single request.
+
+    Summaries are cached by the transcript, the speakers, the model and the version of the summary prompts. Summarizing the same transcript again only calls the API if one of them changed.
+
+    Args:
+        transcript (str): The transcript to summarize.
+        speakers (list[str]): The conversation participants.
+        max_concurrency (int, optional): Maximum number of parts summarized at the same time. Default is 4.
+        use_cache (bool, optional): If False, always request a new summary. It is still cached. Default is True.
+    Returns:
+        str: The summary.
+    """
+    config_data = config.get_config_data()
+    open_ai_config = config.get_ai_config_or_raise("open_ai")
+    summary_key = get_summary_key(
+        transcript, speakers, open_ai_config["model"], config_data["user"]["name"]
+    )
+    if use_cache and (cached_summary := summary_cache.get(summary_key)) is not None:
+        return cached_summary.decode()
+
+    summary = request_summary(
+        transcript,
+        speakers,
+        open_ai_config,
+        config_data["user"]["name"],
+        max_concurrency,
+    )
+    summary_cache.put(summary_key, summary.encode())
+    return summary
+
+
+async def summarize_async(
+    transcript: str,
+    speakers: list[str],
+    max_concurrency=DEFAULT_SUMMARY_CONCURRENCY,
+    use_cache=True,
+) -> str:
+    """
+    Summarize a transcript without blocking the event loop. See `summarize`.
+
+    The parts of long transcripts are summarized as concurrent coroutines with OpenAI's async client. The cache is read and written in worker threads.
+    """
     config_data = config.get_config_data()
     open_ai_config = config.get_ai_config_or_raise("open_ai")
-    client = OpenAI(api_key=open_ai_config["api_key"])
-
-    completion = client.chat.completions.create(
-        model=open_ai_config["model"],
-        messages=[
-            {
-                "role": "system",
-                "content": SYSTEM_PROMPT_SUMMARY_TEMPLATE.format(
-                    speakers=utils.list_to_str(speakers),
-                    user_name=config_data["user"]["name"],
+    summary_key = get_summary_key(
+        transcript, speakers, open_ai_config["model"], config_data["user"]["name"]
+    )
+    if (
+        use_cache
+        and (cached_summary := await asyncio.to_thread(summary_cache.get, summary_key))
+        is not None
+    ):
+        return cached_summary.decode()
+
+    summary = await request_summary_async(
+        transcript,
+        speakers,
+        open_ai_config,
+        config_data["user"]["name"],
+        max_concurrency,
+    )
+    await asyncio.to_thread(summary_cache.put, summary_key, summary.encode())
+    return summary
+
+
+def request_summary(
+    transcript: str,
+    speakers: list[str],
+    open_ai_config: config.AiConfig,
+    user_name: str,
+    max_concurrency: int,
+) -> str:
+    client = clients.get_open_ai_client(open_ai_config["api_key"])
+    prompt_values = get_summary_prompt_values(speakers, user_name)
+
+    def complete(system_prompt: str, user_prompt: str) -> str:
+        messages = get_messages(system_prompt, user_prompt)
+        completion = concurrency.call(
+            "open_ai",
+            lambda: client.chat.completions.create(
+                model=open_ai_config["model"], messages=messages
+            ),
+            tokens=estimate_request_tokens(messages),
+        )
+        return completion.choices[0].message.content or ""
+
+    parts = split_transcript(transcript)
+    if len(parts) == 1:
+        return complete(
+            SYSTEM_PROMPT_SUMMARY_TEMPLATE.format(**prompt_values), transcript
+        )
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        part_summaries = list(
+            executor.map(
+                lambda part_number, part: complete(
+                    SYSTEM_PROMPT_PARTIAL_SUMMARY_TEMPLATE.format(
+                        part=part_number,
+                        part_count=len(parts),
+                        **prompt_values,
+                    ),
+                    part,
                 ),
-            },
-            {"role": "user", "content": transcript},
-        ],
+                range(1, len(parts) + 1),
+                parts,
+            )
+        )
+
+    return complete(
+        SYSTEM_PROMPT_REDUCE_TEMPLATE.format(**prompt_values),
+        join_part_summaries(part_summaries),
     )
 
-    return completion.choices[0].message.content or ""
+
+async def request_summary_async(
+    transcript: str,
+    speakers: list[str],
+    open_ai_config: config.AiConfig,
+    user_name: str,
+    max_concurrency: int,
+) -> str:
+    prompt_values = get_summary_prompt_values(speakers, user_name)
+    part_slots = asyncio.Semaphore(max_concurrency)
+    client = clients.get_async_open_ai_client(open_ai_config["api_key"])
+
+    async def complete(system_prompt: str, user_prompt: str) -> str:
+        messages = get_messages(system_prompt, user_prompt)
+        async with part_slots:
+            completion = await concurrency.call_async(
+                "open_ai",
+                lambda: client.chat.completions.create(
+                    model=open_ai_config["model"], messages=messages
+                ),
+                tokens=estimate_request_tokens(messages),
+            )
+        return completion.choices[0].message.content or ""
+
+    parts = split_transcript(transcript)
+    if len(parts) == 1:
+        return await complete(
+            SYSTEM_PROMPT_SUMMARY_TEMPLATE.format(**prompt_values), transcript
+        )
+
+    part_summaries = await asyncio.gather(
+        *(
+            complete(
+                SYSTEM_PROMPT_PARTIAL_SUMMARY_TEMPLATE.format(
+                    part=part_number,
+                    part_count=len(parts),
+                    **prompt_values,
+                ),
+                part,
+            )
+            for part_number, part in enumerate(parts, 1)
+        )
+    )
+
+    return await complete(
+        SYSTEM_PROMPT_REDUCE_TEMPLATE.format(**prompt_values),
+        join_part_summaries(part_summaries),
+    )
+
+
+def get_summary_prompt_values(speakers: list[str], user_name: str) -> dict[str, str]:
+    return {
+        "speakers": utils.list_to_str(speakers),
+        "user_name": user_name,
+    }
+
+
+def join_part_summaries(part_summaries: list[str]) -> str:
+    return PARAGRAPH_SEPARATOR.join(
+        f"Summary of part {part_number}:\n{part_summary}"
+        for part_number, part_summary in enumerate(part_summaries, 1)
+    )
+
+
+def split_transcript(transcript: str, max_tokens=SUMMARY_CHUNK_TOKENS) -> list[str]:
+    """
+    Split a transcript into parts of whole paragraphs with at most `max_tokens` tokens each. Paragraphs that are longer on their own are split between words.
+    """
+    parts = []
+    part_paragraphs: list[str] = []
+    part_tokens = 0
+    for paragraph in split_long_paragraphs(
+        transcript.split(PARAGRAPH_SEPARATOR), max_tokens
+    ):
+        paragraph_tokens = utils.estimate_tokens(paragraph)
+        if part_paragraphs and part_tokens + paragraph_tokens > max_tokens:
+            parts.append(PARAGRAPH_SEPARATOR.join(part_paragraphs))
+            part_paragraphs = []
+            part_tokens = 0
+        part_paragraphs.append(paragraph)
+        part_tokens += paragraph_tokens
+
+    parts.append(PARAGRAPH_SEPARATOR.join(part_paragraphs))
+    return parts
+
+
+def split_long_paragraphs(paragraphs: list[str], max_tokens: int) -> list[str]:
+    max_characters = max_tokens * utils.CHARACTERS_PER_TOKEN
+    result = []
+    for paragraph in paragraphs:
+        while len(paragraph) > max_characters:
+            split_index = paragraph.rfind(" ", 0, max_characters)
+            if split_index <= 0:
+                split_index = max_characters
+            result.append(paragraph[:split_index])
+            paragraph = paragraph[split_index:].lstrip()
+        result.append(paragraph)
+    return result
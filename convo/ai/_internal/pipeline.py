@@ -0,0 +1,220 @@
+import queue
+import threading
+import time
+from typing import Callable, Generic, Iterable, TypeVar
+from .types import StageStats
+
+T = TypeVar("T")
+
+DEFAULT_QUEUE_SIZE = 4
+
+# Marks the end of the input of a stage. Each worker consumes exactly one.
+_END = object()
+
+
+class Stage(Generic[T]):
+    """
+    A step of a pipeline that is run by its own pool of worker threads.
+
+    Items are handed to the stage through a bounded queue. When the queue is full, the previous stage blocks until a worker of this stage picks up an item, so a fast stage can't pile up work (and memory) in front of a slow one.
+    """
+
+    __slots__ = (
+        "name",
+        "function",
+        "workers",
+        "queue",
+        "processed",
+        "failed",
+        "peak_queue_depth",
+        "busy_seconds",
+        "_running_workers",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        function: Callable[[T], None],
+        workers: int,
+        queue_size: int,
+    ):
+        if workers < 1:
+            raise ValueError(f"Stage '{name}' needs at least 1 worker.")
+
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.processed = 0
+        self.failed = 0
+        self.peak_queue_depth = 0
+        self.busy_seconds = 0.0
+        self._running_workers = 0
+        self._lock = threading.Lock()
+
+    def put(self, item: T) -> None:
+        self.queue.put(item)
+        depth = self.queue.qsize()
+        with self._lock:
+            self.peak_queue_depth = max(self.peak_queue_depth, depth)
+
+    def get_stats(self) -> StageStats:
+        with self._lock:
+            return {
+                "name": self.name,
+                "workers": self.workers,
+                "processed": self.processed,
+                "failed": self.failed,
+                "queue_depth": self.queue.qsize(),
+                "peak_queue_depth": self.peak_queue_depth,
+                "busy_seconds": self.busy_seconds,
+            }
+
+
+class Pipeline(Generic[T]):
+    """
+    Run items through a sequence of stages, each with its own worker count.
+
+    While one item is in a later stage, the next one can already be in an earlier stage, so the throughput approaches that of the slowest stage rather than the sum of all stages. Stage functions work on the item in place. If a stage raises, the item skips the remaining stages and is reported with the error.
+    """
+
+    def __init__(
+        self,
+        stages: Iterable[tuple[str, Callable[[T], None], int]],
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ):
+        """
+        Args:
+            stages (Iterable[tuple[str, Callable[[T], None], int]]): The name, function and worker count of each stage, in order.
+            queue_size (int, optional): Maximum number of items waiting in front of each stage. Default is 4.
+        Raises:
+            ValueError: If there are no stages, or a stage or queue size is smaller than 1.
+        """
+        if queue_size < 1:
+            raise ValueError("Pipeline queue size must be at least 1.")
+
+        self.stages = [
+            Stage(name, function, workers, queue_size)
+            for name, function, workers in stages
+        ]
+        if not self.stages:
+            raise ValueError("A pipeline needs at least one stage.")
+
+    def run(
+        self,
+        items: Iterable[T],
+        on_done: Callable[[T, Exception | None], None],
+    ) -> None:
+        """
+        Push all items through the pipeline and block until every item is done.
+
+        Args:
+            items (Iterable[T]): The items in the order they should enter the pipeline.
+            on_done (Callable[[T, Exception | None], None]): Called from the calling thread for every item, with the error of the stage that failed or None.
+        Raises:
+            Exception: Whatever iterating the items raised, after the items that were already fed are done.
+        """
+        results: queue.Queue = queue.Queue()
+        feed_errors: list[Exception] = []
+        threads = [
+            threading.Thread(
+                target=self._feed,
+                args=(items, feed_errors),
+                name="convo-pipeline-feed",
+            )
+        ]
+        for index, stage in enumerate(self.stages):
+            next_stage = (
+                self.stages[index + 1] if index + 1 < len(self.stages) else None
+            )
+            stage._running_workers = stage.workers
+            threads += [
+                threading.Thread(
+                    target=self._work,
+                    args=(stage, next_stage, results),
+                    name=f"convo-pipeline-{stage.name}",
+                    daemon=True,
+                )
+                for _ in range(stage.workers)
+            ]
+
+        for thread in threads:
+            thread.start()
+
+        while (result := results.get()) is not _END:
+            item, error = result
+            on_done(item, error)
+
+        for thread in threads:
+            thread.join()
+
+        if feed_errors:
+            raise feed_errors[0]
+
+    def queue_depths(self) -> dict[str, int]:
+        """
+        Get the number of items that are currently waiting in front of each stage.
+
+        A queue that is constantly full belongs to a stage that needs more workers, a queue that is constantly empty to one that has more than it needs.
+        """
+        return {stage.name: stage.queue.qsize() for stage in self.stages}
+
+    def get_stats(self) -> list[StageStats]:
+        """
+        Get the counters of each stage, e.g. to tune the worker counts after a run.
+        """
+        return [stage.get_stats() for stage in self.stages]
+
+    def _feed(self, items: Iterable[T], feed_errors: list[Exception]) -> None:
+        first_stage = self.stages[0]
+        try:
+            for item in items:
+                first_stage.put(item)
+        except Exception as e:
+            feed_errors.append(e)
+        finally:
+            for _ in range(first_stage.workers):
+                first_stage.queue.put(_END)
+
+    def _work(
+        self,
+        stage: Stage[T],
+        next_stage: Stage[T] | None,
+        results: queue.Queue,
+    ) -> None:
+        while (item := stage.queue.get()) is not _END:
+            start_time = time.perf_counter()
+            error = None
+            try:
+                stage.function(item)
+            except Exception as e:
+                error = e
+            busy_seconds = time.perf_counter() - start_time
+
+            with stage._lock:
+                stage.busy_seconds += busy_seconds
+                if error is None:
+                    stage.processed += 1
+                else:
+                    stage.failed += 1
+
+            if error is not None:
+                results.put((item, error))
+            elif next_stage is not None:
+                next_stage.put(item)
+            else:
+                results.put((item, None))
+
+        with stage._lock:
+            stage._running_workers -= 1
+            is_last_worker = stage._running_workers == 0
+
+        # Every item of this stage has been passed on or reported by now, so
+        # the end marker can't overtake any of them.
+        if is_last_worker:
+            if next_stage is not None:
+                for _ in range(next_stage.workers):
+                    next_stage.queue.put(_END)
+            else:
+                results.put(_END)
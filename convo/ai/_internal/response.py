@@ -0,0 +1,74 @@
+import json
+from array import array
+from typing import Iterable
+from .types import DeepgramApiResponse, Metadata, Paragraph, Word
+
+NO_SPEAKER = -1
+
+
+class Words:
+    """
+    Word level data of a transcript stored in parallel arrays instead of one dictionary per word.
+    """
+
+    __slots__ = ("punctuated_word", "start", "end", "confidence", "speaker")
+
+    def __init__(self, words: Iterable[Word] = ()):
+        self.punctuated_word: list[str] = []
+        self.start = array("d")
+        self.end = array("d")
+        self.confidence = array("d")
+        self.speaker = array("i")
+        for word in words:
+            self.append(word)
+
+    def __len__(self) -> int:
+        return len(self.punctuated_word)
+
+    def append(self, word: Word) -> None:
+        self.punctuated_word.append(word.get("punctuated_word") or word["word"])
+        self.start.append(word["start"])
+        self.end.append(word["end"])
+        self.confidence.append(word["confidence"])
+        self.speaker.append(word.get("speaker", NO_SPEAKER))
+
+
+class TranscriptionResult:
+    """
+    The parts of a Deepgram response that convo uses.
+
+    Utterances and the duplicated word lists of the raw response are dropped.
+    """
+
+    __slots__ = ("metadata", "transcript", "paragraphs", "words")
+
+    def __init__(
+        self,
+        metadata: Metadata,
+        transcript: str,
+        paragraphs: list[Paragraph],
+        words: Words,
+    ):
+        self.metadata = metadata
+        self.transcript = transcript
+        self.paragraphs = paragraphs
+        self.words = words
+
+
+def decode_response(data: str | bytes) -> TranscriptionResult:
+    """
+    Decode the JSON body of a Deepgram response into a TranscriptionResult.
+    """
+    response: DeepgramApiResponse = json.loads(data)
+    alternative = response["results"]["channels"][0]["alternatives"][0]
+    paragraphs = alternative.get("paragraphs") or {
+        "transcript": alternative["transcript"],
+        "paragraphs": [],
+    }
+
+    return TranscriptionResult(
+        metadata=response["metadata"],
+        transcript=paragraphs["transcript"].strip(),
+        paragraphs=paragraphs["paragraphs"],
+        words=Words(alternative["words"]),
+    )
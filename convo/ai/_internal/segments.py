@@ -0,0 +1,260 @@
+from bisect import bisect_left
+from collections import Counter
+from typing import TypeVar
+from .types import DeepgramApiResponse, Paragraph, Sentence, Word
+
+# Segments after the first start this long before their split point. Both
+# segments transcribe the overlap, which is how their speakers are matched.
+OVERLAP_SECONDS = 30.0
+# Two transcriptions of the same word start at slightly different times.
+MATCH_TOLERANCE_SECONDS = 0.25
+
+Timed = TypeVar("Timed", Word, Sentence, Paragraph)
+Spoken = TypeVar("Spoken", Word, Paragraph)
+
+
+def get_overlap_seconds(segment_seconds: float) -> float:
+    return min(OVERLAP_SECONDS, segment_seconds / 4)
+
+
+def stitch_responses(
+    responses: list[DeepgramApiResponse],
+    offsets: list[float],
+    starts: list[float],
+    expected_speakers: int | None = None,
+) -> DeepgramApiResponse:
+    """
+    Stitch the Deepgram responses of consecutive segments of a recording into the response of the whole recording.
+
+    The times of words, sentences and paragraphs are shifted by the offset of their segment. Every segment after the first starts with an overlap that the previous segment transcribed, too. Its words are only used to match the speakers of the segment to the speakers of the previous segments and are dropped afterwards. A speaker that doesn't speak during the overlap gets a new number, unless all expected speakers have spoken already and they are the only one left on both sides.
+
+    Utterances are left out, convo doesn't use them.
+
+    Args:
+        responses (list[DeepgramApiResponse]): The responses of the segments, in order.
+        offsets (list[float]): Start of every segment in the recording in seconds.
+        starts (list[float]): Start of the part of every segment that isn't an overlap with the previous segment, in seconds of the recording.
+        expected_speakers (int | None, optional): Number of speakers in the conversation, if known.
+    Returns:
+        DeepgramApiResponse: A response of the whole recording.
+    """
+    words: list[Word] = []
+    word_starts: list[float] = []
+    paragraphs: list[Paragraph] = []
+    speaker_count = 0
+    confidences = []
+    for response, offset, start in zip(responses, offsets, starts):
+        alternative = response["results"]["channels"][0]["alternatives"][0]
+        confidences.append(alternative["confidence"])
+        segment_words = [
+            shift_times(word, offset) for word in alternative["words"]
+        ]
+        segment_paragraphs = (alternative.get("paragraphs") or {}).get(
+            "paragraphs", []
+        )
+        speaker_map = match_speakers(words, word_starts, segment_words, start)
+        unmatched_speakers = list(
+            dict.fromkeys(
+                speaker
+                for item in [*segment_words, *segment_paragraphs]
+                if (speaker := item.get("speaker")) is not None
+                and speaker not in speaker_map
+            )
+        )
+        free_speakers = set(range(speaker_count)) - set(speaker_map.values())
+        if (
+            expected_speakers is not None
+            and speaker_count >= expected_speakers
+            and len(unmatched_speakers) == len(free_speakers) == 1
+        ):
+            speaker_map[unmatched_speakers.pop()] = free_speakers.pop()
+        for speaker in unmatched_speakers:
+            speaker_map[speaker] = speaker_count
+            speaker_count += 1
+
+        first_word = len(words)
+        for word in segment_words:
+            if word["start"] >= start:
+                words.append(map_speaker(word, speaker_map))
+                word_starts.append(word["start"])
+
+        for paragraph in segment_paragraphs:
+            if (
+                paragraph := trim_paragraph(
+                    paragraph,
+                    offset,
+                    start,
+                    words[first_word:],
+                    word_starts[first_word:],
+                )
+            ) is not None:
+                paragraphs.append(map_speaker(paragraph, speaker_map))
+
+    paragraphs_transcript = "\n\n".join(
+        get_paragraph_text(paragraph) for paragraph in paragraphs
+    )
+    return {
+        "metadata": {
+            **responses[0]["metadata"],
+            "duration": offsets[-1] + responses[-1]["metadata"]["duration"],
+        },
+        "results": {
+            "channels": [
+                {
+                    "alternatives": [
+                        {
+                            "transcript": " ".join(
+                                word.get("punctuated_word") or word["word"]
+                                for word in words
+                            ),
+                            "confidence": sum(confidences) / len(confidences),
+                            "words": words,
+                            "paragraphs": {
+                                "transcript": f"\n{paragraphs_transcript}\n",
+                                "paragraphs": paragraphs,
+                            },
+                        }
+                    ]
+                }
+            ],
+            "utterances": None,
+            "summary": None,
+        },
+    }
+
+
+def match_speakers(
+    previous_words: list[Word],
+    previous_word_starts: list[float],
+    words: list[Word],
+    start: float,
+) -> dict[int, int]:
+    """
+    Match the speakers of a segment to the speakers of the previous segments by the words both transcribed in their overlap.
+
+    Every word of the overlap votes for the speaker of the previous word that started at about the same time. The pairs with the most votes are matched first, so every speaker is matched at most once.
+
+    Args:
+        previous_words (list[Word]): The stitched words of the previous segments.
+        previous_word_starts (list[float]): The start of every previous word.
+        words (list[Word]): The words of the segment, shifted into the time of the recording.
+        start (float): End of the overlap.
+    Returns:
+        dict[int, int]: The speaker numbers of the previous segments by the speaker numbers of the segment.
+    """
+    votes: Counter[tuple[int, int]] = Counter()
+    for word in words:
+        if word["start"] >= start:
+            break
+        if (speaker := word.get("speaker")) is None:
+            continue
+
+        idx = bisect_left(previous_word_starts, word["start"])
+        candidates = [
+            candidate
+            for candidate in (idx - 1, idx)
+            if 0 <= candidate < len(previous_words)
+        ]
+        if not candidates:
+            continue
+        closest = min(
+            candidates,
+            key=lambda candidate: abs(previous_word_starts[candidate] - word["start"]),
+        )
+        previous_speaker = previous_words[closest].get("speaker")
+        if (
+            previous_speaker is not None
+            and abs(previous_word_starts[closest] - word["start"])
+            <= MATCH_TOLERANCE_SECONDS
+        ):
+            votes[speaker, previous_speaker] += 1
+
+    speaker_map: dict[int, int] = {}
+    for (speaker, previous_speaker), _ in votes.most_common():
+        if speaker not in speaker_map and previous_speaker not in speaker_map.values():
+            speaker_map[speaker] = previous_speaker
+    return speaker_map
+
+
+def trim_paragraph(
+    paragraph: Paragraph,
+    offset: float,
+    start: float,
+    words: list[Word],
+    word_starts: list[float],
+) -> Paragraph | None:
+    """
+    Shift a paragraph into the time of the recording and drop what was said before `start`.
+
+    Sentences that start before `start` but end after it are cut to their words from `start` on, see `trim_sentence`, so the content keeps the same words as the word list and the timeline.
+
+    Args:
+        words (list[Word]): The words of the segment from `start` on, shifted into the time of the recording.
+        word_starts (list[float]): The start of every word.
+    Returns:
+        Paragraph | None: The paragraph, or None if nothing of it is left.
+    """
+    sentences = []
+    trimmed = False
+    for sentence in paragraph["sentences"]:
+        shifted_sentence = shift_times(sentence, offset)
+        if shifted_sentence["start"] < start:
+            trimmed = True
+            if shifted_sentence["end"] <= start or (
+                shifted_sentence := trim_sentence(
+                    shifted_sentence, start, words, word_starts
+                )
+            ) is None:
+                continue
+        sentences.append(shifted_sentence)
+    if not sentences:
+        return None
+
+    trimmed_paragraph = shift_times(paragraph, offset)
+    trimmed_paragraph["sentences"] = sentences
+    if trimmed:
+        trimmed_paragraph["start"] = sentences[0]["start"]
+        trimmed_paragraph["num_words"] = sum(
+            len(sentence["text"].split()) for sentence in sentences
+        )
+    return trimmed_paragraph
+
+
+def trim_sentence(
+    sentence: Sentence, start: float, words: list[Word], word_starts: list[float]
+) -> Sentence | None:
+    """
+    Cut a sentence that crosses `start` to the words that start at or after `start` and before the sentence ends.
+
+    Returns:
+        Sentence | None: The sentence, or None if none of its words are left.
+    """
+    sentence_words = words[
+        bisect_left(word_starts, start) : bisect_left(word_starts, sentence["end"])
+    ]
+    if not sentence_words:
+        return None
+    return {
+        "text": " ".join(
+            word.get("punctuated_word") or word["word"] for word in sentence_words
+        ),
+        "start": sentence_words[0]["start"],
+        "end": sentence["end"],
+    }
+
+
+def shift_times(item: Timed, offset: float) -> Timed:
+    return {**item, "start": item["start"] + offset, "end": item["end"] + offset}
+
+
+def map_speaker(item: Spoken, speaker_map: dict[int, int]) -> Spoken:
+    if (speaker := item.get("speaker")) is not None:
+        item["speaker"] = speaker_map[speaker]
+    return item
+
+
+def get_paragraph_text(paragraph: Paragraph) -> str:
+    text = " ".join(sentence["text"] for sentence in paragraph["sentences"])
+    if (speaker := paragraph.get("speaker")) is None:
+        return text
+    return f"Speaker {speaker}: {text}"
@@ -1,8 +1,17 @@
 import os
-import json
+from typing import TYPE_CHECKING, Callable
 from convo import config, transcripts
 from convo._utils import utils
-from . import deepgram, open_ai
+from . import deepgram, journal, open_ai, vectors
+from .response import Words, decode_response
+from .types import TranscriptJob, TranscriptStage
+
+# asyncio is slow to import, so it is only imported once the async functions
+# below run in an event loop.
+if TYPE_CHECKING:
+    import asyncio
+else:
+    asyncio = utils.LazyModule("asyncio")
 
 
 def create_transcript(
@@ -11,41 +20,335 @@ def create_transcript(
     keywords: list[str],
     date: str,
     cache=False,
-) -> None:
-    # TODO: When you have time you can make this prettier.
-    # Seems unnecessarily weird how the response is handled here.
-    if not cache:
-        deepgram_api_response = deepgram.transcribe(
-            audio_file_path, speakers, keywords
+    summary_cache=True,
+    segment_seconds: float | None = None,
+    resume=True,
+) -> str:
+    """
+    Transcribe an audio file with Deepgram, summarize it with OpenAI and store the transcript.
+
+    Args:
+        audio_file_path (str): The recording to transcribe.
+        speakers (list[str]): The conversation participants in the order they join the conversation.
+        keywords (list[str]): Important keywords that the AI could misunderstand.
+        date (str): Date of the conversation.
+        cache (bool, optional): If True, use the cached Deepgram response instead of calling the API. Default is False.
+        summary_cache (bool, optional): If False, request a new summary even if one is cached. Default is True.
+        segment_seconds (float | None, optional): If set, WAV recordings longer than this are split at pauses and the segments are transcribed concurrently. Default is None.
+        resume (bool, optional): If True, a job with the same recording and options that failed or was interrupted resumes after its last completed stage, and a completed job isn't run again as long as its transcript file is unchanged, see `find_transcript`. If False, every stage runs again. Default is True.
+    Returns:
+        str: Path of the transcript file.
+    """
+    journal.prune()
+    job = create_job(
+        audio_file_path,
+        speakers,
+        keywords,
+        date,
+        cache=cache,
+        summary_cache=summary_cache,
+        segment_seconds=segment_seconds,
+        resume=resume,
+    )
+    if "transcript_file_path" in job:
+        return job["transcript_file_path"]
+
+    for _, run_stage in TRANSCRIPT_STAGES:
+        run_stage(job)
+
+    return job["transcript_file_path"]
+
+
+async def create_transcript_async(
+    audio_file_path: str,
+    speakers: list[str],
+    keywords: list[str],
+    date: str,
+    cache=False,
+    summary_cache=True,
+    segment_seconds: float | None = None,
+    resume=True,
+) -> str:
+    """
+    Create a transcript without blocking the event loop. See `create_transcript`.
+
+    The providers are called with their async clients. File access, decoding and the index updates run in worker threads, so many transcripts can be created concurrently from a single event loop.
+    """
+    await asyncio.to_thread(journal.prune)
+    job = await asyncio.to_thread(
+        create_job,
+        audio_file_path,
+        speakers,
+        keywords,
+        date,
+        cache=cache,
+        summary_cache=summary_cache,
+        segment_seconds=segment_seconds,
+        resume=resume,
+    )
+    if "transcript_file_path" in job:
+        return job["transcript_file_path"]
+
+    await upload_async(job)
+    await asyncio.to_thread(transcribe, job)
+    await summarize_async(job)
+    await asyncio.to_thread(persist, job)
+
+    return job["transcript_file_path"]
+
+
+def create_job(
+    audio_file_path: str,
+    speakers: list[str],
+    keywords: list[str],
+    date: str,
+    cache=False,
+    summary_cache=True,
+    segment_seconds: float | None = None,
+    resume=True,
+) -> TranscriptJob:
+    """
+    Create a job and open its journal. If the journal shows that the job has completed and its transcript file is unchanged, the job gets its `transcript_file_path` right away and none of its stages need to run.
+
+    A completed job without the summary cache starts over instead, since it is run again to get a new summary.
+    """
+    job_id = journal.get_job_id(
+        audio_file_path, speakers, keywords, date, segment_seconds, summary_cache
+    )
+    job_journal = journal.Journal(job_id, audio_file_path, resume=resume)
+    if not summary_cache and job_journal.is_completed("persist"):
+        job_journal = journal.Journal(job_id, audio_file_path, resume=False)
+    job: TranscriptJob = {
+        "audio_file_path": audio_file_path,
+        "speakers": speakers,
+        "keywords": keywords,
+        "date": date,
+        "cache": cache,
+        "summary_cache": summary_cache,
+        "segment_seconds": segment_seconds,
+        "journal": job_journal,
+    }
+    if (transcript_file_path := job_journal.get_transcript_file_path()) is not None:
+        job["transcript_file_path"] = transcript_file_path
+    return job
+
+
+def find_transcript(
+    audio_file_path: str,
+    speakers: list[str],
+    keywords: list[str],
+    date: str,
+    summary_cache=True,
+    segment_seconds: float | None = None,
+) -> str | None:
+    """
+    Find the transcript of a completed job with the same recording and options, which `create_transcript` would skip.
+
+    Returns:
+        str | None: Path of the transcript file, or None if there is no such job, its transcript file was changed since or `summary_cache` is False.
+    """
+    if not summary_cache:
+        return None
+    job_journal = journal.Journal(
+        journal.get_job_id(
+            audio_file_path, speakers, keywords, date, segment_seconds, summary_cache
+        ),
+        audio_file_path,
+    )
+    return job_journal.get_transcript_file_path()
+
+
+def upload(job: TranscriptJob) -> None:
+    """
+    Get the raw Deepgram response for the audio file, either from the API or from the cache.
+
+    The cache key of the response is recorded in the journal. A resumed job gets its response from the cache by that key, without hashing the audio file again.
+    """
+    response_key = job["journal"].data.get("response_key")
+    if response_key is None:
+        response_key = deepgram.get_response_key(
+            job["audio_file_path"],
+            deepgram.get_options(job["speakers"], job["keywords"]),
+        )
+
+    if not job["cache"]:
+        job["response"] = deepgram.request_response(
+            job["audio_file_path"],
+            job["speakers"],
+            job["keywords"],
+            segment_seconds=job["segment_seconds"],
+            response_key=response_key,
         )
-        transcript = deepgram.get_transcript(deepgram_api_response)
     else:
-        deepgram_api_response = deepgram.get_response(audio_file_path)
-        transcript = deepgram.get_transcript(deepgram_api_response)
+        job["response"] = deepgram.get_cached_response(
+            job["audio_file_path"],
+            job["speakers"],
+            job["keywords"],
+            response_key=response_key,
+        )
+    job["journal"].record("upload", response_key=response_key)
+
+
+async def upload_async(job: TranscriptJob) -> None:
+    response_key = job["journal"].data.get("response_key")
+    if response_key is None:
+        response_key = await asyncio.to_thread(
+            deepgram.get_response_key,
+            job["audio_file_path"],
+            deepgram.get_options(job["speakers"], job["keywords"]),
+        )
+
+    if not job["cache"]:
+        job["response"] = await deepgram.request_response_async(
+            job["audio_file_path"],
+            job["speakers"],
+            job["keywords"],
+            segment_seconds=job["segment_seconds"],
+            response_key=response_key,
+        )
+    else:
+        job["response"] = await deepgram.get_cached_response_async(
+            job["audio_file_path"],
+            job["speakers"],
+            job["keywords"],
+            response_key=response_key,
+        )
+    await asyncio.to_thread(
+        job["journal"].record, "upload", response_key=response_key
+    )
+
+
+def transcribe(job: TranscriptJob) -> None:
+    """
+    Decode the Deepgram response into the transcript, its content with the speaker names and the word timings of its timeline. The raw response is dropped afterwards, since it can be much larger than the transcript.
+
+    The summary is still made from the transcript with numbered speakers, so cached summaries stay valid.
+    """
+    response = decode_response(job.pop("response"))
+    job["transcript"] = deepgram.get_transcript(response)
+    job["content"] = deepgram.render_transcript(response, job["speakers"])
+    job["words"] = response.words
+    job["paragraph_starts"] = [
+        paragraph["start"] for paragraph in response.paragraphs
+    ]
+    job["journal"].record("transcribe")
+
+
+def summarize(job: TranscriptJob) -> None:
+    """
+    Summarize the transcript with OpenAI. The summary is recorded in the journal, so a resumed job doesn't request it again, even if `summary_cache` is off or the summary was evicted from the cache.
+    """
+    if (summary := job["journal"].data.get("summary")) is not None:
+        job["summary"] = summary
+        return
+
+    job["summary"] = open_ai.summarize(
+        job["transcript"], job["speakers"], use_cache=job["summary_cache"]
+    )
+    job["journal"].record("summarize", summary=job["summary"])
+
+
+async def summarize_async(job: TranscriptJob) -> None:
+    if (summary := job["journal"].data.get("summary")) is not None:
+        job["summary"] = summary
+        return
+
+    job["summary"] = await open_ai.summarize_async(
+        job["transcript"], job["speakers"], use_cache=job["summary_cache"]
+    )
+    await asyncio.to_thread(
+        job["journal"].record, "summarize", summary=job["summary"]
+    )
+
 
+def persist(job: TranscriptJob) -> None:
+    """
+    Write the transcript file and its timeline and add it to the transcript and vector indexes.
+    """
+    audio_file_path = job["audio_file_path"]
     transcript_data: transcripts.Transcript = {
         "metadata": {
             "audio_file_path": audio_file_path,
-            "date": date,
-            "speakers": speakers,
-            "keywords": keywords,
+            "date": job["date"],
+            "speakers": job["speakers"],
+            "keywords": job["keywords"],
         },
-        "summary": open_ai.summarize(transcript, speakers),
-        "content": deepgram.replace_speaker_placeholders(transcript, speakers),
+        "summary": job["summary"],
+        "content": job.pop("content"),
     }
-    transcript_file_content = json.dumps(transcript_data, indent=4)
-    transcript_file_name = (
-        f"{utils.get_file_name(audio_file_path)}_transcript.json"
-    )
+    transcript_file_name = get_transcript_file_name(audio_file_path)
     transcript_file_path = os.path.join(
         config.TRANSCRIPTS_DIR_PATH, transcript_file_name
     )
 
-    if cache and os.path.exists(transcript_file_path):
-        os.remove(transcript_file_path)
+    transcripts.write_transcript(transcript_file_path, transcript_data)
+    write_timeline(
+        transcript_file_name,
+        job["speakers"],
+        job.pop("words"),
+        job.pop("paragraph_starts"),
+    )
+    transcripts.update_index(transcript_file_path, transcript_data)
+    vectors.add(transcript_file_name, transcript_data["content"])
+
+    job["transcript_file_path"] = transcript_file_path
+    job["journal"].record_transcript(transcript_file_path)
+
+
+def get_transcript_file_name(audio_file_path: str) -> str:
+    """
+    Returns:
+        str: Name of the transcript file of an audio file. It only depends on the name of the audio file without its directory and extension.
+    """
+    return f"{utils.get_file_name(audio_file_path)}_transcript.json"
+
+
+def create_timeline(transcript_name: str) -> str:
+    """
+    Create the timeline of an existing transcript from the cached Deepgram response of its audio file, without calling the API.
+
+    Returns:
+        str: Path of the timeline file.
+    Raises:
+        FileNotFoundError: If the transcript or its audio file doesn't exist.
+        CacheMissError: If the response for the audio file isn't cached.
+    """
+    transcript_path = os.path.join(config.TRANSCRIPTS_DIR_PATH, transcript_name)
+    if not os.path.exists(transcript_path):
+        raise FileNotFoundError(f"Transcript '{transcript_name}' does not exist.")
+
+    metadata = transcripts.read_metadata(transcript_path)
+    response = deepgram.get_response(
+        metadata["audio_file_path"], metadata["speakers"], metadata["keywords"]
+    )
+    return write_timeline(
+        transcript_name,
+        metadata["speakers"],
+        response.words,
+        [paragraph["start"] for paragraph in response.paragraphs],
+    )
+
+
+def write_timeline(
+    transcript_name: str,
+    speakers: list[str],
+    words: Words,
+    paragraph_starts: list[float],
+) -> str:
+    return transcripts.write_timeline(
+        transcript_name,
+        speakers,
+        words.punctuated_word,
+        words.start,
+        words.end,
+        words.speaker,
+        paragraph_starts,
+    )
+
 
-    with open(
-        transcript_file_path,
-        "w",
-    ) as file:
-        file.write(transcript_file_content)
+TRANSCRIPT_STAGES: list[tuple[TranscriptStage, Callable[[TranscriptJob], None]]] = [
+    ("upload", upload),
+    ("transcribe", transcribe),
+    ("summarize", summarize),
+    ("persist", persist),
+]
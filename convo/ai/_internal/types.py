@@ -1,4 +1,8 @@
-from typing import TypedDict, Mapping, Literal
+from typing import TYPE_CHECKING, NotRequired, TypedDict, Mapping, Literal
+
+if TYPE_CHECKING:
+    from .journal import Journal
+    from .response import Words
 
 
 class ModelInfo(TypedDict):
@@ -76,3 +80,75 @@ class Results(TypedDict):
 class DeepgramApiResponse(TypedDict):
     metadata: Metadata
     results: Results
+
+type TranscriptStage = Literal["upload", "transcribe", "summarize", "persist"]
+
+class TranscriptJob(TypedDict):
+    audio_file_path: str
+    speakers: list[str]
+    keywords: list[str]
+    date: str
+    cache: bool
+    summary_cache: bool
+    segment_seconds: float | None
+    response: NotRequired[str | bytes]
+    transcript: NotRequired[str]
+    content: NotRequired[str]
+    words: NotRequired["Words"]
+    paragraph_starts: NotRequired[list[float]]
+    summary: NotRequired[str]
+    transcript_file_path: NotRequired[str]
+    journal: "Journal"
+
+class JobJournal(TypedDict):
+    version: int
+    audio_file_path: str
+    audio_file_size: int
+    audio_file_mtime_ns: int
+    completed: list[TranscriptStage]
+    response_key: NotRequired[str]
+    summary: NotRequired[str]
+    transcript_file_path: NotRequired[str]
+    transcript_file_size: NotRequired[int]
+    transcript_file_mtime_ns: NotRequired[int]
+
+class StageStats(TypedDict):
+    name: str
+    workers: int
+    processed: int
+    failed: int
+    queue_depth: int
+    peak_queue_depth: int
+    busy_seconds: float
+
+class ConversionStats(TypedDict):
+    files: int
+    original_bytes: int
+    converted_bytes: int
+
+class ProviderStats(TypedDict):
+    requests: int
+    throttled: int
+    throttled_seconds: float
+    rate_limited: int
+    retried: int
+    failed: int
+
+class ClientOptions(TypedDict):
+    max_connections: NotRequired[int]
+    max_keepalive_connections: NotRequired[int]
+    timeout: NotRequired[float]
+    connect_timeout: NotRequired[float]
+    base_url: NotRequired[str]
+
+class BatchResult(TypedDict):
+    audio_file_path: str
+    transcript_file_path: str | None
+    error: Exception | None
+    skipped: bool
+
+class Excerpt(TypedDict):
+    name: str
+    paragraph: int
+    text: str
+    score: float
@@ -0,0 +1,417 @@
+import os
+import re
+import json
+import math
+import zlib
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from importlib.util import find_spec
+from typing import Any, Callable, Iterator
+from convo import config, transcripts
+from .types import Excerpt
+
+CHUNKS_FILE_NAME = "chunks.sqlite3"
+MATRIX_FILE_NAME = "vectors.f32"
+CHUNKS_SCHEMA = """\
+CREATE TABLE IF NOT EXISTS chunks (
+    row INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    paragraph INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    removed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS chunks_name ON chunks (name);
+
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+PARAGRAPH_SEPARATOR = "\n\n"
+CHUNK_CHARACTERS = 1000
+# Longer paragraphs are split at sentence ends, and sentences that are still
+# longer at spaces, so a single monologue can't become an excerpt that takes
+# up the whole query budget.
+MAX_CHUNK_CHARACTERS = 2 * CHUNK_CHARACTERS
+SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?])\s+")
+# Changes whenever the way transcripts are split into chunks changes, which
+# rebuilds the index like a new embedding function does.
+CHUNKS_VERSION = 2
+HASHING_DIMENSION = 512
+TOKEN_PATTERN = re.compile(r"\w+")
+SIGN_BIT = 1 << 31
+# Like in the transcript index, a directory mtime this close to the last scan
+# isn't trusted, since later changes in the same clock tick wouldn't show.
+MTIME_GRANULARITY_NS = 2_000_000_000
+
+type Embed = Callable[[list[str]], Any]
+
+
+class EmbeddingFunction:
+    """
+    Turns texts into a float32 matrix with one row of `dimension` values per text.
+
+    The name identifies the embedding in the index. Vectors of different embeddings can't be compared, so changing it rebuilds the index.
+    """
+
+    __slots__ = ("name", "dimension", "embed")
+
+    def __init__(self, name: str, dimension: int, embed: Embed):
+        self.name = name
+        self.dimension = dimension
+        self.embed = embed
+
+
+def embed_with_hashing(texts: list[str]):
+    """
+    Embed texts offline with a signed hashing vectorizer: every word is hashed to one of the dimensions, counts are dampened logarithmically and rows are normalized to unit length.
+    """
+    import numpy as np
+
+    matrix = np.zeros((len(texts), HASHING_DIMENSION), dtype=np.float32)
+    for idx, text in enumerate(texts):
+        hashes = np.fromiter(
+            (
+                zlib.crc32(token.encode())
+                for token in TOKEN_PATTERN.findall(text.lower())
+            ),
+            dtype=np.int64,
+        )
+        signs = np.where(hashes & SIGN_BIT, 1.0, -1.0).astype(np.float32)
+        np.add.at(matrix[idx], hashes % HASHING_DIMENSION, signs)
+
+    matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+DEFAULT_EMBEDDING_FUNCTION = EmbeddingFunction(
+    "hashing", HASHING_DIMENSION, embed_with_hashing
+)
+_embedding_function = DEFAULT_EMBEDDING_FUNCTION
+_lock = threading.Lock()
+
+
+def is_available() -> bool:
+    """
+    Returns:
+        bool: True if NumPy is installed, which the vector index depends on.
+    """
+    # NumPy takes longer to import than all of convo, so it's only imported
+    # by the functions that use it.
+    return find_spec("numpy") is not None
+
+
+def set_embedding_function(embedding_function: EmbeddingFunction) -> None:
+    """
+    Replace the embedding function, e.g. with one that calls an embedding API.
+    """
+    global _embedding_function
+    _embedding_function = embedding_function
+
+
+def split_paragraph(paragraph: str) -> list[str]:
+    """
+    Split a paragraph that is longer than MAX_CHUNK_CHARACTERS into pieces of whole sentences. Sentences that are longer on their own are wrapped at spaces.
+    """
+    if len(paragraph) <= MAX_CHUNK_CHARACTERS:
+        return [paragraph]
+
+    import textwrap
+
+    pieces = []
+    piece = ""
+    for sentence in SENTENCE_END_PATTERN.split(paragraph):
+        for part in textwrap.wrap(sentence, MAX_CHUNK_CHARACTERS) or [""]:
+            if piece and len(piece) + 1 + len(part) > MAX_CHUNK_CHARACTERS:
+                pieces.append(piece)
+                piece = ""
+            piece = f"{piece} {part}" if piece else part
+
+    if piece:
+        pieces.append(piece)
+    return pieces
+
+
+def split_into_chunks(content: str) -> list[tuple[int, str]]:
+    """
+    Split the content of a transcript into chunks of whole paragraphs.
+
+    Consecutive paragraphs are merged until a chunk reaches CHUNK_CHARACTERS characters, but never beyond MAX_CHUNK_CHARACTERS. Paragraphs longer than that are split into several chunks, see `split_paragraph`.
+
+    Returns:
+        list[tuple[int, str]]: The index of the first paragraph of every chunk and its text.
+    """
+    chunks = []
+    chunk_paragraphs: list[str] = []
+    chunk_length = 0
+    chunk_start = 0
+    for idx, paragraph in enumerate(content.split(PARAGRAPH_SEPARATOR)):
+        for piece in split_paragraph(paragraph):
+            separator_length = len(PARAGRAPH_SEPARATOR) if chunk_paragraphs else 0
+            if (
+                chunk_paragraphs
+                and chunk_length + separator_length + len(piece) > MAX_CHUNK_CHARACTERS
+            ):
+                chunks.append(
+                    (chunk_start, PARAGRAPH_SEPARATOR.join(chunk_paragraphs))
+                )
+                chunk_paragraphs = []
+                chunk_length = separator_length = 0
+            if not chunk_paragraphs:
+                chunk_start = idx
+            chunk_paragraphs.append(piece)
+            chunk_length += separator_length + len(piece)
+            if chunk_length >= CHUNK_CHARACTERS:
+                chunks.append(
+                    (chunk_start, PARAGRAPH_SEPARATOR.join(chunk_paragraphs))
+                )
+                chunk_paragraphs = []
+                chunk_length = 0
+
+    if chunk_paragraphs:
+        chunks.append((chunk_start, PARAGRAPH_SEPARATOR.join(chunk_paragraphs)))
+    return chunks
+
+
+@contextmanager
+def connect(write=True) -> Iterator[sqlite3.Connection]:
+    """
+    Open the chunk table and run the block in a single transaction.
+
+    Args:
+        write (bool, optional): If True, take the write lock up front, which also serializes appends to the vector matrix across processes. If False, the block only reads a consistent snapshot and doesn't block writers of other processes. Default is True.
+    """
+    os.makedirs(config.VECTORS_DIR_PATH, exist_ok=True)
+    connection = sqlite3.connect(
+        os.path.join(config.VECTORS_DIR_PATH, CHUNKS_FILE_NAME), timeout=30
+    )
+    try:
+        if write:
+            with _lock, connection:
+                connection.executescript(CHUNKS_SCHEMA)
+                connection.execute("BEGIN IMMEDIATE")
+                ensure_embedding_function(connection)
+                yield connection
+        else:
+            with connection:
+                connection.executescript(CHUNKS_SCHEMA)
+                connection.execute("BEGIN")
+                yield connection
+    finally:
+        connection.close()
+
+
+def get_matrix_file_path() -> str:
+    return os.path.join(config.VECTORS_DIR_PATH, MATRIX_FILE_NAME)
+
+
+def get_embedding() -> str:
+    return json.dumps(
+        [_embedding_function.name, _embedding_function.dimension, CHUNKS_VERSION]
+    )
+
+
+def ensure_embedding_function(connection: sqlite3.Connection) -> None:
+    """
+    Clear the index if it was built with a different embedding function or chunking.
+    """
+    embedding = get_embedding()
+    if get_state(connection, "embedding") == embedding:
+        return
+
+    connection.execute("DELETE FROM chunks")
+    set_state(connection, "embedding", embedding)
+    connection.execute(
+        "DELETE FROM state WHERE key IN ('dir_mtime_ns', 'scanned_at_ns')"
+    )
+    with open(get_matrix_file_path(), "wb"):
+        pass
+
+
+def get_state(connection: sqlite3.Connection, key: str, default=None):
+    row = connection.execute(
+        "SELECT value FROM state WHERE key = ?", (key,)
+    ).fetchone()
+    return default if row is None else row[0]
+
+
+def set_state(connection: sqlite3.Connection, key: str, value) -> None:
+    connection.execute(
+        "INSERT OR REPLACE INTO state VALUES (?, ?)", (key, value)
+    )
+
+
+def add(name: str, content: str) -> None:
+    """
+    Embed the chunks of a transcript and append them to the index.
+
+    The vectors are appended to the end of the matrix file, existing rows are never rewritten. Chunks of a previous version of the transcript are marked as removed.
+    """
+    if not is_available():
+        return
+
+    chunks = split_into_chunks(content)
+    vectors = _embedding_function.embed([text for _, text in chunks])
+    with connect() as connection:
+        append(connection, name, chunks, vectors)
+
+
+def append(connection: sqlite3.Connection, name: str, chunks, vectors) -> None:
+    import numpy as np
+
+    (row_count,) = connection.execute(
+        "SELECT COALESCE(MAX(row) + 1, 0) FROM chunks"
+    ).fetchone()
+    row_size = _embedding_function.dimension * np.dtype(np.float32).itemsize
+
+    connection.execute("UPDATE chunks SET removed = 1 WHERE name = ?", (name,))
+    connection.executemany(
+        "INSERT INTO chunks (row, name, paragraph, text) VALUES (?, ?, ?, ?)",
+        [
+            (row_count + idx, name, paragraph, text)
+            for idx, (paragraph, text) in enumerate(chunks)
+        ],
+    )
+    with open(get_matrix_file_path(), "r+b") as file:
+        # Drop rows left behind by a write whose transaction never committed.
+        file.truncate(row_count * row_size)
+        file.seek(0, os.SEEK_END)
+        file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+
+
+def is_ingested(connection: sqlite3.Connection) -> bool:
+    """
+    Returns:
+        bool: True if the index was built with the current embedding function and the transcripts directory hasn't changed since it was last scanned. This only reads the index and stats the directory.
+    """
+    dir_mtime_ns = os.stat(config.TRANSCRIPTS_DIR_PATH).st_mtime_ns
+    return (
+        get_state(connection, "embedding") == get_embedding()
+        and get_state(connection, "dir_mtime_ns") == dir_mtime_ns
+        and get_state(connection, "scanned_at_ns", 0) - dir_mtime_ns
+        > MTIME_GRANULARITY_NS
+    )
+
+
+def ingest_existing_transcripts(connection: sqlite3.Connection) -> None:
+    """
+    Bring the index up to date with the transcripts directory, the same way the transcript index is reconciled.
+
+    Transcripts that were written before the index existed, before the embedding function changed or by another tool are added, the chunks of deleted transcripts are marked as removed. If the directory hasn't changed since the last scan, this is a single stat call.
+    """
+    if is_ingested(connection):
+        return
+
+    dir_mtime_ns = os.stat(config.TRANSCRIPTS_DIR_PATH).st_mtime_ns
+    scanned_at_ns = time.time_ns()
+    indexed_names = {
+        name
+        for (name,) in connection.execute(
+            "SELECT DISTINCT name FROM chunks WHERE removed = 0"
+        )
+    }
+    file_names = sorted(os.listdir(config.TRANSCRIPTS_DIR_PATH))
+    connection.executemany(
+        "UPDATE chunks SET removed = 1 WHERE name = ?",
+        [(name,) for name in indexed_names.difference(file_names)],
+    )
+    for file_name in file_names:
+        if file_name in indexed_names or file_name.startswith("."):
+            continue
+        try:
+            content = transcripts.read_section(
+                os.path.join(config.TRANSCRIPTS_DIR_PATH, file_name), "content"
+            )
+        except (OSError, ModuleNotFoundError, ValueError, KeyError, TypeError):
+            continue
+        chunks = split_into_chunks(content)
+        vectors = _embedding_function.embed([text for _, text in chunks])
+        append(connection, file_name, chunks, vectors)
+
+    set_state(connection, "dir_mtime_ns", dir_mtime_ns)
+    set_state(connection, "scanned_at_ns", scanned_at_ns)
+
+
+def search_excerpts(query: str, limit=5) -> list[Excerpt]:
+    """
+    Find the chunks of transcript content closest to a query.
+
+    The whole matrix is memory-mapped and scored with a single matrix-vector product, the best rows are picked with a partial sort. The write lock is only taken if the transcripts directory changed since the last search, see `ingest_existing_transcripts`.
+
+    Returns:
+        list[Excerpt]: The closest chunks, best match first. Empty if NumPy isn't installed.
+    """
+    if not is_available() or limit < 1:
+        return []
+
+    import numpy as np
+
+    query_vector = _embedding_function.embed([query])[0]
+    with connect(write=False) as connection:
+        ingested = is_ingested(connection)
+    if not ingested:
+        with connect() as connection:
+            ingest_existing_transcripts(connection)
+
+    with connect(write=False) as connection:
+        (row_count,) = connection.execute(
+            "SELECT COALESCE(MAX(row) + 1, 0) FROM chunks"
+        ).fetchone()
+        if row_count == 0:
+            return []
+
+        matrix = np.memmap(
+            get_matrix_file_path(),
+            dtype=np.float32,
+            mode="r",
+            shape=(row_count, _embedding_function.dimension),
+        )
+        scores = np.asarray(matrix @ query_vector)
+        removed_rows = [
+            row
+            for (row,) in connection.execute(
+                "SELECT row FROM chunks WHERE removed = 1"
+            )
+        ]
+        scores[removed_rows] = -np.inf
+
+        # Overfetch candidates because transcripts may have been removed since
+        # they were indexed.
+        candidate_count = min(limit * 4, row_count)
+        while True:
+            candidates = np.argpartition(-scores, candidate_count - 1)[
+                :candidate_count
+            ]
+            excerpts = get_excerpts(
+                connection, candidates[np.argsort(-scores[candidates])], scores, limit
+            )
+            if len(excerpts) == limit or candidate_count == row_count:
+                break
+            candidate_count = min(candidate_count * 4, row_count)
+
+    return excerpts
+
+
+def get_excerpts(
+    connection: sqlite3.Connection, rows, scores, limit: int
+) -> list[Excerpt]:
+    excerpts: list[Excerpt] = []
+    for row in rows:
+        if len(excerpts) == limit or not math.isfinite(scores[row]):
+            break
+        name, paragraph, text = connection.execute(
+            "SELECT name, paragraph, text FROM chunks WHERE row = ?", (int(row),)
+        ).fetchone()
+        if os.path.exists(os.path.join(config.TRANSCRIPTS_DIR_PATH, name)):
+            excerpts.append(
+                {
+                    "name": name,
+                    "paragraph": paragraph,
+                    "text": text,
+                    "score": float(scores[row]),
+                }
+            )
+    return excerpts
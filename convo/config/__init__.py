@@ -1,32 +1,65 @@
 from ._internal.config import (
+    add_common_words,
     CACHE_DIR_PATH,
     CONFIG_FILE_PATH,
+    DEFAULT_CACHE_SIZE_LIMIT_MB,
+    DEFAULT_COMPRESSION,
+    DEFAULT_CONVERT_AUDIO,
     DEFAULT_MODEL,
+    DEFAULT_QUERY_TOKEN_BUDGET,
     get_ai_config_or_raise,
     get_config_data,
     get_config_data_as_json,
     get_config_data_as_str,
+    INDEX_FILE_PATH,
+    JOBS_DIR_PATH,
+    remove_common_words,
     setup,
     set_config_data,
+    TIMELINES_DIR_PATH,
     TRANSCRIPTS_DIR_PATH,
+    VECTORS_DIR_PATH,
 )
 from ._internal.errors import MissingAiProviderError
-from ._internal.types import ConfigData, Gender, GENDERS, Provider
+from ._internal.types import (
+    AiConfig,
+    Compression,
+    COMPRESSIONS,
+    ConfigData,
+    Gender,
+    GENDERS,
+    Provider,
+    RateLimits,
+)
 
 __all__ = [
+    "add_common_words",
+    "AiConfig",
     "CACHE_DIR_PATH",
+    "Compression",
+    "COMPRESSIONS",
     "CONFIG_FILE_PATH",
     "ConfigData",
+    "DEFAULT_CACHE_SIZE_LIMIT_MB",
+    "DEFAULT_COMPRESSION",
+    "DEFAULT_CONVERT_AUDIO",
     "DEFAULT_MODEL",
+    "DEFAULT_QUERY_TOKEN_BUDGET",
     "Gender",
     "GENDERS",
     "get_ai_config_or_raise",
     "get_config_data",
     "get_config_data_as_json",
     "get_config_data_as_str",
+    "INDEX_FILE_PATH",
+    "JOBS_DIR_PATH",
     "MissingAiProviderError",
     "Provider",
+    "RateLimits",
+    "remove_common_words",
     "setup",
     "set_config_data",
+    "TIMELINES_DIR_PATH",
     "TRANSCRIPTS_DIR_PATH",
+    "VECTORS_DIR_PATH",
 ]
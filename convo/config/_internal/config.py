@@ -1,36 +1,74 @@
 import os
+import copy
 import json
-from typing import Literal
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Literal
 from .errors import MissingAiProviderError
-from .types import AiConfig, ConfigData, Gender, Provider
+from .types import AiConfig, Compression, ConfigData, Gender, Provider, RateLimits
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 CONFIG_DIR_NAME = ".convo"
 CONFIG_DIR_PATH = os.path.expanduser(f"~/{CONFIG_DIR_NAME}")
 CONFIG_FILE_NAME = "config.json"
 CONFIG_FILE_PATH = os.path.join(CONFIG_DIR_PATH, CONFIG_FILE_NAME)
+# config.json itself is replaced on every write, so the lock lives in a file
+# of its own.
+CONFIG_LOCK_FILE_PATH = f"{CONFIG_FILE_PATH}.lock"
 CACHE_DIR_NAME = "cache"
 CACHE_DIR_PATH = os.path.join(CONFIG_DIR_PATH, CACHE_DIR_NAME)
 TRANSCRIPTS_DIR_NAME = "transcripts"
 TRANSCRIPTS_DIR_PATH = os.path.join(CONFIG_DIR_PATH, TRANSCRIPTS_DIR_NAME)
+VECTORS_DIR_NAME = "vectors"
+VECTORS_DIR_PATH = os.path.join(CONFIG_DIR_PATH, VECTORS_DIR_NAME)
+TIMELINES_DIR_NAME = "timelines"
+TIMELINES_DIR_PATH = os.path.join(CONFIG_DIR_PATH, TIMELINES_DIR_NAME)
+JOBS_DIR_NAME = "jobs"
+JOBS_DIR_PATH = os.path.join(CONFIG_DIR_PATH, JOBS_DIR_NAME)
+INDEX_FILE_NAME = "index.sqlite3"
+INDEX_FILE_PATH = os.path.join(CONFIG_DIR_PATH, INDEX_FILE_NAME)
 DEFAULT_MODEL = {"deepgram": "nova-2", "open_ai": "gpt-3.5-turbo"}
+DEFAULT_CACHE_SIZE_LIMIT_MB = 1024
+DEFAULT_COMPRESSION: Compression = "none"
+DEFAULT_QUERY_TOKEN_BUDGET = 4000
+DEFAULT_CONVERT_AUDIO = False
+
+_cache_lock = threading.Lock()
+_cached_config: tuple[tuple[int, int, int], ConfigData] | None = None
+_write_lock = threading.Lock()
 
 
 def get_config_data() -> ConfigData:
     """
     Retrieve data from the config.json file.
 
+    The parsed file is cached for the whole process and only read again when the file has changed, so calling this often is cheap.
+
     Returns:
-        ConfigData: A dictionary containing the config data.
+        ConfigData: A dictionary containing the config data. It's a copy, changing it doesn't change the config.
     Raises:
         FileNotFoundError: If config.json file doesn't exist.
     """
-    if not os.path.exists(CONFIG_FILE_PATH):
+    global _cached_config
+
+    try:
+        stat = os.stat(CONFIG_FILE_PATH)
+    except FileNotFoundError:
         raise FileNotFoundError("config.json file not found.")
 
-    with open(CONFIG_FILE_PATH, "r") as config_file:
-        config_data: ConfigData = json.load(config_file)
+    # Writes replace the file, so the inode changes even when two writes
+    # happen within the resolution of the modification time.
+    file_version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    with _cache_lock:
+        if _cached_config is None or _cached_config[0] != file_version:
+            with open(CONFIG_FILE_PATH, "r") as config_file:
+                _cached_config = (file_version, json.load(config_file))
 
-    return config_data
+        return copy.deepcopy(_cached_config[1])
 
 
 def get_config_data_as_json() -> str:
@@ -59,22 +97,35 @@ def get_config_data_as_str() -> str:
     data = f"""\
 Version:          {config_data['version']}
 Common Words:     {', '.join(config_data['common_words'])}
+Cache Size Limit: {config_data.get('cache_size_limit_mb', DEFAULT_CACHE_SIZE_LIMIT_MB)} MB
+Query Budget:     {config_data.get('query_token_budget', DEFAULT_QUERY_TOKEN_BUDGET)} tokens
+Convert Audio:    {'yes' if config_data.get('convert_audio', DEFAULT_CONVERT_AUDIO) else 'no'}
 """
 
+    rate_limits = config_data.get("rate_limits", {})
     if deepgram_config := config_data.get("deepgram"):
         data += f"""\
 Deepgram:
     API-Key:          {deepgram_config['api_key']}
     Model:            {deepgram_config['model']}
-"""
+{format_rate_limits(rate_limits.get("deepgram", {}))}"""
 
     if open_ai_config := config_data.get("open_ai"):
         data += f"""\
 OpenAI:
     API-Key:          {open_ai_config['api_key']}
     Model:            {open_ai_config['model']}
-"""
+{format_rate_limits(rate_limits.get("open_ai", {}))}"""
+
+    return data
+
 
+def format_rate_limits(rate_limits: RateLimits) -> str:
+    data = ""
+    if requests_per_minute := rate_limits.get("requests_per_minute"):
+        data += f"    Requests/Minute:  {requests_per_minute}\n"
+    if tokens_per_minute := rate_limits.get("tokens_per_minute"):
+        data += f"    Tokens/Minute:    {tokens_per_minute}\n"
     return data
 
 
@@ -123,33 +174,143 @@ def set_config_data(
     deepgram_model: str | None = None,
     open_ai_api_key: str | None = None,
     open_ai_model: str | None = None,
-    common_words: list[str] = [],
+    common_words: list[str] | None = None,
     user_name: str | None = None,
     user_gender: Gender | None = None,
+    cache_size_limit_mb: int | None = None,
+    compression: Compression | None = None,
+    query_token_budget: int | None = None,
+    convert_audio: bool | None = None,
+    rate_limits: dict[Provider, RateLimits] | None = None,
 ):
     """
     Set the fields of the config.json file.
 
+    Changes are made under a lock and written atomically, so concurrent convo processes neither lose each other's changes nor see a half written file.
+
     Raises:
         FileNotFoundError: If config.json file doesn't exist.
         MissingAiProviderError: If you try to set a provider that has no API-Key.
     """
-    config_data = get_config_data()
+    with lock_config():
+        config_data = get_config_data()
+
+        if deepgram_api_key or deepgram_model:
+            set_ai_config(config_data, "deepgram", deepgram_api_key, deepgram_model)
+        if open_ai_api_key or open_ai_model:
+            set_ai_config(config_data, "open_ai", open_ai_api_key, open_ai_model)
+        if common_words:
+            unique_common_words = list(set(common_words))
+            config_data["common_words"] = unique_common_words
+        if user_name:
+            config_data["user"]["name"] = user_name
+        if user_gender:
+            config_data["user"]["gender"] = user_gender
+        if cache_size_limit_mb:
+            config_data["cache_size_limit_mb"] = cache_size_limit_mb
+        if compression:
+            config_data["compression"] = compression
+        if query_token_budget:
+            config_data["query_token_budget"] = query_token_budget
+        if convert_audio is not None:
+            config_data["convert_audio"] = convert_audio
+        for provider, provider_rate_limits in (rate_limits or {}).items():
+            merged_rate_limits = {
+                **config_data.get("rate_limits", {}).get(provider, {}),
+                **provider_rate_limits,
+            }
+            # A limit of 0 removes it.
+            config_data.setdefault("rate_limits", {})[provider] = {
+                name: limit for name, limit in merged_rate_limits.items() if limit
+            }
+
+        write_config_data(config_data)
+
+
+def add_common_words(words: list[str]) -> list[str]:
+    """
+    Add words to the common words in config.json.
+
+    Returns:
+        list[str]: All common words after the change.
+    Raises:
+        FileNotFoundError: If config.json file doesn't exist.
+    """
+    with lock_config():
+        config_data = get_config_data()
+        config_data["common_words"] = list(
+            dict.fromkeys(config_data["common_words"] + words)
+        )
+        write_config_data(config_data)
+
+    return config_data["common_words"]
+
+
+def remove_common_words(words: list[str]) -> list[str]:
+    """
+    Remove words from the common words in config.json.
 
-    if deepgram_api_key or deepgram_model:
-        set_ai_config(config_data, "deepgram", deepgram_api_key, deepgram_model)
-    if open_ai_api_key or open_ai_model:
-        set_ai_config(config_data, "open_ai", open_ai_api_key, open_ai_model)
-    if common_words:
-        unique_common_words = list(set(common_words))
-        config_data["common_words"] = unique_common_words
-    if user_name:
-        config_data["user"]["name"] = user_name
-    if user_gender:
-        config_data["user"]["gender"] = user_gender
+    Returns:
+        list[str]: The common words that are left.
+    Raises:
+        FileNotFoundError: If config.json file doesn't exist.
+    """
+    with lock_config():
+        config_data = get_config_data()
+        config_data["common_words"] = [
+            word for word in config_data["common_words"] if word not in words
+        ]
+        write_config_data(config_data)
 
-    with open(CONFIG_FILE_PATH, "w") as config_file:
-        json.dump(config_data, config_file, indent=4)
+    return config_data["common_words"]
+
+
+@contextmanager
+def lock_config() -> Iterator[None]:
+    """
+    Hold an exclusive lock on the config for the duration of the context, across threads and processes.
+
+    The process lock is an advisory `flock`, which isn't available on Windows. There only threads of the same process are excluded.
+
+    Raises:
+        FileNotFoundError: If the config directory doesn't exist.
+    """
+    if not os.path.exists(CONFIG_DIR_PATH):
+        raise FileNotFoundError("Config directory not found.")
+
+    with _write_lock:
+        if fcntl is None:
+            yield
+            return
+
+        with open(CONFIG_LOCK_FILE_PATH, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_config_data(config_data: ConfigData):
+    """
+    Write the config to a temporary file and move it over config.json, so readers see either the old or the new config but never a partial one.
+    """
+    # Every command reads the config, but few write it, so tempfile is only
+    # imported here.
+    import tempfile
+
+    file_descriptor, temp_file_path = tempfile.mkstemp(
+        dir=CONFIG_DIR_PATH, prefix=f".{CONFIG_FILE_NAME}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(file_descriptor, "w") as config_file:
+            json.dump(config_data, config_file, indent=4)
+            config_file.flush()
+            os.fsync(config_file.fileno())
+        os.replace(temp_file_path, CONFIG_FILE_PATH)
+    except BaseException:
+        os.remove(temp_file_path)
+        raise
 
 
 def get_transcripts(path=False) -> list[str]:
@@ -179,35 +340,6 @@ def get_transcripts(path=False) -> list[str]:
     return transcripts
 
 
-def get_transcript(filename: str, path=False) -> str:
-    """
-    Retrieve the content or path of a transcript file.
-
-    Args:
-        filename: The name of the transcript file.
-        path: If True, returns the path of the transcript. Defaults to False.
-
-    Returns:
-        str: The content of the transcript file or the path and content of the transcript file.
-
-    Raises:
-        FileNotFoundError: If the file does not exist.
-    """
-    transcript_path = os.path.join(TRANSCRIPTS_DIR_PATH, filename)
-
-    if not os.path.exists(transcript_path):
-        raise FileNotFoundError(
-            f"Transcript file with the name '{filename}' does not exist."
-        )
-
-    if path:
-        return transcript_path
-
-    with open(transcript_path, "r") as file:
-        content = file.read()
-    return content
-
-
 def setup(user_name: str, gender: Gender) -> ConfigData:
     """
     Setup the `.convo` config folder with the following content:
@@ -234,7 +366,7 @@ def setup(user_name: str, gender: Gender) -> ConfigData:
         },
         "common_words": [],
     }
-    with open(CONFIG_FILE_PATH, "w") as config_file:
-        json.dump(initial_config_data, config_file, indent=4)
+    with lock_config():
+        write_config_data(initial_config_data)
 
     return initial_config_data
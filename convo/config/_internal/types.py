@@ -3,11 +3,17 @@ from typing import NotRequired, TypedDict, Literal
 type Provider = Literal['deepgram', 'open_ai']
 type Gender = Literal['female', 'male', 'non-binary', 'not-specified']
 GENDERS: list[Gender] = ['female', 'male', 'non-binary', 'not-specified']
+type Compression = Literal['none', 'gzip', 'lzma', 'zstd']
+COMPRESSIONS: list[Compression] = ['none', 'gzip', 'lzma', 'zstd']
 
 class AiConfig(TypedDict):
     api_key: str
     model: str
 
+class RateLimits(TypedDict):
+    requests_per_minute: NotRequired[int]
+    tokens_per_minute: NotRequired[int]
+
 class UserConfig(TypedDict):
     name: str
     gender: Gender
@@ -19,3 +25,8 @@ class ConfigData(TypedDict):
     user: UserConfig
     deepgram: NotRequired[AiConfig]
     open_ai: NotRequired[AiConfig]
+    cache_size_limit_mb: NotRequired[int]
+    compression: NotRequired[Compression]
+    query_token_budget: NotRequired[int]
+    convert_audio: NotRequired[bool]
+    rate_limits: NotRequired[dict[Provider, RateLimits]]
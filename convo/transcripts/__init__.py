@@ -1,4 +1,56 @@
-from ._internal.transcripts import list, show
-from ._internal.types import Transcript, TranscriptMetadata
+from ._internal.transcripts import (
+    compact,
+    get_summaries,
+    iter_show,
+    list,
+    migrate,
+    rank_summaries,
+    remove,
+    search,
+    show,
+    update_index,
+)
+from ._internal.index import SORT_KEYS, SortKey
+from ._internal.storage import (
+    iter_section,
+    read_metadata,
+    read_section,
+    read_transcript,
+    write_transcript,
+)
+from ._internal.errors import MissingTimelineError
+from ._internal.timeline import parse_timestamp, Timeline, write_timeline
+from ._internal.types import (
+    SearchHit,
+    Transcript,
+    TranscriptMetadata,
+    TranscriptSection,
+)
 
-__all__ = ["list", "show", "Transcript", "TranscriptMetadata"]
+__all__ = [
+    "compact",
+    "get_summaries",
+    "iter_section",
+    "iter_show",
+    "list",
+    "migrate",
+    "MissingTimelineError",
+    "parse_timestamp",
+    "rank_summaries",
+    "read_metadata",
+    "read_section",
+    "read_transcript",
+    "remove",
+    "search",
+    "SearchHit",
+    "show",
+    "SORT_KEYS",
+    "SortKey",
+    "Timeline",
+    "Transcript",
+    "TranscriptMetadata",
+    "TranscriptSection",
+    "update_index",
+    "write_timeline",
+    "write_transcript",
+]
@@ -0,0 +1,12 @@
+class MissingTimelineError(FileNotFoundError):
+    def __init__(
+        self,
+        transcript_name: str,
+        message="",
+    ):
+        self.transcript_name = transcript_name
+        self.message = (
+            message
+            or f"Transcript '{transcript_name}' has no timeline. Hint: Transcribe its audio file again, with `-c` to use the cached response."
+        )
+        super().__init__(self.message)
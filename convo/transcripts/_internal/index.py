@@ -0,0 +1,415 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import warnings
+from contextlib import contextmanager
+from typing import Iterator, Literal
+from convo import config
+from . import storage
+from .types import SearchHit, Transcript
+
+SCHEMA_VERSION = 6
+SCHEMA = """\
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    audio_file_path TEXT NOT NULL,
+    date TEXT NOT NULL,
+    speakers TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transcripts_date ON transcripts (date, name);
+
+CREATE TABLE IF NOT EXISTS transcript_speakers (
+    name TEXT NOT NULL,
+    speaker TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (name, speaker)
+);
+CREATE INDEX IF NOT EXISTS transcript_speakers_speaker ON transcript_speakers (speaker);
+
+CREATE TABLE IF NOT EXISTS transcript_keywords (
+    name TEXT NOT NULL,
+    keyword TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (name, keyword)
+);
+CREATE INDEX IF NOT EXISTS transcript_keywords_keyword ON transcript_keywords (keyword);
+
+CREATE TABLE IF NOT EXISTS paragraphs (
+    id INTEGER PRIMARY KEY,
+    transcript_id INTEGER NOT NULL,
+    paragraph INTEGER NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS paragraphs_transcript_id ON paragraphs (transcript_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS transcript_paragraphs USING fts5 (
+    content,
+    content = 'paragraphs',
+    content_rowid = 'id',
+    tokenize = 'porter unicode61'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS transcript_summaries USING fts5 (
+    summary,
+    content = 'transcripts',
+    content_rowid = 'id',
+    tokenize = 'porter unicode61'
+);
+
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+TRANSCRIPT_TABLES = [
+    "transcript_summaries",
+    "transcript_paragraphs",
+    "paragraphs",
+    "transcript_keywords",
+    "transcript_speakers",
+    "transcripts",
+]
+# A directory mtime this close to the last scan may hide changes that were
+# made in the same clock tick, so it is not trusted.
+MTIME_GRANULARITY_NS = 2_000_000_000
+
+type SortKey = Literal["name", "date", "modified", "size"]
+SORT_KEYS: list[SortKey] = ["name", "date", "modified", "size"]
+SORT_COLUMNS: dict[SortKey, str] = {
+    "name": "name",
+    "date": "date",
+    "modified": "mtime_ns",
+    "size": "size",
+}
+PARAGRAPH_SEPARATOR = "\n\n"
+SEARCH_TERM_PATTERN = re.compile(r"\w+")
+SNIPPET_TOKEN_COUNT = 16
+
+
+@contextmanager
+def connect() -> Iterator[sqlite3.Connection]:
+    """
+    Open the transcript index and run the block in a single transaction.
+    """
+    connection = sqlite3.connect(config.INDEX_FILE_PATH, timeout=30)
+    try:
+        with connection:
+            migrate(connection)
+            yield connection
+    finally:
+        connection.close()
+
+
+def migrate(connection: sqlite3.Connection) -> None:
+    """
+    Create the index tables. The index only holds data derived from the transcript files, so it is rebuilt from scratch when the schema changes.
+    """
+    (version,) = connection.execute("PRAGMA user_version").fetchone()
+    if version == SCHEMA_VERSION:
+        return
+
+    for table in [*TRANSCRIPT_TABLES, "state"]:
+        connection.execute(f"DROP TABLE IF EXISTS {table}")
+    connection.executescript(SCHEMA)
+    connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def add(
+    connection: sqlite3.Connection,
+    transcript_file_path: str,
+    transcript: Transcript,
+) -> None:
+    """
+    Add or replace the index entry of a transcript file.
+    """
+    name = os.path.basename(transcript_file_path)
+    stat = os.stat(transcript_file_path)
+    metadata = transcript["metadata"]
+
+    remove(connection, name)
+    cursor = connection.execute(
+        """
+        INSERT INTO transcripts
+            (name, audio_file_path, date, speakers, keywords, summary, mtime_ns, size)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            name,
+            metadata["audio_file_path"],
+            metadata["date"],
+            json.dumps(metadata["speakers"]),
+            json.dumps(metadata["keywords"]),
+            transcript["summary"],
+            stat.st_mtime_ns,
+            stat.st_size,
+        ),
+    )
+    transcript_id = cursor.lastrowid
+    connection.execute(
+        "INSERT INTO transcript_summaries (rowid, summary) VALUES (?, ?)",
+        (transcript_id, transcript["summary"]),
+    )
+    connection.executemany(
+        "INSERT OR IGNORE INTO transcript_speakers VALUES (?, ?)",
+        [(name, speaker) for speaker in metadata["speakers"]],
+    )
+    connection.executemany(
+        "INSERT OR IGNORE INTO transcript_keywords VALUES (?, ?)",
+        [(name, keyword) for keyword in metadata["keywords"]],
+    )
+    connection.executemany(
+        "INSERT INTO paragraphs (transcript_id, paragraph, content) VALUES (?, ?, ?)",
+        [
+            (transcript_id, idx, paragraph)
+            for idx, paragraph in enumerate(
+                transcript["content"].split(PARAGRAPH_SEPARATOR)
+            )
+        ],
+    )
+    connection.execute(
+        """
+        INSERT INTO transcript_paragraphs (rowid, content)
+        SELECT id, content FROM paragraphs WHERE transcript_id = ?
+        """,
+        (transcript_id,),
+    )
+
+
+def remove(connection: sqlite3.Connection, name: str) -> None:
+    row = connection.execute(
+        "SELECT id, summary FROM transcripts WHERE name = ?", (name,)
+    ).fetchone()
+    if row is not None:
+        transcript_id, _ = row
+        # The full-text indexes don't store the text themselves, so removing
+        # an entry requires passing the old values.
+        connection.execute(
+            "INSERT INTO transcript_summaries (transcript_summaries, rowid, summary) VALUES ('delete', ?, ?)",
+            row,
+        )
+        connection.execute(
+            """
+            INSERT INTO transcript_paragraphs (transcript_paragraphs, rowid, content)
+            SELECT 'delete', id, content FROM paragraphs WHERE transcript_id = ?
+            """,
+            (transcript_id,),
+        )
+        connection.execute(
+            "DELETE FROM paragraphs WHERE transcript_id = ?", (transcript_id,)
+        )
+
+    for table in ["transcript_keywords", "transcript_speakers", "transcripts"]:
+        connection.execute(f"DELETE FROM {table} WHERE name = ?", (name,))
+
+
+def reconcile(connection: sqlite3.Connection, check_files=False) -> None:
+    """
+    Bring the index up to date with the transcripts directory.
+
+    If the directory hasn't changed since the last reconciliation, this is a single stat call. Otherwise only new or modified transcript files are read.
+
+    Args:
+        check_files (bool, optional): If True, compare the mtime of every file even if the directory hasn't changed. This catches transcripts that were edited in place. Default is False.
+    """
+    dir_mtime_ns = os.stat(config.TRANSCRIPTS_DIR_PATH).st_mtime_ns
+    scanned_at_ns = time.time_ns()
+    if (
+        not check_files
+        and get_state(connection, "dir_mtime_ns") == dir_mtime_ns
+        and get_state(connection, "scanned_at_ns", 0) - dir_mtime_ns
+        > MTIME_GRANULARITY_NS
+    ):
+        return
+
+    indexed_files = {
+        name: (mtime_ns, size)
+        for name, mtime_ns, size in connection.execute(
+            "SELECT name, mtime_ns, size FROM transcripts"
+        )
+    }
+
+    with os.scandir(config.TRANSCRIPTS_DIR_PATH) as entries:
+        for entry in entries:
+            # Files starting with a dot are transcripts that are being written.
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            stat = entry.stat()
+            if indexed_files.pop(entry.name, None) == (
+                stat.st_mtime_ns,
+                stat.st_size,
+            ):
+                continue
+            if (transcript := read_transcript(entry.path)) is not None:
+                add(connection, entry.path, transcript)
+
+    for name in indexed_files:
+        remove(connection, name)
+
+    set_state(connection, "dir_mtime_ns", dir_mtime_ns)
+    set_state(connection, "scanned_at_ns", scanned_at_ns)
+
+
+def read_transcript(transcript_file_path: str) -> Transcript | None:
+    """
+    Returns:
+        Transcript | None: The transcript, or None with a warning if the file isn't a readable transcript. It is skipped and tried again on the next scan.
+    """
+    try:
+        return storage.read_transcript(transcript_file_path)
+    except storage.READ_ERRORS as error:
+        warnings.warn(
+            f"Skipped transcript '{os.path.basename(transcript_file_path)}', it could not be read: {error!r}"
+        )
+        return None
+
+
+def get_state(connection: sqlite3.Connection, key: str, default=None):
+    row = connection.execute(
+        "SELECT value FROM state WHERE key = ?", (key,)
+    ).fetchone()
+    return default if row is None else row[0]
+
+
+def set_state(connection: sqlite3.Connection, key: str, value) -> None:
+    connection.execute(
+        "INSERT OR REPLACE INTO state VALUES (?, ?)", (key, value)
+    )
+
+
+def find(
+    connection: sqlite3.Connection,
+    speakers: list[str] | None = None,
+    keywords: list[str] | None = None,
+    date: str | None = None,
+    sort_by: SortKey = "name",
+    reverse=False,
+    limit: int | None = None,
+) -> list[str]:
+    """
+    Find the names of transcripts matching all given filters.
+
+    Args:
+        speakers (list[str] | None, optional): Speakers that all took part in the conversation.
+        keywords (list[str] | None, optional): Keywords that were all given for the conversation.
+        date (str | None, optional): Date of the conversation in the format YYYY-MM-DD.
+        sort_by (SortKey, optional): Sort by name, conversation date, modification time or file size. Default is name.
+        reverse (bool, optional): If True, sort in descending order. Default is False.
+        limit (int | None, optional): Maximum number of names to return.
+    Returns:
+        list[str]: Names of the matching transcripts.
+    """
+    conditions = []
+    parameters: list[str | int] = []
+    for speaker in speakers or []:
+        conditions.append(
+            "name IN (SELECT name FROM transcript_speakers WHERE speaker = ?)"
+        )
+        parameters.append(speaker)
+    for keyword in keywords or []:
+        conditions.append(
+            "name IN (SELECT name FROM transcript_keywords WHERE keyword = ?)"
+        )
+        parameters.append(keyword)
+    if date:
+        conditions.append("date = ?")
+        parameters.append(date)
+
+    sql = "SELECT name FROM transcripts"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {SORT_COLUMNS[sort_by]} {'DESC' if reverse else 'ASC'}, name"
+    if limit is not None:
+        sql += " LIMIT ?"
+        parameters.append(limit)
+
+    return [name for (name,) in connection.execute(sql, parameters)]
+
+
+def get_summaries(connection: sqlite3.Connection) -> dict[str, str]:
+    return dict(
+        connection.execute("SELECT name, summary FROM transcripts ORDER BY name")
+    )
+
+
+def rank_summaries(
+    connection: sqlite3.Connection, query: str
+) -> Iterator[tuple[str, str]]:
+    """
+    Rank the summaries of all transcripts by their relevance to a query.
+
+    Summaries that contain any word of the query come first, ranked with BM25. They are followed by all other summaries, most recent conversation first. Rows are fetched lazily, and the other summaries are read in the order of the date index, so callers only pay for the summaries they consume.
+
+    Yields:
+        tuple[str, str]: Transcript name and summary.
+    """
+    ranked_names = set()
+    if terms := SEARCH_TERM_PATTERN.findall(query):
+        match_expression = " OR ".join(f'"{term}"' for term in terms)
+        for name, summary in connection.execute(
+            """
+            SELECT transcripts.name, transcripts.summary
+            FROM transcript_summaries
+            JOIN transcripts ON transcripts.id = transcript_summaries.rowid
+            WHERE transcript_summaries MATCH ?
+            ORDER BY transcript_summaries.rank
+            """,
+            (match_expression,),
+        ):
+            ranked_names.add(name)
+            yield name, summary
+
+    for name, summary in connection.execute(
+        "SELECT name, summary FROM transcripts ORDER BY date DESC, name DESC"
+    ):
+        if name not in ranked_names:
+            yield name, summary
+
+
+def search(
+    connection: sqlite3.Connection,
+    query: str,
+    limit=10,
+    highlight=("**", "**"),
+) -> list[SearchHit]:
+    """
+    Search the content of all transcripts.
+
+    Every word of the query has to appear in a paragraph for it to match. Matches are ranked with BM25.
+
+    Args:
+        query (str): Words to search for.
+        limit (int, optional): Maximum number of hits. Default is 10.
+        highlight (tuple[str, str], optional): Markers that are put around matching words in the snippets.
+    Returns:
+        list[SearchHit]: The best matching paragraphs, best match first.
+    """
+    terms = SEARCH_TERM_PATTERN.findall(query)
+    if not terms:
+        return []
+
+    match_expression = " ".join(f'"{term}"' for term in terms)
+    rows = connection.execute(
+        """
+        SELECT
+            transcripts.name,
+            paragraphs.paragraph,
+            snippet(transcript_paragraphs, 0, ?, ?, '...', ?),
+            transcript_paragraphs.rank
+        FROM transcript_paragraphs
+        JOIN paragraphs ON paragraphs.id = transcript_paragraphs.rowid
+        JOIN transcripts ON transcripts.id = paragraphs.transcript_id
+        WHERE transcript_paragraphs MATCH ?
+        ORDER BY transcript_paragraphs.rank
+        LIMIT ?
+        """,
+        (*highlight, SNIPPET_TOKEN_COUNT, match_expression, limit),
+    )
+    return [
+        {"name": name, "paragraph": paragraph, "snippet": snippet, "score": -rank}
+        for name, paragraph, snippet, rank in rows
+    ]
@@ -0,0 +1,259 @@
+import os
+import json
+import codecs
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+from convo import config
+from convo._utils import codec
+from .types import Transcript, TranscriptHeader, TranscriptMetadata, TranscriptSection
+
+# Transcript files start with this line, followed by a single line of JSON
+# with the metadata and the byte ranges of the sections, followed by the raw
+# UTF-8 text of the sections. Reading the metadata or the summary of a long
+# conversation doesn't touch its content. The whole file may be compressed,
+# see `convo._utils.codec`.
+MAGIC = b"CONVO-TRANSCRIPT 2\n"
+SECTIONS: list[TranscriptSection] = ["summary", "content"]
+CHUNK_SIZE = 64 * 1024
+# Raised for files that vanished or can't be opened, files compressed with
+# zstd while zstandard isn't installed and files that aren't transcripts.
+READ_ERRORS = (OSError, ModuleNotFoundError, ValueError, KeyError, TypeError)
+
+
+def write_transcript(
+    transcript_file_path: str,
+    transcript: Transcript,
+    compression: config.Compression | None = None,
+) -> None:
+    """
+    Write a transcript file in the split format.
+
+    The file is written to a temporary file first and then moved over the old one, so readers never see a partial transcript.
+
+    Args:
+        compression (Compression | None, optional): Compression of the file. Defaults to the configured compression.
+    """
+    import tempfile
+
+    encoded_sections = {
+        section: transcript[section].encode("utf-8") for section in SECTIONS
+    }
+    header: TranscriptHeader = {"metadata": transcript["metadata"], "sections": {}}
+    offset = 0
+    for section, data in encoded_sections.items():
+        header["sections"][section] = (offset, len(data))
+        offset += len(data)
+
+    dir_path, file_name = os.path.split(transcript_file_path)
+    file_descriptor, temp_file_path = tempfile.mkstemp(
+        dir=dir_path, prefix=f".{file_name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(file_descriptor, "wb") as raw_file, codec.open_writer(
+            raw_file, compression or codec.get_compression()
+        ) as file:
+            file.write(MAGIC)
+            file.write(json.dumps(header, ensure_ascii=False).encode("utf-8"))
+            file.write(b"\n")
+            for data in encoded_sections.values():
+                file.write(data)
+        os.replace(temp_file_path, transcript_file_path)
+    except BaseException:
+        os.remove(temp_file_path)
+        raise
+
+
+def read_transcript(transcript_file_path: str) -> Transcript:
+    """
+    Read all parts of a transcript file, in the split or the legacy single JSON format.
+
+    Raises:
+        ValueError: If the file isn't a transcript.
+    """
+    with open_transcript(transcript_file_path) as file:
+        header = read_header(file, transcript_file_path)
+        if header is None:
+            return read_legacy_transcript(file, transcript_file_path)
+
+        body = file.read()
+
+    transcript: Transcript = {
+        "metadata": header["metadata"],
+        "summary": "",
+        "content": "",
+    }
+    for section in SECTIONS:
+        offset, length = header["sections"][section]
+        transcript[section] = body[offset : offset + length].decode("utf-8")
+    return transcript
+
+
+def read_metadata(transcript_file_path: str) -> TranscriptMetadata:
+    """
+    Read only the metadata of a transcript file.
+
+    Raises:
+        ValueError: If the file isn't a transcript.
+    """
+    with open_transcript(transcript_file_path) as file:
+        header = read_header(file, transcript_file_path)
+        if header is None:
+            return read_legacy_transcript(file, transcript_file_path)["metadata"]
+
+    return header["metadata"]
+
+
+def read_section(transcript_file_path: str, section: TranscriptSection) -> str:
+    """
+    Read only the summary or only the content of a transcript file.
+
+    Raises:
+        ValueError: If the file isn't a transcript.
+    """
+    with open_transcript(transcript_file_path) as file:
+        header = read_header(file, transcript_file_path)
+        if header is None:
+            return read_legacy_transcript(file, transcript_file_path)[section]
+
+        offset, length = header["sections"][section]
+        file.seek(offset, os.SEEK_CUR)
+        return file.read(length).decode("utf-8")
+
+
+def iter_section(
+    transcript_file_path: str,
+    section: TranscriptSection,
+    chunk_size=CHUNK_SIZE,
+) -> Iterator[str]:
+    """
+    Read the summary or the content of a transcript file in chunks, so the whole section never has to be in memory at once.
+
+    Legacy transcripts have to be parsed completely, so their section is yielded as a single chunk.
+
+    Args:
+        chunk_size (int, optional): Number of bytes read at a time. Default is 64 KiB.
+    Yields:
+        str: Consecutive parts of the section.
+    Raises:
+        ValueError: If the file isn't a transcript.
+    """
+    with open_transcript(transcript_file_path) as file:
+        header = read_header(file, transcript_file_path)
+        if header is None:
+            yield read_legacy_transcript(file, transcript_file_path)[section]
+            return
+
+        offset, remaining = header["sections"][section]
+        file.seek(offset, os.SEEK_CUR)
+        # A chunk may end in the middle of a multi-byte character, which the
+        # decoder holds back until the next chunk.
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        while remaining > 0:
+            data = file.read(min(chunk_size, remaining))
+            if not data:
+                raise ValueError(
+                    f"Transcript '{transcript_file_path}' is truncated."
+                )
+            remaining -= len(data)
+            if text := decoder.decode(data, final=remaining == 0):
+                yield text
+
+
+@contextmanager
+def open_transcript(transcript_file_path: str) -> Iterator[BinaryIO]:
+    """
+    Open a transcript file for reading, decompressing it if it is compressed.
+    """
+    with open(transcript_file_path, "rb") as raw_file, codec.open_reader(
+        raw_file
+    ) as file:
+        yield file
+
+
+def read_header(file: BinaryIO, transcript_file_path: str) -> TranscriptHeader | None:
+    """
+    Read the header of a transcript file and leave the file positioned at the start of the sections.
+
+    Returns:
+        TranscriptHeader | None: The header, or None if the file is in the legacy format. The file is rewound in that case.
+    Raises:
+        ValueError: If the header is damaged.
+    """
+    if file.read(len(MAGIC)) != MAGIC:
+        file.seek(0)
+        return None
+
+    header: TranscriptHeader = json.loads(file.readline())
+    if not isinstance(header, dict) or not {"metadata", "sections"}.issubset(
+        header
+    ):
+        raise ValueError(f"Invalid transcript header in '{transcript_file_path}'.")
+    return header
+
+
+def read_legacy_transcript(file: BinaryIO, transcript_file_path: str) -> Transcript:
+    transcript: Transcript = json.load(file)
+    if not isinstance(transcript, dict) or not {
+        "metadata",
+        "summary",
+        "content",
+    }.issubset(transcript):
+        raise ValueError(f"'{transcript_file_path}' is not a transcript.")
+    return transcript
+
+
+def is_legacy(transcript_file_path: str) -> bool:
+    with open_transcript(transcript_file_path) as file:
+        return file.read(len(MAGIC)) != MAGIC
+
+
+def get_compression(transcript_file_path: str) -> config.Compression:
+    with open(transcript_file_path, "rb") as file:
+        return codec.detect(file.read(codec.MAGIC_SIZE))
+
+
+def migrate_transcript(transcript_file_path: str) -> bool:
+    """
+    Rewrite a transcript file from the legacy single JSON format in the split format. The modification time is kept, so sorting by it doesn't change.
+
+    Returns:
+        bool: True if the file was migrated, False if it already was in the split format.
+    Raises:
+        ValueError: If the file isn't a transcript.
+    """
+    if not is_legacy(transcript_file_path):
+        return False
+
+    rewrite_transcript(transcript_file_path, get_compression(transcript_file_path))
+    return True
+
+
+def compact_transcript(
+    transcript_file_path: str, compression: config.Compression
+) -> bool:
+    """
+    Rewrite a transcript file with another compression, migrating it to the split format if necessary. The modification time is kept.
+
+    Returns:
+        bool: True if the file was rewritten, False if it already had the compression.
+    Raises:
+        ValueError: If the file isn't a transcript.
+    """
+    if (
+        not is_legacy(transcript_file_path)
+        and get_compression(transcript_file_path) == compression
+    ):
+        return False
+
+    rewrite_transcript(transcript_file_path, compression)
+    return True
+
+
+def rewrite_transcript(
+    transcript_file_path: str, compression: config.Compression
+) -> None:
+    stat = os.stat(transcript_file_path)
+    write_transcript(
+        transcript_file_path, read_transcript(transcript_file_path), compression
+    )
+    os.utime(transcript_file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
@@ -0,0 +1,296 @@
+import os
+import sys
+import json
+import math
+import mmap
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterator, Sequence
+from convo import config
+from convo._utils import utils
+from .errors import MissingTimelineError
+from .types import TimelineHeader
+
+# Timeline files start with this line, followed by a single line of JSON with
+# the speakers and the position of every array, followed by the arrays. The
+# arrays are memory-mapped and searched in place, so slicing a long recording
+# only touches the words in the slice.
+MAGIC = b"CONVO-TIMELINE 1\n"
+TIMELINE_FILE_EXTENSION = ".timeline"
+ALIGNMENT = 8
+NO_SPEAKER = -1
+# Typecodes of the arrays. `word_text_offset` has one more entry than there
+# are words, the end of the text of the last word.
+ARRAY_TYPECODES = {
+    "word_start": "d",
+    "word_end": "d",
+    "word_speaker": "i",
+    "word_text_offset": "I",
+    "paragraph_word": "I",
+    "text": "B",
+}
+
+
+def get_timeline_file_path(transcript_name: str) -> str:
+    return os.path.join(
+        config.TIMELINES_DIR_PATH,
+        f"{utils.get_file_name(transcript_name)}{TIMELINE_FILE_EXTENSION}",
+    )
+
+
+def write_timeline(
+    transcript_name: str,
+    speakers: list[str],
+    word_texts: Sequence[str],
+    word_starts: Sequence[float],
+    word_ends: Sequence[float],
+    word_speakers: Sequence[int],
+    paragraph_starts: Sequence[float] = (),
+) -> str:
+    """
+    Write the timeline of a transcript, which maps every word to its time in the recording.
+
+    Args:
+        transcript_name (str): Name of the transcript file the timeline belongs to.
+        speakers (list[str]): Names that replace the speaker numbers of the words.
+        word_texts (Sequence[str]): The text of every word, in the order they were said.
+        word_starts (Sequence[float]): Start of every word in seconds.
+        word_ends (Sequence[float]): End of every word in seconds.
+        word_speakers (Sequence[int]): Speaker number of every word, -1 if unknown.
+        paragraph_starts (Sequence[float], optional): Start of every paragraph in seconds. If empty, a new paragraph starts whenever the speaker changes.
+    Returns:
+        str: Path of the timeline file.
+    """
+    import tempfile
+
+    word_text_offsets = array(ARRAY_TYPECODES["word_text_offset"], [0])
+    text = bytearray()
+    for word_text in word_texts:
+        text += word_text.encode("utf-8") + b" "
+        word_text_offsets.append(len(text))
+
+    word_starts = array(ARRAY_TYPECODES["word_start"], word_starts)
+    if paragraph_starts:
+        paragraph_words = sorted(
+            {bisect_left(word_starts, start) for start in paragraph_starts}
+            - {len(word_starts)}
+        )
+    else:
+        paragraph_words = [
+            idx
+            for idx in range(len(word_speakers))
+            if idx == 0 or word_speakers[idx] != word_speakers[idx - 1]
+        ]
+    if word_starts and (not paragraph_words or paragraph_words[0] != 0):
+        paragraph_words.insert(0, 0)
+
+    arrays = {
+        "word_start": word_starts,
+        "word_end": array(ARRAY_TYPECODES["word_end"], word_ends),
+        "word_speaker": array(ARRAY_TYPECODES["word_speaker"], word_speakers),
+        "word_text_offset": word_text_offsets,
+        "paragraph_word": array(ARRAY_TYPECODES["paragraph_word"], paragraph_words),
+        "text": array(ARRAY_TYPECODES["text"], text),
+    }
+    header: TimelineHeader = {
+        "speakers": speakers,
+        "byteorder": sys.byteorder,
+        "arrays": {},
+    }
+    offset = 0
+    for name, values in arrays.items():
+        header["arrays"][name] = (offset, len(values))
+        offset += align(len(values) * values.itemsize)
+
+    os.makedirs(config.TIMELINES_DIR_PATH, exist_ok=True)
+    timeline_file_path = get_timeline_file_path(transcript_name)
+    file_descriptor, temp_file_path = tempfile.mkstemp(
+        dir=config.TIMELINES_DIR_PATH,
+        prefix=f".{os.path.basename(timeline_file_path)}.",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(MAGIC)
+            file.write(json.dumps(header, ensure_ascii=False).encode("utf-8"))
+            file.write(b"\n")
+            file.write(bytes(align(file.tell()) - file.tell()))
+            for values in arrays.values():
+                data = values.tobytes()
+                file.write(data)
+                file.write(bytes(align(len(data)) - len(data)))
+        os.replace(temp_file_path, timeline_file_path)
+    except BaseException:
+        os.remove(temp_file_path)
+        raise
+
+    return timeline_file_path
+
+
+def parse_timestamp(timestamp: str) -> float:
+    """
+    Parse a timestamp of the form SS, MM:SS or HH:MM:SS into seconds. Every part may have a fraction.
+
+    Raises:
+        ValueError: If the timestamp doesn't have this form.
+    """
+    parts = timestamp.strip().split(":")
+    if len(parts) > 3:
+        raise ValueError(f"Invalid timestamp '{timestamp}'.")
+
+    seconds = 0.0
+    for part in parts:
+        try:
+            value = float(part)
+        except ValueError:
+            raise ValueError(f"Invalid timestamp '{timestamp}'.") from None
+        if not math.isfinite(value) or value < 0:
+            raise ValueError(f"Invalid timestamp '{timestamp}'.")
+        seconds = seconds * 60 + value
+    return seconds
+
+
+def format_timestamp(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02}:{seconds:02}"
+    return f"{minutes:02}:{seconds:02}"
+
+
+def remove_timeline(transcript_name: str) -> None:
+    try:
+        os.remove(get_timeline_file_path(transcript_name))
+    except FileNotFoundError:
+        pass
+
+
+def align(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+class Timeline:
+    """
+    A memory-mapped timeline file.
+
+    Words are found by their start time with a binary search on the mapped arrays, so neither the file nor the transcript has to be read completely.
+    """
+
+    __slots__ = (
+        "speakers",
+        "word_start",
+        "word_end",
+        "word_speaker",
+        "word_text_offset",
+        "paragraph_word",
+        "text",
+        "_file",
+        "_map",
+    )
+
+    def __init__(self, transcript_name: str):
+        """
+        Raises:
+            MissingTimelineError: If the transcript has no timeline.
+            ValueError: If the timeline file is damaged or was written on a machine with another byte order.
+        """
+        try:
+            self._file = open(get_timeline_file_path(transcript_name), "rb")
+        except FileNotFoundError:
+            raise MissingTimelineError(transcript_name) from None
+
+        try:
+            if self._file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Invalid timeline of '{transcript_name}'.")
+            header: TimelineHeader = json.loads(self._file.readline())
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError(
+                    f"The timeline of '{transcript_name}' was written with another byte order."
+                )
+            data_offset = align(self._file.tell())
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+        self.speakers: list[str] = header["speakers"]
+        buffer = memoryview(self._map)
+        for name, typecode in ARRAY_TYPECODES.items():
+            offset, length = header["arrays"][name]
+            start = data_offset + offset
+            size = length * array(typecode).itemsize
+            setattr(self, name, buffer[start : start + size].cast(typecode))
+        buffer.release()
+
+    def __enter__(self) -> "Timeline":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # The views have to be released before the map can be closed.
+        for name in ARRAY_TYPECODES:
+            getattr(self, name).release()
+        self._map.close()
+        self._file.close()
+
+    def find_words(self, start: float = 0, end: float | None = None) -> range:
+        """
+        Find the words that start in a time range.
+
+        Args:
+            start (float, optional): Start of the range in seconds. Default is the beginning of the recording.
+            end (float | None, optional): End of the range in seconds, exclusive. Default is the end of the recording.
+        Returns:
+            range: Indices of the words.
+        """
+        first_word = bisect_left(self.word_start, start)
+        last_word = (
+            len(self.word_start)
+            if end is None
+            else bisect_left(self.word_start, end, lo=first_word)
+        )
+        return range(first_word, last_word)
+
+    def render(self, start: float = 0, end: float | None = None) -> Iterator[str]:
+        """
+        Render the words that start in a time range, one paragraph at a time. Each paragraph starts with the time of its first word in the range and its speaker.
+
+        Yields:
+            str: Consecutive parts of the text.
+        """
+        words = self.find_words(start, end)
+        if not words:
+            return
+
+        next_paragraph = bisect_right(self.paragraph_word, words.start)
+        first_word = words.start
+        while first_word < words.stop:
+            paragraph_end = (
+                self.paragraph_word[next_paragraph]
+                if next_paragraph < len(self.paragraph_word)
+                else len(self.word_start)
+            )
+            last_word = min(paragraph_end, words.stop)
+            text_start = self.word_text_offset[first_word]
+            text_end = self.word_text_offset[last_word]
+            text = bytes(self.text[text_start:text_end]).decode("utf-8")
+
+            prefix = f"[{format_timestamp(self.word_start[first_word])}]"
+            speaker = self.get_speaker(self.word_speaker[first_word])
+            if speaker is not None:
+                prefix += f" {speaker}:"
+            yield f"{prefix} {text.rstrip()}\n"
+            if last_word < words.stop:
+                yield "\n"
+
+            first_word = last_word
+            next_paragraph += 1
+
+    def get_speaker(self, speaker: int) -> str | None:
+        if speaker == NO_SPEAKER:
+            return None
+        if speaker < len(self.speakers):
+            return self.speakers[speaker]
+        return f"Speaker {speaker}"
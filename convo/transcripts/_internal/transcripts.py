@@ -1,10 +1,14 @@
 import os
-import yaml
 import json
+import builtins
+from typing import Iterable, Iterator
 from convo import config
-from convo._utils import utils
-from .types import Transcript
+from convo._utils import codec, utils
+from . import index, storage, timeline
+from .index import SortKey
+from .types import SearchHit, Transcript, TranscriptMetadata
 
+# The content is streamed after this header, so it isn't part of the template.
 TRANSCRIPT_MARKDOWN_TEMPLATE = """\
 ---
 {yaml_metadata}
@@ -18,47 +22,188 @@ TRANSCRIPT_MARKDOWN_TEMPLATE = """\
 
 ## Transcript
 
-{transcript}
-
 """
+TRANSCRIPT_MARKDOWN_END = "\n\n"
 
 
 def create_title(speakers: list[str], date: str) -> str:
     return f"Conversation between {utils.list_to_str(speakers)} ({date})"
 
 
+def render_markdown(
+    metadata: TranscriptMetadata, summary: str, content_chunks: Iterable[str]
+) -> Iterator[str]:
+    """
+    Render a transcript as Markdown with YAML front matter, one part at a time.
+
+    Args:
+        metadata (TranscriptMetadata): Metadata of the transcript.
+        summary (str): Summary of the transcript.
+        content_chunks (Iterable[str]): Consecutive parts of the content, which are passed through as they come.
+    Yields:
+        str: Consecutive parts of the document.
+    """
+    # Only rendering markdown needs yaml, so the other commands don't pay for
+    # importing it.
+    import yaml
+
+    yield TRANSCRIPT_MARKDOWN_TEMPLATE.format(
+        yaml_metadata=yaml.dump(metadata).strip(),
+        title=create_title(metadata["speakers"], metadata["date"]),
+        summary=summary,
+    )
+    yield from content_chunks
+    yield TRANSCRIPT_MARKDOWN_END
+
+
+def render_json(
+    metadata: TranscriptMetadata, summary: str, content_chunks: Iterable[str]
+) -> Iterator[str]:
+    """
+    Render a transcript as the JSON document of the legacy transcript files, one part at a time.
+    """
+    document = json.dumps(
+        {"metadata": metadata, "summary": summary, "content": ""}, indent=4
+    )
+    head, tail = document.rsplit('""', 1)
+    yield head + '"'
+    # JSON escapes every character on its own, so the escaped chunks add up
+    # to the escaped content.
+    for chunk in content_chunks:
+        yield json.dumps(chunk)[1:-1]
+    yield '"' + tail
+
+
 def to_markdown(transcript: Transcript) -> str:
-    return TRANSCRIPT_MARKDOWN_TEMPLATE.format(
-        yaml_metadata=yaml.dump(transcript["metadata"]).strip(),
-        title=create_title(
-            transcript["metadata"]["speakers"], transcript["metadata"]["date"]
-        ),
-        transcript=transcript["content"],
-        summary=transcript["summary"],
+    return "".join(
+        render_markdown(
+            transcript["metadata"], transcript["summary"], [transcript["content"]]
+        )
     )
 
 
-def list(path=False) -> list[str]:
+def search(
+    query: str, limit=10, highlight=("**", "**")
+) -> list[SearchHit]:
+    """
+    Search the content of all transcripts without calling an AI.
+
+    Args:
+        query (str): Words that all have to appear in a paragraph.
+        limit (int, optional): Maximum number of hits. Default is 10.
+        highlight (tuple[str, str], optional): Markers put around matching words in the snippets. Default is Markdown bold.
+    Returns:
+        list[SearchHit]: Transcript names, paragraph offsets and snippets, best match first.
+    """
+    with index.connect() as connection:
+        index.reconcile(connection)
+        return index.search(connection, query, limit=limit, highlight=highlight)
+
+
+def get_summaries() -> dict[str, str]:
+    """
+    Collect the summaries of all transcripts from the index instead of reading every transcript file.
+
+    Returns:
+        dict[str, str]: Summaries by transcript name.
+    """
+    with index.connect() as connection:
+        index.reconcile(connection, check_files=True)
+        return index.get_summaries(connection)
+
+
+def rank_summaries(query: str) -> Iterator[tuple[str, str]]:
+    """
+    Rank the summaries of all transcripts locally by their relevance to a query.
+
+    The index stays open while the generator is consumed, so stop iterating as soon as you have enough summaries.
+
+    Args:
+        query (str): Text to rank the summaries against, e.g. a question about the transcripts.
+    Yields:
+        tuple[str, str]: Transcript name and summary, most relevant first.
+    """
+    # Reconcile in a transaction of its own. Closing the generator early
+    # rolls back the transaction that is open while it yields. Only the
+    # directory is checked, so a query doesn't stat every transcript file.
+    with index.connect() as connection:
+        index.reconcile(connection)
+    with index.connect() as connection:
+        yield from index.rank_summaries(connection, query)
+
+
+def remove(transcript_name: str) -> None:
+    """
+    Delete a transcript file, its timeline and its index entry.
+
+    Raises:
+        FileNotFoundError: If transcript file with specified name doesn't exist.
+    """
+    transcript_path = os.path.join(config.TRANSCRIPTS_DIR_PATH, transcript_name)
+    if not os.path.exists(transcript_path):
+        raise FileNotFoundError(
+            f"Transcript '{transcript_name}' does not exist."
+        )
+
+    os.remove(transcript_path)
+    timeline.remove_timeline(transcript_name)
+    with index.connect() as connection:
+        index.remove(connection, transcript_name)
+
+
+def list(
+    path=False,
+    speakers: builtins.list[str] | None = None,
+    keywords: builtins.list[str] | None = None,
+    date: str | None = None,
+    sort_by: SortKey = "name",
+    reverse=False,
+    limit: int | None = None,
+) -> list[str]:
     """
     Collect transcript file names or paths.
 
+    The metadata of all transcripts is kept in an index, so filtering doesn't need to read the transcript files.
+
     Args:
         path (bool, optional): If True, include the complete path of each transcript. If False, include only the file name. Default is False.
+        speakers (list[str] | None, optional): Only include transcripts in which all of these speakers took part.
+        keywords (list[str] | None, optional): Only include transcripts that have all of these keywords.
+        date (str | None, optional): Only include transcripts of conversations on this date (YYYY-MM-DD).
+        sort_by (SortKey, optional): Sort by "name", "date", "modified" or "size". Default is "name".
+        reverse (bool, optional): If True, sort in descending order. Default is False.
+        limit (int | None, optional): Maximum number of transcripts to include.
     Returns:
         list[str]: List of transcript file names or paths.
     """
-    transcript_names = []
-    for transcript_name in os.listdir(config.TRANSCRIPTS_DIR_PATH):
-        if path:
-            file_path = os.path.join(
-                config.TRANSCRIPTS_DIR_PATH, transcript_name
-            )
-            transcript_names.append(file_path)
-        else:
-            transcript_names.append(transcript_name)
+    with index.connect() as connection:
+        index.reconcile(connection)
+        transcript_names = index.find(
+            connection,
+            speakers=speakers,
+            keywords=keywords,
+            date=date,
+            sort_by=sort_by,
+            reverse=reverse,
+            limit=limit,
+        )
+
+    if path:
+        return [
+            os.path.join(config.TRANSCRIPTS_DIR_PATH, transcript_name)
+            for transcript_name in transcript_names
+        ]
     return transcript_names
 
 
+def update_index(transcript_file_path: str, transcript: Transcript) -> None:
+    """
+    Add a newly written transcript file to the index.
+    """
+    with index.connect() as connection:
+        index.add(connection, transcript_file_path, transcript)
+
+
 def show(
     transcript_name: str,
     summary=False,
@@ -66,6 +211,8 @@ def show(
     metadata=False,
     path=False,
     as_json=False,
+    start: float | None = None,
+    end: float | None = None,
 ) -> str:
     """
     Retrieve the contents of a transcript file.
@@ -75,32 +222,146 @@ def show(
         summary (bool, optional): If True, return summary of transcript. Default is False.
         content (bool, optional): If True, return content of transcript. Default is False.
         metadata (bool, optional): If True, return metadata of transcript. Default is False.
-        as_json (bool, optional): If True, return transcript data as JSON string. Default is False.
+        as_json (bool, optional): If True, return transcript data as JSON string in the layout of the legacy transcript files. Default is False.
         path (bool, optional): If True, return path of transcript. Default is False.
+        start (float | None, optional): If given, return only the words said from this many seconds into the recording, from the transcript's timeline.
+        end (float | None, optional): If given, return only the words said before this many seconds into the recording, from the transcript's timeline.
     Returns:
         str: Content of the transcript file.
     Raises:
         FileNotFoundError: If transcript file with specified name doesn't exist.
+        MissingTimelineError: If a time range is given, but the transcript has no timeline.
+        ValueError: If the time range is empty.
+    """
+    return "".join(
+        iter_show(
+            transcript_name,
+            summary=summary,
+            content=content,
+            metadata=metadata,
+            path=path,
+            as_json=as_json,
+            start=start,
+            end=end,
+        )
+    )
+
+
+def iter_show(
+    transcript_name: str,
+    summary=False,
+    content=False,
+    metadata=False,
+    path=False,
+    as_json=False,
+    start: float | None = None,
+    end: float | None = None,
+) -> Iterator[str]:
+    """
+    Retrieve the contents of a transcript file in chunks, see `show`.
+
+    The content is read from the file as it is consumed, so a long transcript can be written out without ever being in memory completely.
+
+    Yields:
+        str: Consecutive parts of the output.
+    Raises:
+        FileNotFoundError: If transcript file with specified name doesn't exist.
+        MissingTimelineError: If a time range is given, but the transcript has no timeline.
+        ValueError: If the time range is empty.
     """
+    if start is not None and end is not None and end <= start:
+        raise ValueError("The end of the time range must be later than its start.")
     transcript_path = os.path.join(config.TRANSCRIPTS_DIR_PATH, transcript_name)
+    if not os.path.exists(transcript_path):
+        raise FileNotFoundError(f"Transcript '{transcript_name}' does not exist.")
 
-    if os.path.exists(transcript_path):
-        if path:
-            return transcript_path
+    if path:
+        yield transcript_path
+        return
 
-        with open(transcript_path, "r") as file:
-            if as_json:
-                return file.read()
+    if start is not None or end is not None:
+        with timeline.Timeline(transcript_name) as transcript_timeline:
+            yield from transcript_timeline.render(start or 0, end)
+        return
 
-            transcript_data: Transcript = json.load(file)
+    # Only the parts that are shown are read, so showing the summary or
+    # metadata of a long conversation doesn't decode its content.
+    if summary and not as_json:
+        yield storage.read_section(transcript_path, "summary")
+    elif content and not as_json:
+        yield from storage.iter_section(transcript_path, "content")
+    elif metadata and not as_json:
+        yield json.dumps(storage.read_metadata(transcript_path), indent=4)
+    else:
+        render = render_json if as_json else render_markdown
+        if storage.is_legacy(transcript_path):
+            # Legacy files can only be parsed as a whole, so they are only
+            # parsed once.
+            transcript = storage.read_transcript(transcript_path)
+            yield from render(
+                transcript["metadata"], transcript["summary"], [transcript["content"]]
+            )
+        else:
+            yield from render(
+                storage.read_metadata(transcript_path),
+                storage.read_section(transcript_path, "summary"),
+                storage.iter_section(transcript_path, "content"),
+            )
 
-        if summary:
-            return transcript_data["summary"]
-        if content:
-            return transcript_data["content"]
-        if metadata:
-            return json.dumps(transcript_data["metadata"], indent=4)
 
-        return to_markdown(transcript_data)
+def migrate() -> tuple[builtins.list[str], builtins.list[str]]:
+    """
+    Rewrite transcript files of the legacy single JSON format in the split format, in which the metadata, summary and content can be read on their own.
+
+    Transcripts in the legacy format can still be read, they are only slower to show in parts.
+
+    Returns:
+        tuple[list[str], list[str]]: Names of the migrated transcripts, and the names of the files that were left alone because they aren't readable transcripts.
+    """
+    migrated_names = []
+    skipped_names = []
+    for transcript_name in sorted(os.listdir(config.TRANSCRIPTS_DIR_PATH)):
+        transcript_path = os.path.join(config.TRANSCRIPTS_DIR_PATH, transcript_name)
+        if transcript_name.startswith(".") or not os.path.isfile(transcript_path):
+            continue
+        try:
+            if storage.migrate_transcript(transcript_path):
+                migrated_names.append(transcript_name)
+        except storage.READ_ERRORS:
+            skipped_names.append(transcript_name)
+
+    return migrated_names, skipped_names
+
+
+def compact(
+    compression: config.Compression,
+) -> tuple[int, int, builtins.list[str]]:
+    """
+    Rewrite all transcript files with a compression. Transcripts in the legacy format are migrated to the split format on the way.
+
+    Args:
+        compression (Compression): The compression to convert the transcripts to. "none" decompresses them.
+    Returns:
+        tuple[int, int, list[str]]: Total size in bytes before and after of the transcripts that were compacted, and the names of the files that were left alone because they aren't readable transcripts.
+    Raises:
+        ModuleNotFoundError: If the compression is zstd and zstandard isn't installed. Transcripts that are compressed with zstd are skipped instead.
+    """
+    if compression == "zstd":
+        codec.import_zstandard()
+
+    size_before = size_after = 0
+    skipped_names = []
+    for transcript_name in sorted(os.listdir(config.TRANSCRIPTS_DIR_PATH)):
+        transcript_path = os.path.join(config.TRANSCRIPTS_DIR_PATH, transcript_name)
+        if transcript_name.startswith(".") or not os.path.isfile(transcript_path):
+            continue
+        try:
+            transcript_size = os.path.getsize(transcript_path)
+            storage.compact_transcript(transcript_path, compression)
+        except storage.READ_ERRORS:
+            skipped_names.append(transcript_name)
+            continue
+        size_before += transcript_size
+        size_after += os.path.getsize(transcript_path)
 
-    raise FileNotFoundError(f"Transcript '{transcript_name}' does not exist.")
+    return size_before, size_after, skipped_names
@@ -1,4 +1,6 @@
-from typing import TypedDict
+from typing import Literal, TypedDict
+
+type TranscriptSection = Literal["summary", "content"]
 
 
 class TranscriptMetadata(TypedDict):
@@ -12,3 +14,23 @@ class Transcript(TypedDict):
     metadata: TranscriptMetadata
     summary: str
     content: str
+
+
+class TranscriptHeader(TypedDict):
+    metadata: TranscriptMetadata
+    # Offset from the end of the header and length in bytes of each section.
+    sections: dict[TranscriptSection, tuple[int, int]]
+
+
+class TimelineHeader(TypedDict):
+    speakers: list[str]
+    byteorder: Literal["little", "big"]
+    # Offset from the start of the arrays and length in items of each array.
+    arrays: dict[str, tuple[int, int]]
+
+
+class SearchHit(TypedDict):
+    name: str
+    paragraph: int
+    snippet: str
+    score: float
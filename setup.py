@@ -17,5 +17,6 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=load_requirements(),
+    extras_require={"audio": ["numpy"], "vectors": ["numpy"], "zstd": ["zstandard"]},
     entry_points={"console_scripts": ["convo = cli.commands:convo_cli"]},
 )
@@ -0,0 +1,51 @@
+import sys
+import struct
+from importlib.util import find_spec
+import pytest
+from convo._utils import audio
+
+CONVERTER_CLASSES = [
+    audio.ArrayConverter,
+    pytest.param(
+        audio.NumpyConverter,
+        marks=pytest.mark.skipif(
+            find_spec("numpy") is None, reason="NumPy isn't installed"
+        ),
+    ),
+]
+
+
+def encode_24_bit(samples: list[int]) -> bytes:
+    return b"".join(sample.to_bytes(3, "little", signed=True) for sample in samples)
+
+
+def decode_16_bit(data: bytes) -> list[int]:
+    return list(struct.unpack(f"<{len(data) // 2}h", data))
+
+
+@pytest.mark.parametrize("converter_class", CONVERTER_CLASSES)
+@pytest.mark.parametrize(
+    "sample_width, data",
+    [
+        (3, encode_24_bit([2**23 - 1] * 64 + [-(2**23)] * 64)),
+        (4, struct.pack("<128i", *[2**31 - 1] * 64, *[-(2**31)] * 64)),
+    ],
+    ids=["24-bit", "32-bit"],
+)
+@pytest.mark.parametrize("channels", [1, 2])
+def test_full_scale_samples_are_clipped(converter_class, sample_width, data, channels):
+    converter = converter_class(channels, sample_width, 16000, 16000)
+    converted = decode_16_bit(converter.convert(data) + converter.flush())
+    assert converted
+    assert max(converted) == 32767
+    assert min(converted) == -32768
+
+
+@pytest.mark.parametrize("converter_class", CONVERTER_CLASSES)
+def test_resampled_full_scale_samples_stay_in_range(converter_class):
+    # A square wave at full scale overshoots after the low-pass filter.
+    data = struct.pack("<4800i", *([2**31 - 1] * 6 + [-(2**31)] * 6) * 400)
+    converter = converter_class(1, 4, 48000, 16000)
+    converted = decode_16_bit(converter.convert(data) + converter.flush())
+    assert len(converted) == pytest.approx(1600, abs=2)
+    assert all(-32768 <= sample <= 32767 for sample in converted)
@@ -0,0 +1,30 @@
+from convo.ai._internal import batch
+
+
+def test_find_name_conflicts():
+    errors = batch.find_name_conflicts(
+        ["a/meeting.wav", "b/meeting.wav", "b/meeting.m4a", "a/standup.wav"]
+    )
+
+    assert list(errors) == ["a/meeting.wav", "b/meeting.wav", "b/meeting.m4a"]
+    assert "'meeting_transcript.json'" in str(errors["a/meeting.wav"])
+
+
+def test_create_transcripts_fails_conflicting_files(tmp_path, monkeypatch):
+    for directory in ["a", "b"]:
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "meeting.wav").write_bytes(b"")
+    monkeypatch.setattr(batch.journal, "prune", lambda: None)
+
+    class Pipeline:
+        def run(self, jobs, on_done):
+            assert jobs == []
+
+    results = batch.create_transcripts(
+        [str(tmp_path / "*" / "meeting.wav")], [], [], pipeline=Pipeline()
+    )
+
+    assert [isinstance(result["error"], ValueError) for result in results] == [
+        True,
+        True,
+    ]
@@ -0,0 +1,28 @@
+from convo.ai._internal import context
+
+
+def test_select_summaries_stops_after_skipped_summaries(monkeypatch):
+    consumed = []
+
+    def rank_summaries(query):
+        yield "small", "fits"
+        for idx in range(1000):
+            consumed.append(idx)
+            yield f"large{idx}", "word " * 1000
+        yield "late", "fits too"
+
+    monkeypatch.setattr(context.transcripts, "rank_summaries", rank_summaries)
+    summaries = context.select_summaries("query", token_budget=200)
+
+    assert summaries == {"small": "fits"}
+    assert len(consumed) == context.MAX_SKIPPED_SUMMARIES
+
+
+def test_select_summaries_keeps_small_summaries_below_skipped_ones(monkeypatch):
+    def rank_summaries(query):
+        yield "large", "word " * 1000
+        yield "small", "fits"
+
+    monkeypatch.setattr(context.transcripts, "rank_summaries", rank_summaries)
+
+    assert context.select_summaries("query", token_budget=200) == {"small": "fits"}
@@ -0,0 +1,52 @@
+import pytest
+from convo import config
+from convo.ai._internal import deepgram
+from convo.ai._internal.cache import ContentCache
+
+
+@pytest.fixture
+def response_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_DIR_PATH", str(tmp_path))
+    response_cache = ContentCache("deepgram")
+    monkeypatch.setattr(deepgram, "response_cache", response_cache)
+    return response_cache
+
+
+def test_fallback_requires_the_same_options_apart_from_keywords(response_cache):
+    response_cache.put("audio-model1-keywords1", b"model 1")
+
+    assert deepgram.read_cached_response("audio-model1-keywords2") is None
+    assert (
+        deepgram.read_cached_response("audio-model1-keywords2", other_keywords=True)
+        == b"model 1"
+    )
+    assert (
+        deepgram.read_cached_response("audio-model2-keywords1", other_keywords=True)
+        is None
+    )
+
+
+def test_keys_without_the_base_options_hash_are_still_found(response_cache):
+    response_cache.put("audio-keywords1", b"old")
+
+    assert deepgram.read_cached_response("audio-model1-keywords1") == b"old"
+
+
+def test_response_keys_share_a_prefix_if_only_keywords_differ(tmp_path):
+    from deepgram import PrerecordedOptions
+
+    audio_file_path = tmp_path / "meeting.wav"
+    audio_file_path.write_bytes(b"audio")
+
+    def get_prefix(**options) -> str:
+        key = deepgram.get_response_key(
+            str(audio_file_path), PrerecordedOptions(**options)
+        )
+        return key.rpartition("-")[0]
+
+    assert get_prefix(model="nova-2", keywords=["Alice"]) == get_prefix(
+        model="nova-2", keywords=["Bob"]
+    )
+    assert get_prefix(model="nova-2", keywords=["Alice"]) != get_prefix(
+        model="nova-3", keywords=["Alice"]
+    )
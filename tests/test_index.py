@@ -0,0 +1,41 @@
+import sqlite3
+from convo.transcripts._internal import index
+
+
+def create_transcript(content: str):
+    return {
+        "metadata": {
+            "audio_file_path": "meeting.wav",
+            "date": "2024-01-01",
+            "speakers": ["Alice"],
+            "keywords": ["budget"],
+        },
+        "summary": "A meeting.",
+        "content": content,
+    }
+
+
+def add(connection, tmp_path, name: str, content: str) -> None:
+    transcript_file_path = tmp_path / name
+    transcript_file_path.write_text(content)
+    index.add(connection, str(transcript_file_path), create_transcript(content))
+
+
+def test_replacing_a_transcript_replaces_its_paragraphs(tmp_path):
+    connection = sqlite3.connect(":memory:")
+    index.migrate(connection)
+    add(connection, tmp_path, "a.json", "apples here\n\nbananas there")
+    add(connection, tmp_path, "b.json", "more apples")
+    add(connection, tmp_path, "a.json", "cherries only")
+
+    hits = index.search(connection, "apples", highlight=("[", "]"))
+    assert [(hit["name"], hit["paragraph"]) for hit in hits] == [("b.json", 0)]
+    assert hits[0]["snippet"] == "more [apples]"
+    assert [hit["name"] for hit in index.search(connection, "cherries")] == ["a.json"]
+
+    index.remove(connection, "a.json")
+    assert index.search(connection, "cherries") == []
+    assert connection.execute("SELECT COUNT(*) FROM paragraphs").fetchone() == (1,)
+    connection.execute(
+        "INSERT INTO transcript_paragraphs (transcript_paragraphs) VALUES ('integrity-check')"
+    )
@@ -0,0 +1,97 @@
+from convo.ai._internal import segments
+
+
+def create_response(first_word: int, sentence_lengths: list[int]) -> dict:
+    """
+    Create the response of a segment with a word every second, starting with word number `first_word` at 0 seconds of the segment, and a single paragraph of sentences of the given lengths.
+    """
+    words = []
+    sentences = []
+    idx = 0
+    for sentence_length in sentence_lengths:
+        sentence_words = []
+        for _ in range(sentence_length):
+            word = {
+                "word": f"w{first_word + idx}",
+                "start": float(idx),
+                "end": idx + 0.8,
+                "confidence": 0.9,
+                "punctuated_word": f"w{first_word + idx}",
+                "speaker": 0,
+                "speaker_confidence": 0.9,
+            }
+            sentence_words.append(word)
+            idx += 1
+        words.extend(sentence_words)
+        sentences.append(
+            {
+                "text": " ".join(word["punctuated_word"] for word in sentence_words),
+                "start": sentence_words[0]["start"],
+                "end": sentence_words[-1]["end"],
+            }
+        )
+    paragraph = {
+        "sentences": sentences,
+        "start": sentences[0]["start"],
+        "end": sentences[-1]["end"],
+        "num_words": len(words),
+        "speaker": 0,
+    }
+    return {
+        "metadata": {"request_id": "test", "duration": float(idx), "channels": 1},
+        "results": {
+            "channels": [
+                {
+                    "alternatives": [
+                        {
+                            "transcript": " ".join(word["word"] for word in words),
+                            "confidence": 0.9,
+                            "words": words,
+                            "paragraphs": {"transcript": "", "paragraphs": [paragraph]},
+                        }
+                    ]
+                }
+            ]
+        },
+    }
+
+
+def test_sentence_crossing_the_cut_keeps_its_words_after_the_cut():
+    # The recording is split at 15 seconds, the second segment starts 5
+    # seconds earlier. Its second sentence, w12 to w17, crosses the cut.
+    first = create_response(0, [5, 5, 5])
+    second = create_response(10, [2, 6, 7])
+
+    stitched = segments.stitch_responses([first, second], [0.0, 10.0], [0.0, 15.0])
+
+    alternative = stitched["results"]["channels"][0]["alternatives"][0]
+    words = [word["word"] for word in alternative["words"]]
+    assert words == [f"w{idx}" for idx in range(25)]
+
+    paragraphs = alternative["paragraphs"]["paragraphs"]
+    sentence_texts = [
+        sentence["text"]
+        for paragraph in paragraphs
+        for sentence in paragraph["sentences"]
+    ]
+    assert " ".join(sentence_texts).split() == words
+    assert sentence_texts[3] == "w15 w16 w17"
+
+    crossing_paragraph = paragraphs[1]
+    assert crossing_paragraph["start"] == 15.0
+    assert crossing_paragraph["sentences"][0]["start"] == 15.0
+    assert crossing_paragraph["num_words"] == 10
+
+
+def test_sentence_before_the_cut_is_dropped():
+    first = create_response(0, [5, 5, 5])
+    second = create_response(10, [5, 5])
+
+    stitched = segments.stitch_responses([first, second], [0.0, 10.0], [0.0, 15.0])
+
+    paragraphs = stitched["results"]["channels"][0]["alternatives"][0]["paragraphs"][
+        "paragraphs"
+    ]
+    assert [sentence["text"] for sentence in paragraphs[1]["sentences"]] == [
+        "w15 w16 w17 w18 w19"
+    ]
@@ -0,0 +1,55 @@
+import os
+import pytest
+from convo import config, transcripts
+from convo._utils import codec
+from convo.transcripts._internal import index
+
+TRANSCRIPT: transcripts.Transcript = {
+    "metadata": {
+        "audio_file_path": "meeting.wav",
+        "date": "2024-01-01",
+        "speakers": ["Alice"],
+        "keywords": [],
+    },
+    "summary": "A meeting.",
+    "content": "Hello.",
+}
+
+
+@pytest.fixture
+def transcripts_dir(tmp_path, monkeypatch):
+    pytest.importorskip("zstandard")
+    monkeypatch.setattr(config, "TRANSCRIPTS_DIR_PATH", str(tmp_path))
+    transcripts.write_transcript(
+        str(tmp_path / "zstd_transcript.json"), TRANSCRIPT, compression="zstd"
+    )
+    transcripts.write_transcript(
+        str(tmp_path / "plain_transcript.json"), TRANSCRIPT, compression="none"
+    )
+    (tmp_path / "notes.txt").write_text("not a transcript")
+
+    def import_zstandard():
+        raise ModuleNotFoundError("zstandard isn't installed.")
+
+    monkeypatch.setattr(codec, "import_zstandard", import_zstandard)
+    return tmp_path
+
+
+def test_compact_skips_unreadable_transcripts(transcripts_dir):
+    _, _, skipped_names = transcripts.compact("gzip")
+
+    assert skipped_names == ["notes.txt", "zstd_transcript.json"]
+
+
+def test_compact_to_zstd_without_zstandard_raises(transcripts_dir):
+    with pytest.raises(ModuleNotFoundError):
+        transcripts.compact("zstd")
+
+
+def test_migrate_skips_unreadable_transcripts(transcripts_dir):
+    assert transcripts.migrate() == ([], ["notes.txt", "zstd_transcript.json"])
+
+
+def test_read_transcript_skips_missing_files(tmp_path):
+    with pytest.warns(UserWarning, match="Skipped transcript 'missing.json'"):
+        assert index.read_transcript(str(tmp_path / "missing.json")) is None
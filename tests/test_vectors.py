@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import pytest
+from convo import config
+from convo.ai._internal import vectors
+
+pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def directories(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TRANSCRIPTS_DIR_PATH", str(tmp_path / "transcripts"))
+    monkeypatch.setattr(config, "VECTORS_DIR_PATH", str(tmp_path / "vectors"))
+    os.mkdir(config.TRANSCRIPTS_DIR_PATH)
+
+
+def test_search_only_ingests_when_the_directory_changed(directories, monkeypatch):
+    ingested = []
+    ingest_existing_transcripts = vectors.ingest_existing_transcripts
+
+    def ingest(connection):
+        ingested.append(connection)
+        ingest_existing_transcripts(connection)
+
+    monkeypatch.setattr(vectors, "ingest_existing_transcripts", ingest)
+    # Pretend the directory was last changed long before the first scan.
+    os.utime(config.TRANSCRIPTS_DIR_PATH, ns=(0, 0))
+    assert vectors.search_excerpts("apples") == []
+    assert vectors.search_excerpts("apples") == []
+    assert len(ingested) == 1
+
+    os.utime(config.TRANSCRIPTS_DIR_PATH, ns=(10**18, 10**18))
+    vectors.search_excerpts("apples")
+    assert len(ingested) == 2
+
+
+def test_search_doesnt_take_the_write_lock(directories):
+    os.utime(config.TRANSCRIPTS_DIR_PATH, ns=(0, 0))
+    vectors.search_excerpts("apples")
+
+    writer = sqlite3.connect(
+        os.path.join(config.VECTORS_DIR_PATH, vectors.CHUNKS_FILE_NAME)
+    )
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        assert vectors.search_excerpts("apples") == []
+    finally:
+        writer.rollback()
+
+
+def test_ingest_adds_new_and_removes_deleted_transcripts(directories):
+    transcript_file_path = os.path.join(config.TRANSCRIPTS_DIR_PATH, "a.json")
+    vectors.transcripts.write_transcript(
+        transcript_file_path,
+        {
+            "metadata": {
+                "audio_file_path": "a.wav",
+                "date": "2024-01-01",
+                "speakers": [],
+                "keywords": [],
+            },
+            "summary": "",
+            "content": "apples and pears",
+        },
+    )
+    os.utime(config.TRANSCRIPTS_DIR_PATH, ns=(0, 0))
+    assert [excerpt["name"] for excerpt in vectors.search_excerpts("apples")] == [
+        "a.json"
+    ]
+
+    os.remove(transcript_file_path)
+    os.utime(config.TRANSCRIPTS_DIR_PATH, ns=(10**9, 10**9))
+    assert vectors.search_excerpts("apples") == []
+    with vectors.connect(write=False) as connection:
+        assert connection.execute(
+            "SELECT COUNT(*) FROM chunks WHERE removed = 0"
+        ).fetchone() == (0,)